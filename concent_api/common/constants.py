@@ -66,6 +66,7 @@ class ErrorCode(enum.Enum):
     VERIFIER_LOADING_FILES_WITH_OPENCV_FAILED                          = 'verifier.loading_files_with_opencv_failed'
     VERIFIER_RUNNING_BLENDER_FAILED                                    = 'verifier.running_blender_failed'
     VERIFIER_UNPACKING_ARCHIVE_FAILED                                  = 'verifier.unpacking_archive_failed'
+    VERIFIER_VERIFICATION_DEADLINE_CANNOT_BE_MET                       = 'verifier.verification_deadline_cannot_be_met'
 
 
 class MessageIdField(enum.Enum):
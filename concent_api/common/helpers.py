@@ -3,6 +3,8 @@ import base64
 import binascii
 import datetime
 import time
+from typing import BinaryIO
+from typing import Iterable
 
 from django.conf import settings
 from django.utils                   import timezone
@@ -140,14 +142,20 @@ def join_messages(*messages):
 
 
 def upload_file_to_storage_cluster(
-    file_content: bytes,
+    file_content: Union[bytes, BinaryIO, Iterable[bytes]],
     file_path: str,
     upload_token: message.concents.FileTransferToken,
     client_private_key: Optional[bytes] = None,
     client_public_key: Optional[bytes] = None,
     content_public_key: Optional[bytes] = None,
     storage_cluster_address: Optional[str] = None,
+    session: Optional[requests.Session] = None,
 ) -> requests.Response:
+    """
+    Uploads file to the storage cluster. `file_content` can also be an open binary file or an iterable of chunks,
+    in which case the body is streamed instead of being loaded into memory. Requests can be sent over
+    a `session` to reuse its pooled connections.
+    """
     dumped_upload_token = dump(upload_token, None, content_public_key if content_public_key is not None else settings.CONCENT_PUBLIC_KEY)
     base64_encoded_token = base64.b64encode(dumped_upload_token).decode()
     headers = {
@@ -166,9 +174,8 @@ def upload_file_to_storage_cluster(
         'Concent-Upload-Path': file_path,
         'Content-Type': 'application/octet-stream'
     }
-    return requests.post(
-        f"{storage_cluster_address if storage_cluster_address is not None else settings.STORAGE_CLUSTER_ADDRESS}upload/",
-        headers=headers,
-        data=file_content,
-        verify=False
-    )
+    url = f"{storage_cluster_address if storage_cluster_address is not None else settings.STORAGE_CLUSTER_ADDRESS}upload/"
+    # Stubs of requests do not include iterables of chunks, which requests streams like files.
+    if session is None:
+        return requests.post(url, headers=headers, data=file_content, verify=False)  # type: ignore
+    return session.post(url, headers=headers, data=file_content, verify=False)  # type: ignore
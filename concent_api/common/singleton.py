@@ -4,6 +4,7 @@ from web3 import Web3
 from golem_sci import chains
 from golem_sci import new_sci_rpc
 
+from core.payments.signing import get_transaction_signer
 from core.payments.storage import DatabaseTransactionsStorage
 
 
@@ -17,6 +18,6 @@ class PaymentInterface:
                 address=Web3.toChecksumAddress(settings.CONCENT_ETHEREUM_ADDRESS),
                 chain=chains.RINKEBY,
                 storage=DatabaseTransactionsStorage(),
-                tx_sign=lambda tx: tx.sign(settings.CONCENT_ETHEREUM_PRIVATE_KEY),
+                tx_sign=get_transaction_signer(),
             )
         return cls.__instance
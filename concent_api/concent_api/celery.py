@@ -1,7 +1,10 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 from kombu import Queue
 
+from verifier.constants import VERIFICATION_ORDER_MAX_PRIORITY
+
 # set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'concent_api.settings')
 
@@ -19,7 +22,13 @@ app.conf.task_create_missing_queues = False
 app.conf.task_queues = (
     Queue('concent'),
     Queue('conductor'),
+    # Queue of verification orders used before they got priorities. RabbitMQ refuses to redeclare an existing queue
+    # with different arguments, so orders are now sent to 'verifier-priority'. This queue stays declared without
+    # arguments, so that orders sent before the upgrade are still processed. Verifier workers must consume both
+    # queues: `celery worker -Q verifier,verifier-priority`.
     Queue('verifier'),
+    # Verification orders closest to missing their deadlines are consumed first.
+    Queue('verifier-priority', queue_arguments={'x-max-priority': VERIFICATION_ORDER_MAX_PRIORITY}),
 )
 
 app.conf.task_routes = ([
@@ -27,6 +36,20 @@ app.conf.task_routes = ([
     ('core.tasks.upload_finished', {'queue': 'concent'}),
     ('conductor.tasks.blender_verification_request', {'queue': 'conductor'}),
     ('conductor.tasks.upload_acknowledged', {'queue': 'conductor'}),
-    ('verifier.tasks.blender_verification_order', {'queue': 'verifier'}),
+    ('verifier.tasks.blender_verification_order', {'queue': 'verifier-priority'}),
 ],)
 app.conf.task_default_queue = 'concent'
+
+
+@celeryd_init.connect
+def limit_prefetching_of_verifier_workers(conf, options, **_kwargs):
+    """
+    Workers consuming verification orders reserve as few tasks in advance as possible, because a reserved order
+    would be processed before orders with higher priority which arrive later. Other workers keep the default.
+    A worker started without `-Q` consumes all queues, including verification orders.
+    """
+    queues = options.get('queues') or []
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    if len(queues) == 0 or 'verifier-priority' in queues:
+        conf.worker_prefetch_multiplier = 1
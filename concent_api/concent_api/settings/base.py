@@ -287,6 +287,26 @@ STORAGE_CLUSTER_SSL_CERTIFICATE_PATH = ''
 # Stored in a 'bytes' array, e.g. b'\xf3\x97\x19\xcdX\xda...'
 # CONCENT_ETHEREUM_PRIVATE_KEY = ''
 
+# Host of MiddleMan through which SigningService signs Concent's Ethereum transactions. If None, transactions are
+# signed with CONCENT_ETHEREUM_PRIVATE_KEY.
+# SigningService does not sign anything yet: sign_payload() answers every request with its own payload, which is not
+# a valid signature, so signing of every transaction would fail. Keep it None outside of testing MiddleMan itself.
+MIDDLEMAN_ADDRESS = None
+
+# Port on which MiddleMan listens for Concent.
+MIDDLEMAN_PORT = 9054
+
+# Maximum number of connections to MiddleMan kept open by each Concent process.
+MIDDLEMAN_CONNECTION_POOL_SIZE = 4
+
+# Number of seconds Concent waits for a response from MiddleMan.
+MIDDLEMAN_REQUEST_TIMEOUT = 15
+
+# Number of seconds for which a transaction waits for others signed concurrently, so that they are sent to
+# SigningService in one batch. Transactions saved with DatabaseTransactionsStorage are signed one at a time,
+# under a database lock, so waiting only helps if transactions are signed in other ways as well.
+MIDDLEMAN_SIGNING_BATCH_WINDOW = 0
+
 # A global constant defining the URL of the storage server
 # STORAGE_SERVER_INTERNAL_ADDRESS = ''
 
@@ -332,5 +352,120 @@ MOCK_VERIFICATION_ENABLED = True
 # Verifier setting defining number of threads used by Blender
 BLENDER_THREADS = 1
 
+# Python module used by verifier to render images. It must provide `run_blender` and `get_blender_version` functions.
+# Available backends are:
+# - 'verifier.render_backends.blender': Renders images with Blender.
+# - 'verifier.render_backends.blender_worker': Renders images with long-lived Blender processes which keep scenes
+#                                              loaded between renders.
+# - 'verifier.render_backends.fake':    Writes deterministic images without Blender, for development and benchmarks.
+VERIFIER_RENDER_BACKEND = 'verifier.render_backends.blender'
+
+# Maximum number of long-lived Blender processes, each with a different scene loaded, kept by the blender_worker
+# render backend. The least recently used one is stopped first.
+VERIFIER_BLENDER_WORKER_MAX_SCENES = 2
+
+# Number of render jobs and memory usage in bytes after which a long-lived Blender process is restarted.
+VERIFIER_BLENDER_WORKER_MAX_JOBS = 50
+VERIFIER_BLENDER_WORKER_MAX_MEMORY = 4 * 1024 * 1024 * 1024
+
+# Width and height in pixels of images written by the fake render backend.
+VERIFIER_FAKE_RENDER_RESOLUTION = (320, 240)
+
+# Number of seconds the fake render backend waits before writing an image, to simulate rendering time.
+VERIFIER_FAKE_RENDER_LATENCY = 0.0
+
+# Number of threads uploading images rendered by verifier to the storage cluster while next frames are being rendered.
+VERIFIER_UPLOAD_THREADS = 2
+
+# If the render border defined by the Blender crop script covers more pixels than this, verifier renders and compares
+# only a random sample of tiles from the border instead of the whole border. None disables tile sampling.
+VERIFIER_TILE_SAMPLING_MIN_PIXELS = None
+
+# Number of tiles verified when tile sampling is enabled.
+VERIFIER_SAMPLED_TILES_COUNT = 4
+
+# Length in pixels of the edge of a square tile verified when tile sampling is enabled.
+VERIFIER_SAMPLED_TILE_SIZE = 256
+
+# If a subtask has at least this many frames, verifier renders and compares a random sample of frames first
+# and ends verification with MISMATCH as soon as any of them does not match. None disables frame sampling.
+VERIFIER_FRAME_SAMPLING_MIN_FRAMES = None
+
+# Number of frames verified first when frame sampling is enabled.
+VERIFIER_SAMPLED_FRAMES_COUNT = 5
+
+# If True, the remaining frames are verified after the sample matches. Otherwise the sample alone decides the result.
+VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE = True
+
+# Approximate upper bound, in bytes, of memory used by intermediate arrays while computing SSIM of an image pair.
+# Images are processed in tiles small enough to fit in it. Does not include memory taken by the decoded images.
+VERIFIER_SSIM_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Number of times images can be downscaled by half before SSIM is computed. Verifier starts at the coarsest level
+# and moves to a finer one only if SSIM is within VERIFIER_SSIM_PYRAMID_DECISION_MARGIN from VERIFIER_MIN_SSIM.
+# 0 means that SSIM is always computed at full resolution.
+VERIFIER_SSIM_PYRAMID_LEVELS = 0
+
+# See VERIFIER_SSIM_PYRAMID_LEVELS.
+VERIFIER_SSIM_PYRAMID_DECISION_MARGIN = 0.05
+
+# Path to a directory where verifier keeps data that can be reused by verification of other subtasks, e.g. unpacked
+# source packages. Cached files are hardlinked into VERIFIER_STORAGE_PATH, so both must be on the same filesystem.
+# None disables caching.
+VERIFIER_CACHE_PATH = None
+
+# Maximum total size in bytes of unpacked source packages kept in VERIFIER_CACHE_PATH.
+# Least recently used packages are removed first.
+VERIFIER_SOURCE_PACKAGE_CACHE_QUOTA = 10 * 1024 * 1024 * 1024
+
+# Maximum total size in bytes of images rendered by verifier and kept in VERIFIER_CACHE_PATH, so that the same frame
+# does not have to be rendered again when results of several providers or a retried subtask are verified.
+# Least recently used images are removed first.
+VERIFIER_RENDER_CACHE_QUOTA = 2 * 1024 * 1024 * 1024
+
+# If True, verifier does not download the whole result package. It reads the zip central directory with HTTP range
+# requests and downloads only the files which are going to be compared. Requires storage cluster supporting ranges.
+VERIFIER_PARTIAL_RESULT_PACKAGE_DOWNLOAD = False
+
+# Size in bytes of a single HTTP range request sent when reading the result package from the storage cluster.
+VERIFIER_RANGE_REQUEST_SIZE = 1024 * 1024
+
+# Limits protecting verifier against zip bombs. Archives with more entries, larger total size of unpacked files
+# in bytes or any entry compressed more times than the ratio are rejected. None disables the compression ratio limit.
+VERIFIER_ARCHIVE_MAX_ENTRIES = 10000
+VERIFIER_ARCHIVE_MAX_UNCOMPRESSED_SIZE = 20 * 1024 * 1024 * 1024
+VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO = None
+
+# Number of threads extracting entries of an archive in parallel.
+VERIFIER_UNPACK_THREADS = 4
+
+# Number of seconds verifier is expected to need to render a single frame of a scene it has not rendered before.
+# Later estimates are based on render times measured by the verifier and kept in VERIFIER_CACHE_PATH.
+VERIFIER_ESTIMATED_FRAME_RENDER_TIME = 60
+
+# Expected rate, in bytes per second, at which verifier downloads packages from the storage cluster.
+VERIFIER_ESTIMATED_DOWNLOAD_RATE = 10 * 1024 * 1024
+
+# Verification orders are prioritized by slack, i.e. seconds left to the verification deadline after the estimated
+# verification time. Each this many seconds of slack lower priority of the order by one.
+VERIFIER_PRIORITY_SLACK_STEP = 60
+
+# If True, verifier ends verification with an error without doing any work if it is estimated not to finish before
+# the deadline. Otherwise it is only logged. Orders whose deadline has already passed are always rejected.
+VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE = False
+
+# Directory in which verifiers reserve disk space needed by verifications before downloading packages. Must be shared
+# by all verifiers using the disk which holds VERIFIER_STORAGE_PATH. None disables reservations.
+VERIFIER_DISK_RESERVATION_PATH = None
+
+# Estimated ratio of the size of unpacked source package to the size of the archive.
+VERIFIER_ESTIMATED_UNPACKED_SIZE_RATIO = 3
+
+# Number of bytes which must remain free on the disk after space for a verification is reserved.
+VERIFIER_MIN_FREE_DISK_SPACE = 1024 * 1024 * 1024
+
+# Number of seconds after which a verification order is executed again if disk space could not be reserved for it.
+VERIFIER_DISK_SPACE_RETRY_DELAY = 60
+
 # A global constant defining upload rate. Setting is necessary to calculate maximum_download_time
 CONCENT_UPLOAD_RATE = int(constants.DEFAULT_UPLOAD_RATE)  # KB/s = kbps / 8
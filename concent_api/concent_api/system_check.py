@@ -256,6 +256,30 @@ def create_error_39_storage_server_internal_address_is_not_set():
     )
 
 
+def create_error_40_verifier_render_backend_is_not_set():
+    return Error(
+        'VERIFIER_RENDER_BACKEND setting is not defined',
+        hint='Set VERIFIER_RENDER_BACKEND in your local_settings.py to the python module used by verifier to render images.',
+        id='concent.E040',
+    )
+
+
+def create_error_41_verifier_render_backend_is_not_a_valid_module(error):
+    return Error(
+        'VERIFIER_RENDER_BACKEND setting is not a valid python module',
+        hint=f'{error}',
+        id='concent.E041',
+    )
+
+
+def create_error_42_verifier_render_backend_does_not_provide_function(function_name):
+    return Error(
+        f'VERIFIER_RENDER_BACKEND module does not provide `{function_name}` function',
+        hint='Render backend must provide `run_blender` and `get_blender_version` functions.',
+        id='concent.E042',
+    )
+
+
 @register()
 def check_settings_concent_features(app_configs, **kwargs):  # pylint: disable=unused-argument
 
@@ -498,3 +522,22 @@ def check_additional_verification_time_multiplier(app_configs=None, **kwargs):
         )]
 
     return []
+
+
+@register()
+def check_verifier_render_backend(app_configs=None, **kwargs):  # pylint: disable=unused-argument
+    if 'verifier' not in settings.CONCENT_FEATURES:
+        return []
+    if getattr(settings, 'VERIFIER_RENDER_BACKEND', None) in [None, '']:
+        return [create_error_40_verifier_render_backend_is_not_set()]
+
+    try:
+        render_backend = importlib.import_module(settings.VERIFIER_RENDER_BACKEND)
+    except ImportError as error:
+        return [create_error_41_verifier_render_backend_is_not_a_valid_module(error)]
+
+    return [
+        create_error_42_verifier_render_backend_does_not_provide_function(function_name)
+        for function_name in ['run_blender', 'get_blender_version']
+        if not callable(getattr(render_backend, function_name, None))
+    ]
@@ -0,0 +1,22 @@
+from types import SimpleNamespace
+
+from django.test import TestCase
+
+from concent_api.celery import limit_prefetching_of_verifier_workers
+
+
+class LimitPrefetchingOfVerifierWorkersTest(TestCase):
+
+    def _get_prefetch_multiplier(self, queues):  # pylint: disable=no-self-use
+        conf = SimpleNamespace(worker_prefetch_multiplier=4)
+        limit_prefetching_of_verifier_workers(conf=conf, options={'queues': queues})
+        return conf.worker_prefetch_multiplier
+
+    def test_that_workers_consuming_verification_orders_prefetch_one_task(self):
+        self.assertEqual(self._get_prefetch_multiplier('verifier,verifier-priority'), 1)
+        self.assertEqual(self._get_prefetch_multiplier(['verifier-priority']), 1)
+        self.assertEqual(self._get_prefetch_multiplier([]), 1)
+
+    def test_that_other_workers_keep_default_prefetch_multiplier(self):
+        self.assertEqual(self._get_prefetch_multiplier('concent'), 4)
+        self.assertEqual(self._get_prefetch_multiplier('conductor,concent'), 4)
@@ -0,0 +1,66 @@
+from django.test                import override_settings
+from django.test                import TestCase
+
+from concent_api.system_check   import create_error_40_verifier_render_backend_is_not_set
+from concent_api.system_check   import create_error_42_verifier_render_backend_does_not_provide_function
+from concent_api.system_check   import check_verifier_render_backend
+
+
+class TestVerifierRenderBackendCheck(TestCase):
+
+    @override_settings(
+        CONCENT_FEATURES=[],
+        VERIFIER_RENDER_BACKEND='verifier.render_backends.missing',
+    )
+    def test_that_render_backend_is_not_checked_when_verifier_is_not_in_concent_features(self):
+        errors = check_verifier_render_backend()
+
+        self.assertEqual(errors, [])
+
+    @override_settings(
+        CONCENT_FEATURES=[
+            'verifier'
+        ],
+        VERIFIER_RENDER_BACKEND='verifier.render_backends.fake',
+    )
+    def test_that_valid_render_backend_will_not_produce_error(self):
+        errors = check_verifier_render_backend()
+
+        self.assertEqual(errors, [])
+
+    @override_settings(
+        CONCENT_FEATURES=[
+            'verifier'
+        ],
+        VERIFIER_RENDER_BACKEND='',
+    )
+    def test_that_empty_render_backend_will_produce_error(self):
+        errors = check_verifier_render_backend()
+
+        self.assertEqual(errors, [create_error_40_verifier_render_backend_is_not_set()])
+
+    @override_settings(
+        CONCENT_FEATURES=[
+            'verifier'
+        ],
+        VERIFIER_RENDER_BACKEND='verifier.render_backends.missing',
+    )
+    def test_that_render_backend_which_cannot_be_imported_will_produce_error(self):
+        errors = check_verifier_render_backend()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0].id, 'concent.E041')
+
+    @override_settings(
+        CONCENT_FEATURES=[
+            'verifier'
+        ],
+        VERIFIER_RENDER_BACKEND='verifier.constants',
+    )
+    def test_that_render_backend_without_required_functions_will_produce_errors(self):
+        errors = check_verifier_render_backend()
+
+        self.assertEqual(errors, [
+            create_error_42_verifier_render_backend_does_not_provide_function('run_blender'),
+            create_error_42_verifier_render_backend_does_not_provide_function('get_blender_version'),
+        ])
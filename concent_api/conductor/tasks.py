@@ -3,6 +3,7 @@ from typing import List
 
 from celery import shared_task
 from mypy.types import Optional
+from django.conf import settings
 from django.db import transaction
 
 from core import tasks
@@ -13,6 +14,8 @@ from common.decorators import provides_concent_feature
 from common.helpers import parse_timestamp_to_utc_datetime
 from common.logging import log_error_message
 from common.logging import log_string_message
+from verifier.scheduling import estimate_verification_time
+from verifier.scheduling import get_verification_order_priority
 from verifier.tasks import blender_verification_order
 from .exceptions import VerificationRequestAlreadyAcknowledgedError
 from .models import BlenderSubtaskDefinition
@@ -146,20 +149,32 @@ def upload_acknowledged(
         verification_request.save()
 
     frames = filter_frames_by_blender_subtask_definition(verification_request.blender_subtask_definition)
+    verification_deadline = int(verification_request.verification_deadline.timestamp())
+
+    # Conductor does not know how long rendering of the scene takes, so the default estimate is used.
+    # Verifier checks whether the order can be finished in time using render times it has measured.
+    estimated_verification_time = estimate_verification_time(
+        len(frames),
+        int(source_file_size) + int(result_file_size),
+        settings.VERIFIER_ESTIMATED_FRAME_RENDER_TIME,
+    )
 
-    blender_verification_order.delay(
-        subtask_id=verification_request.subtask_id,
-        source_package_path=verification_request.source_package_path,
-        source_size=source_file_size,
-        source_package_hash=source_package_hash,
-        result_package_path=verification_request.result_package_path,
-        result_size=result_file_size,
-        result_package_hash=result_package_hash,
-        output_format=verification_request.blender_subtask_definition.output_format,
-        scene_file=verification_request.blender_subtask_definition.scene_file,
-        verification_deadline=int(verification_request.verification_deadline.timestamp()),
-        frames=frames,
-        blender_crop_script=verification_request.blender_subtask_definition.blender_crop_script,
+    blender_verification_order.apply_async(
+        kwargs=dict(
+            subtask_id=verification_request.subtask_id,
+            source_package_path=verification_request.source_package_path,
+            source_size=source_file_size,
+            source_package_hash=source_package_hash,
+            result_package_path=verification_request.result_package_path,
+            result_size=result_file_size,
+            result_package_hash=result_package_hash,
+            output_format=verification_request.blender_subtask_definition.output_format,
+            scene_file=verification_request.blender_subtask_definition.scene_file,
+            verification_deadline=verification_deadline,
+            frames=frames,
+            blender_crop_script=verification_request.blender_subtask_definition.blender_crop_script,
+        ),
+        priority=get_verification_order_priority(verification_deadline, estimated_verification_time),
     )
     log_string_message(
         logger,
@@ -10,6 +10,8 @@ from core.tests.utils import ConcentIntegrationTestCase
 from common.helpers import get_current_utc_timestamp
 from common.helpers import get_storage_result_file_path
 from common.helpers import get_storage_source_file_path
+from verifier.scheduling import estimate_verification_time
+from verifier.scheduling import get_verification_order_priority
 from ..exceptions import VerificationRequestAlreadyAcknowledgedError
 
 
@@ -65,7 +67,7 @@ class ConductorTaskTestCase(ConcentIntegrationTestCase):
                 report_computed_task=self.report_computed_task,
             )
 
-            with mock.patch('conductor.tasks.blender_verification_order.delay') as mock_blender_verification_order, \
+            with mock.patch('conductor.tasks.blender_verification_order.apply_async') as mock_blender_verification_order, \
                 mock.patch('conductor.tasks.filter_frames_by_blender_subtask_definition', return_value=[1]) as mock_frames_filtering:  # noqa: E125
                 upload_acknowledged(
                     subtask_id=self.report_computed_task.subtask_id,
@@ -79,21 +81,34 @@ class ConductorTaskTestCase(ConcentIntegrationTestCase):
 
             self.assertTrue(self.verification_request.upload_acknowledged)
             mock_blender_verification_order.assert_called_once_with(
-                frames=[1],
-                subtask_id=self.verification_request.subtask_id,
-                source_package_path=self.verification_request.source_package_path,
-                source_size=self.report_computed_task.task_to_compute.size,
-                source_package_hash=self.report_computed_task.task_to_compute.package_hash,
-                result_package_path=self.verification_request.result_package_path,
-                result_size=self.report_computed_task.size,
-                result_package_hash=self.report_computed_task.package_hash,
-                output_format=self.verification_request.blender_subtask_definition.output_format,
-                scene_file=self.verification_request.blender_subtask_definition.scene_file,
-                verification_deadline=self._get_verification_deadline_as_timestamp(
-                    get_current_utc_timestamp(),
-                    self.report_computed_task.task_to_compute,
+                kwargs=dict(
+                    frames=[1],
+                    subtask_id=self.verification_request.subtask_id,
+                    source_package_path=self.verification_request.source_package_path,
+                    source_size=self.report_computed_task.task_to_compute.size,
+                    source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+                    result_package_path=self.verification_request.result_package_path,
+                    result_size=self.report_computed_task.size,
+                    result_package_hash=self.report_computed_task.package_hash,
+                    output_format=self.verification_request.blender_subtask_definition.output_format,
+                    scene_file=self.verification_request.blender_subtask_definition.scene_file,
+                    verification_deadline=self._get_verification_deadline_as_timestamp(
+                        get_current_utc_timestamp(),
+                        self.report_computed_task.task_to_compute,
+                    ),
+                    blender_crop_script=self.verification_request.blender_subtask_definition.blender_crop_script,
+                ),
+                priority=get_verification_order_priority(
+                    self._get_verification_deadline_as_timestamp(
+                        get_current_utc_timestamp(),
+                        self.report_computed_task.task_to_compute,
+                    ),
+                    estimate_verification_time(
+                        1,
+                        self.report_computed_task.task_to_compute.size + self.report_computed_task.size,
+                        settings.VERIFIER_ESTIMATED_FRAME_RENDER_TIME,
+                    ),
                 ),
-                blender_crop_script=self.verification_request.blender_subtask_definition.blender_crop_script,
             )
             mock_frames_filtering.assert_called_once()
 
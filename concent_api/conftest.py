@@ -0,0 +1,23 @@
+import pytest
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--benchmark',
+        action='store_true',
+        default=False,
+        help='Run benchmarks, which are skipped by default.',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: measures performance, runs only with --benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmark'):
+        return
+    skip_benchmark = pytest.mark.skip(reason='Benchmarks run only with --benchmark.')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip_benchmark)
@@ -0,0 +1,77 @@
+from typing import Callable
+
+from django.conf import settings
+from ethereum.transactions import Transaction
+from ethereum.transactions import UnsignedTransaction
+from ethereum.utils import ecrecover_to_pub
+from ethereum.utils import normalize_address
+from ethereum.utils import sha3
+import rlp
+
+from core.exceptions import TransactionSigningError
+from middleman.exceptions import MiddleManClientError
+from middleman.middleman_client import MiddleManClient
+from middleman.request_coalescer import RequestCoalescer
+
+# Signature returned by SigningService: r and s, 32 bytes each, followed by one byte of v.
+TRANSACTION_SIGNATURE_LENGTH = 65
+
+
+def get_transaction_signer() -> Callable[[Transaction], None]:
+    """
+    Returns function which signs transactions in place, passed to `DatabaseTransactionsStorage.set_nonce_sign_and_save_tx()`.
+    Transactions are signed by SigningService through MiddleMan if MIDDLEMAN_ADDRESS is set and with
+    CONCENT_ETHEREUM_PRIVATE_KEY otherwise.
+    """
+    if settings.MIDDLEMAN_ADDRESS is None:
+        return lambda tx: tx.sign(settings.CONCENT_ETHEREUM_PRIVATE_KEY)
+
+    middleman_client = MiddleManClient(
+        settings.MIDDLEMAN_ADDRESS,
+        settings.MIDDLEMAN_PORT,
+        settings.MIDDLEMAN_CONNECTION_POOL_SIZE,
+        settings.MIDDLEMAN_REQUEST_TIMEOUT,
+    )
+    return RemoteTransactionSigner(
+        middleman_client,
+        settings.MIDDLEMAN_SIGNING_BATCH_WINDOW,
+        normalize_address(settings.CONCENT_ETHEREUM_ADDRESS),
+    ).sign_transaction
+
+
+class RemoteTransactionSigner:
+    """
+    Signs transactions with SigningService. Transactions signed concurrently are sent in batches. A signature is used
+    only if it was made with the key of `concent_ethereum_address`.
+    """
+
+    def __init__(self, middleman_client: MiddleManClient, batch_window: float, concent_ethereum_address: bytes) -> None:
+        self._request_coalescer = RequestCoalescer(middleman_client.batch_request, batch_window)
+        self._concent_ethereum_address = concent_ethereum_address
+
+    def sign_transaction(self, tx: Transaction) -> None:
+        transaction_hash = get_transaction_hash_to_sign(tx)
+        signature = self._request_coalescer.submit(transaction_hash)
+        if len(signature) != TRANSACTION_SIGNATURE_LENGTH:
+            raise MiddleManClientError(f'Invalid transaction signature length: {len(signature)}.')
+
+        r = int.from_bytes(signature[0:32], 'big')
+        s = int.from_bytes(signature[32:64], 'big')
+        v = signature[64]
+        if v not in (27, 28):
+            raise TransactionSigningError(f'Invalid v value of transaction signature: {v}.')
+        # Invalid signatures are recovered to the public key made of zeros, which does not match any address.
+        signer_address = sha3(ecrecover_to_pub(transaction_hash, v, r, s))[-20:]
+        if signer_address != self._concent_ethereum_address:
+            raise TransactionSigningError(
+                f'Transaction signed by 0x{signer_address.hex()} instead of 0x{self._concent_ethereum_address.hex()}.'
+            )
+
+        tx.r = r
+        tx.s = s
+        tx.v = v
+
+
+def get_transaction_hash_to_sign(tx: Transaction) -> bytes:
+    """ Returns hash of the transaction without signature, the same as signed by `Transaction.sign()`. """
+    return sha3(rlp.encode(tx, UnsignedTransaction))
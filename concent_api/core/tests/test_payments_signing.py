@@ -0,0 +1,82 @@
+import os
+
+from django.test import override_settings
+from django.test import TestCase
+from ethereum.transactions import Transaction
+from ethereum.utils import ecsign
+from ethereum.utils import privtoaddr
+import mock
+
+from core.exceptions import TransactionSigningError
+from core.payments.signing import get_transaction_hash_to_sign
+from core.payments.signing import get_transaction_signer
+from core.payments.signing import RemoteTransactionSigner
+from middleman.exceptions import MiddleManClientError
+
+
+def _create_transaction():
+    return Transaction(
+        nonce=5,
+        gasprice=10 ** 6,
+        startgas=80000,
+        value=10,
+        to=b'7917bc33eea648809c28',
+        data=b'data',
+    )
+
+
+class RemoteTransactionSignerTest(TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.private_key = os.urandom(32)
+        self.concent_ethereum_address = privtoaddr(self.private_key)
+        self.middleman_client = mock.Mock(batch_request=mock.Mock(side_effect=self._sign_batch))
+
+    def _sign_batch(self, payloads):
+        signatures = []
+        for payload in payloads:
+            (v, r, s) = ecsign(payload, self.private_key)
+            signatures.append(r.to_bytes(32, 'big') + s.to_bytes(32, 'big') + bytes([v]))
+        return signatures
+
+    def test_that_transaction_signed_with_signing_service_has_the_same_signature_as_signed_with_private_key(self):
+        transaction_signed_remotely = _create_transaction()
+        transaction_signed_locally = _create_transaction()
+
+        RemoteTransactionSigner(self.middleman_client, 0, self.concent_ethereum_address).sign_transaction(transaction_signed_remotely)
+        transaction_signed_locally.sign(self.private_key)
+
+        self.middleman_client.batch_request.assert_called_once_with([get_transaction_hash_to_sign(_create_transaction())])
+        self.assertEqual(
+            (transaction_signed_remotely.v, transaction_signed_remotely.r, transaction_signed_remotely.s),
+            (transaction_signed_locally.v, transaction_signed_locally.r, transaction_signed_locally.s),
+        )
+
+    def test_that_signature_of_invalid_length_raises_exception(self):
+        self.middleman_client.batch_request.side_effect = lambda payloads: [b'signature' for _ in payloads]
+
+        with self.assertRaises(MiddleManClientError):
+            RemoteTransactionSigner(self.middleman_client, 0, self.concent_ethereum_address).sign_transaction(_create_transaction())
+
+    def test_that_signature_made_with_other_key_raises_exception(self):
+        self.private_key = os.urandom(32)
+
+        with self.assertRaises(TransactionSigningError):
+            RemoteTransactionSigner(self.middleman_client, 0, self.concent_ethereum_address).sign_transaction(_create_transaction())
+
+    def test_that_echoed_payload_is_not_accepted_as_signature(self):
+        self.middleman_client.batch_request.side_effect = lambda payloads: [payload + bytes(33) for payload in payloads]
+        transaction = _create_transaction()
+
+        with self.assertRaises(TransactionSigningError):
+            RemoteTransactionSigner(self.middleman_client, 0, self.concent_ethereum_address).sign_transaction(transaction)
+        self.assertEqual((transaction.v, transaction.r, transaction.s), (0, 0, 0))
+
+    def test_that_transactions_are_signed_with_private_key_if_middleman_address_is_not_set(self):
+        transaction = _create_transaction()
+
+        with override_settings(MIDDLEMAN_ADDRESS=None, CONCENT_ETHEREUM_PRIVATE_KEY=self.private_key):
+            get_transaction_signer()(transaction)
+
+        self.assertIn(transaction.v, [27, 28])
@@ -0,0 +1,83 @@
+"""
+Standalone entry point of MiddleMan: `python -m middleman`, run from the concent_api directory.
+
+Unlike `manage.py middleman` it does not load Django settings and installed apps, which pull in heavy dependencies
+of other apps, e.g. image processing libraries of the verifier. Only the modules MiddleMan needs are imported,
+so it starts in a fraction of the time and memory. It takes the same arguments as the management command
+and reports crashes to Sentry if `--sentry-dsn` is given.
+"""
+from argparse import ArgumentParser
+from argparse import Namespace
+import logging.config
+
+from middleman.arguments import add_middleman_arguments
+from middleman.middleman_server import crash_logger
+from middleman.middleman_server import MiddleMan
+
+
+LOGGING = {
+    'version':                  1,
+    'disable_existing_loggers': False,
+    'formatters':               {
+        'console': {
+            'format':  '%(asctime)s %(levelname)-8s | %(message)s',
+            'datefmt': '%H:%M:%S',
+        },
+    },
+    'handlers': {
+        'console': {
+            'level':     'INFO',
+            'class':     'logging.StreamHandler',
+            'formatter': 'console',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level':    'DEBUG',
+    },
+}
+
+
+def _parse_arguments() -> Namespace:
+    parser = ArgumentParser(prog='python -m middleman', description='Starts MiddleMan without Django.')
+    add_middleman_arguments(parser)
+    parser.add_argument(
+        '--sentry-dsn',
+        type=str,
+        default=None,
+        help="Sentry DSN for error reporting. Errors are not reported if it is not given."
+    )
+    return parser.parse_args()
+
+
+def _report_crashes_to_sentry(sentry_dsn: str) -> None:
+    # Raven takes a noticeable part of the startup time, so it is imported only when it is used.
+    from raven import Client
+    from raven.handlers.logging import SentryHandler
+
+    sentry_handler = SentryHandler(Client(dsn=sentry_dsn))
+    sentry_handler.setLevel(logging.ERROR)
+    crash_logger.addHandler(sentry_handler)
+
+
+def main() -> None:
+    logging.config.dictConfig(LOGGING)
+    args = _parse_arguments()
+    if args.sentry_dsn is not None:
+        _report_crashes_to_sentry(args.sentry_dsn)
+
+    MiddleMan(
+        bind_address=args.bind_address,
+        internal_port=args.internal_port,
+        external_port=args.external_port,
+        request_timeout=args.request_timeout,
+        maximum_pending_requests=args.maximum_pending_requests,
+        maximum_pending_requests_per_connection=args.maximum_pending_requests_per_connection,
+        stats_interval=args.stats_interval,
+        external_bind_address=args.external_bind_address,
+        signing_service_allowed_addresses=args.signing_service_allowed_addresses,
+    ).run()
+
+
+if __name__ == '__main__':
+    main()
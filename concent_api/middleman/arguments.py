@@ -0,0 +1,85 @@
+"""
+Command-line arguments of MiddleMan, shared by the `middleman` management command and the standalone entry point.
+"""
+from argparse import ArgumentParser
+
+from middleman.constants import DEFAULT_EXTERNAL_PORT
+from middleman.constants import DEFAULT_INTERNAL_PORT
+from middleman.constants import DEFAULT_MAXIMUM_PENDING_REQUESTS
+from middleman.constants import DEFAULT_MAXIMUM_PENDING_REQUESTS_PER_CONNECTION
+from middleman.constants import DEFAULT_REQUEST_TIMEOUT
+from middleman.constants import DEFAULT_STATS_INTERVAL
+from middleman.constants import LOCALHOST_IP
+
+
+def add_middleman_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        '-a',
+        '--bind-address',
+        type=str,
+        default=LOCALHOST_IP,
+        help="A port MiddleMan will be listening for Concent clients to connect."
+    )
+
+    parser.add_argument(
+        '-i',
+        '--internal-port',
+        type=int,
+        default=DEFAULT_INTERNAL_PORT,
+        help="A port MiddleMan will be listening for Concent clients to connect."
+    )
+
+    parser.add_argument(
+        '-e',
+        '--external-port',
+        type=int,
+        default=DEFAULT_EXTERNAL_PORT,
+        help="A port MiddleMan will be listening for SigningService to connect."
+    )
+
+    parser.add_argument(
+        '--external-bind-address',
+        type=str,
+        default=None,
+        help="An address MiddleMan will be listening on for SigningService to connect. Defaults to --bind-address. "
+             "The SigningService port is not authenticated, so it must be reachable only by SigningService."
+    )
+
+    parser.add_argument(
+        '--signing-service-allowed-addresses',
+        type=str,
+        nargs='+',
+        default=None,
+        help="IP addresses SigningService may connect from. Connections from other addresses are closed. "
+             "Connections from any address are accepted if not given."
+    )
+
+    parser.add_argument(
+        '-t',
+        '--request-timeout',
+        type=float,
+        default=DEFAULT_REQUEST_TIMEOUT,
+        help="Number of seconds MiddleMan waits for SigningService to respond before the request fails."
+    )
+
+    parser.add_argument(
+        '--maximum-pending-requests',
+        type=int,
+        default=DEFAULT_MAXIMUM_PENDING_REQUESTS,
+        help="Maximum number of requests waiting for SigningService to respond. Further requests are rejected."
+    )
+
+    parser.add_argument(
+        '--maximum-pending-requests-per-connection',
+        type=int,
+        default=DEFAULT_MAXIMUM_PENDING_REQUESTS_PER_CONNECTION,
+        help="Maximum number of requests from one Concent client waiting for SigningService to respond."
+    )
+
+    parser.add_argument(
+        '-s',
+        '--stats-interval',
+        type=float,
+        default=DEFAULT_STATS_INTERVAL,
+        help="Number of seconds between log lines with MiddleMan statistics. 0 disables them."
+    )
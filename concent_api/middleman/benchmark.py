@@ -0,0 +1,280 @@
+"""
+Benchmark of the signing path run in a single event loop: Concent clients send requests to MiddleMan, which forwards
+them to simulated SigningService instances. Instances answer every request with a signature-sized response after
+a fixed signing latency, so the benchmark measures MiddleMan and the protocol rather than signing itself.
+
+Each client keeps one request in flight over its own connection, like `MiddleManClient`, and sends the next one
+when the previous is answered. After the main run, connections of all SigningService instances are dropped while
+clients keep sending requests, to measure how long it takes until requests succeed again.
+"""
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+import asyncio
+import resource
+
+from mypy.types import Optional
+
+from middleman_protocol.constants import MAXIMUM_REQUEST_ID
+from middleman_protocol.constants import MessageType
+from middleman_protocol.frame import decode_batch_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+from middleman.constants import BENCHMARK_CLIENT_RETRY_DELAY
+from middleman.constants import BENCHMARK_LATENCY_PERCENTILES
+from middleman.constants import BENCHMARK_LOAD_TIME_BEFORE_DISCONNECTION
+from middleman.constants import BENCHMARK_REQUEST_PAYLOAD_LENGTH
+from middleman.constants import BENCHMARK_RESPONSE_PAYLOAD_LENGTH
+from middleman.constants import LOCALHOST_IP
+from middleman.constants import STREAM_READ_SIZE
+from middleman.middleman_server import MiddleMan
+
+
+BenchmarkResult = NamedTuple('BenchmarkResult', [
+    ('signing_services_count', int),
+    ('clients_count', int),
+    ('signing_latency', float),
+    # Number of requests answered with a response, not counting requests sent while measuring recovery.
+    ('responses_count', int),
+    # Number of requests answered with an error, not counting requests sent while measuring recovery.
+    ('errors_count', int),
+    ('requests_per_second', float),
+    # Request latencies in seconds, by percentile.
+    ('latency_percentiles', Dict[int, float]),
+    # Peak resident set size of the whole process so far, in bytes. Does not decrease between benchmark runs.
+    ('peak_rss', int),
+    # Seconds from dropping connections of all SigningService instances until every client got a response again.
+    ('reconnect_recovery_time', float),
+])
+
+
+class SimulatedSigningService:
+    """
+    Connects to MiddleMan and answers requests after `signing_latency` seconds, concurrently, like SigningService with
+    enough signing workers. Reconnects `reconnect_delay` seconds after the connection is dropped.
+    """
+
+    __slots__ = (
+        '_port',
+        '_signing_latency',
+        '_reconnect_delay',
+        '_loop',
+        '_writer',
+        '_is_stopped',
+    )
+
+    def __init__(self, port: int, signing_latency: float, reconnect_delay: float, loop: asyncio.AbstractEventLoop) -> None:
+        self._port = port
+        self._signing_latency = signing_latency
+        self._reconnect_delay = reconnect_delay
+        self._loop = loop
+        self._writer = None  # type: Optional[asyncio.StreamWriter]
+        self._is_stopped = False
+
+    async def run(self) -> None:
+        while True:
+            (reader, writer) = await asyncio.open_connection(LOCALHOST_IP, self._port, loop=self._loop)
+            self._writer = writer
+            await self._answer_requests(reader, writer)
+            writer.close()
+            self._writer = None
+            if self._is_stopped:
+                return
+            await asyncio.sleep(self._reconnect_delay, loop=self._loop)
+
+    def drop_connection(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+    def stop(self) -> None:
+        self._is_stopped = True
+        self.drop_connection()
+
+    async def _answer_requests(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        frame_decoder = FrameDecoder()
+        while True:
+            try:
+                data = await reader.read(STREAM_READ_SIZE)
+            except ConnectionError:
+                return
+            if data == b'':
+                return
+            frame_decoder.feed(data)
+            for frame in frame_decoder.read_frames():
+                self._loop.call_later(self._signing_latency, self._respond, writer, self._get_response(frame))
+
+    @staticmethod
+    def _get_response(frame: Frame) -> bytes:
+        signature = bytes(BENCHMARK_RESPONSE_PAYLOAD_LENGTH)
+        if frame.message_type == MessageType.BATCH_REQUEST:
+            items_count = len(decode_batch_payload(frame.payload))
+            return encode_frame(frame.request_id, MessageType.BATCH_RESPONSE, encode_batch_payload([signature] * items_count))
+        return encode_frame(frame.request_id, MessageType.RESPONSE, signature)
+
+    @staticmethod
+    def _respond(writer: asyncio.StreamWriter, response: bytes) -> None:
+        # The connection may have been dropped while the request was being signed.
+        if not writer.transport.is_closing():
+            writer.write(response)
+
+
+def run_middleman_benchmark(
+    signing_services_count: int,
+    clients_count: int,
+    requests_per_client: int,
+    signing_latency: float,
+    reconnect_delay: float,
+) -> BenchmarkResult:
+    loop = asyncio.new_event_loop()
+    middleman = MiddleMan(internal_port=0, external_port=0, loop=loop)
+    middleman._start_middleman()  # pylint: disable=protected-access
+    try:
+        return loop.run_until_complete(
+            _run_benchmark(
+                middleman,
+                signing_services_count,
+                clients_count,
+                requests_per_client,
+                signing_latency,
+                reconnect_delay,
+                loop,
+            )
+        )
+    finally:
+        middleman._close_middleman()  # pylint: disable=protected-access
+
+
+async def _run_benchmark(
+    middleman: MiddleMan,
+    signing_services_count: int,
+    clients_count: int,
+    requests_per_client: int,
+    signing_latency: float,
+    reconnect_delay: float,
+    loop: asyncio.AbstractEventLoop,
+) -> BenchmarkResult:
+    (internal_port, external_port) = (
+        server.sockets[0].getsockname()[1]
+        for server in [middleman._server_for_concent, middleman._server_for_signing_service]  # pylint: disable=protected-access
+    )
+    signing_services = [
+        SimulatedSigningService(external_port, signing_latency, reconnect_delay, loop)
+        for _ in range(signing_services_count)
+    ]
+    signing_service_tasks = [asyncio.ensure_future(signing_service.run(), loop=loop) for signing_service in signing_services]
+    try:
+        while len(middleman.get_signing_service_stats()) < signing_services_count:
+            await asyncio.sleep(BENCHMARK_CLIENT_RETRY_DELAY, loop=loop)
+
+        start_time = loop.time()
+        client_results = await asyncio.gather(
+            *[_send_requests(internal_port, requests_per_client, loop) for _ in range(clients_count)],
+            loop=loop
+        )
+        elapsed_time = loop.time() - start_time
+        reconnect_recovery_time = await _measure_reconnect_recovery(internal_port, clients_count, signing_services, loop)
+    finally:
+        for signing_service in signing_services:
+            signing_service.stop()
+        await asyncio.gather(*signing_service_tasks, loop=loop)
+
+    latencies = sorted(latency for (client_latencies, _errors_count) in client_results for latency in client_latencies)
+    return BenchmarkResult(
+        signing_services_count=signing_services_count,
+        clients_count=clients_count,
+        signing_latency=signing_latency,
+        responses_count=len(latencies),
+        errors_count=sum(errors_count for (_client_latencies, errors_count) in client_results),
+        requests_per_second=clients_count * requests_per_client / elapsed_time,
+        latency_percentiles={
+            percentile: _get_percentile(latencies, percentile)
+            for percentile in BENCHMARK_LATENCY_PERCENTILES
+        },
+        peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        reconnect_recovery_time=reconnect_recovery_time,
+    )
+
+
+async def _send_requests(port: int, requests_count: int, loop: asyncio.AbstractEventLoop) -> Tuple[List[float], int]:
+    """ Returns latencies of requests answered with responses and the number of requests answered with errors. """
+    (reader, writer) = await asyncio.open_connection(LOCALHOST_IP, port, loop=loop)
+    frame_decoder = FrameDecoder()
+    latencies = []
+    errors_count = 0
+    try:
+        for request_index in range(requests_count):
+            sent_at = loop.time()
+            message_type = await _send_request(reader, writer, frame_decoder, request_index)
+            if message_type == MessageType.RESPONSE:
+                latencies.append(loop.time() - sent_at)
+            else:
+                errors_count += 1
+    finally:
+        writer.close()
+    return (latencies, errors_count)
+
+
+async def _measure_reconnect_recovery(
+    port: int,
+    clients_count: int,
+    signing_services: List[SimulatedSigningService],
+    loop: asyncio.AbstractEventLoop,
+) -> float:
+    disconnection_time = loop.create_future()
+    client_tasks = [
+        asyncio.ensure_future(_send_requests_until_recovered(port, disconnection_time, loop), loop=loop)
+        for _ in range(clients_count)
+    ]
+    await asyncio.sleep(BENCHMARK_LOAD_TIME_BEFORE_DISCONNECTION, loop=loop)
+    for signing_service in signing_services:
+        signing_service.drop_connection()
+    disconnection_time.set_result(loop.time())
+    recovery_times = await asyncio.gather(*client_tasks, loop=loop)
+    return max(recovery_times) - disconnection_time.result()
+
+
+async def _send_requests_until_recovered(port: int, disconnection_time: asyncio.Future, loop: asyncio.AbstractEventLoop) -> float:
+    """ Sends requests until one sent after connections of SigningService were dropped succeeds and returns the time. """
+    (reader, writer) = await asyncio.open_connection(LOCALHOST_IP, port, loop=loop)
+    frame_decoder = FrameDecoder()
+    request_index = 0
+    try:
+        while True:
+            is_sent_after_disconnection = disconnection_time.done()
+            message_type = await _send_request(reader, writer, frame_decoder, request_index)
+            request_index += 1
+            if message_type == MessageType.RESPONSE:
+                if is_sent_after_disconnection:
+                    return loop.time()
+            else:
+                await asyncio.sleep(BENCHMARK_CLIENT_RETRY_DELAY, loop=loop)
+    finally:
+        writer.close()
+
+
+async def _send_request(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    frame_decoder: FrameDecoder,
+    request_index: int,
+) -> MessageType:
+    """ Sends a request and returns the type of the frame answering it. """
+    writer.write(encode_frame(request_index % (MAXIMUM_REQUEST_ID + 1), MessageType.REQUEST, bytes(BENCHMARK_REQUEST_PAYLOAD_LENGTH)))
+    while True:
+        data = await reader.read(STREAM_READ_SIZE)
+        if data == b'':
+            raise ConnectionResetError('Connection closed by MiddleMan.')
+        frame_decoder.feed(data)
+        # Clients have only one request in flight, so the frame answering it is the only one received.
+        for frame in frame_decoder.read_frames():
+            return frame.message_type
+
+
+def _get_percentile(sorted_values: List[float], percentile: int) -> float:
+    if len(sorted_values) == 0:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, len(sorted_values) * percentile // 100)]
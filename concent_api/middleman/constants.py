@@ -1,3 +1,50 @@
 DEFAULT_INTERNAL_PORT = 9054
 LOCALHOST_IP = "127.0.0.1"
 ERROR_ADDRESS_ALREADY_IN_USE = "Error: address already in use"
+
+# Maximum number of bytes read from a connection at once.
+STREAM_READ_SIZE = 64 * 1024
+
+DEFAULT_EXTERNAL_PORT = 9055
+
+# Number of seconds MiddleMan waits for SigningService to respond before the request fails.
+DEFAULT_REQUEST_TIMEOUT = 10
+
+# Maximum number of requests waiting for SigningService to respond, from all Concent clients and from one client.
+# Further requests are rejected until some of them finish, so that a slow SigningService cannot make MiddleMan buffer
+# requests until it runs out of memory.
+DEFAULT_MAXIMUM_PENDING_REQUESTS = 1000
+DEFAULT_MAXIMUM_PENDING_REQUESTS_PER_CONNECTION = 100
+
+# Maximum number of SigningService instances a request is forwarded to. A request pending when an instance disconnects
+# is forwarded to another one, unless it has been tried this many times, e.g. because it makes SigningService crash.
+MAXIMUM_FORWARDING_ATTEMPTS = 3
+
+# Weight of the latest response time in the moving average of response times of a SigningService instance.
+RESPONSE_TIME_SMOOTHING_FACTOR = 0.2
+
+# Weight of the latest response in the moving average of the share of failed responses of a SigningService instance.
+ERROR_RATE_SMOOTHING_FACTOR = 0.2
+
+# Lower bound of the share of successful responses used to weight pending requests of a SigningService instance.
+# An instance which only fails still gets a request when the others have this many times more requests pending.
+MINIMUM_SUCCESS_RATE = 0.01
+
+# Lengths of payloads sent by the benchmark: a transaction hash and a signature.
+BENCHMARK_REQUEST_PAYLOAD_LENGTH = 32
+BENCHMARK_RESPONSE_PAYLOAD_LENGTH = 65
+
+# Percentiles of request latencies reported by the benchmark.
+BENCHMARK_LATENCY_PERCENTILES = (50, 90, 99, 100)
+
+# Number of seconds a benchmark client waits before repeating a request which failed.
+BENCHMARK_CLIENT_RETRY_DELAY = 0.01
+
+# Number of seconds the benchmark keeps clients sending requests before dropping connections of SigningService.
+BENCHMARK_LOAD_TIME_BEFORE_DISCONNECTION = 0.2
+
+# Number of seconds between log lines with MiddleMan statistics.
+DEFAULT_STATS_INTERVAL = 60
+
+# Upper bounds, in seconds, of buckets of request latency histograms. The last bucket counts longer latencies.
+LATENCY_HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
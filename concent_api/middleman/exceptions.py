@@ -0,0 +1,23 @@
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import RETRIABLE_ERROR_CODES
+
+
+class MiddleManClientError(Exception):
+    pass
+
+
+class MiddleManRequestTimeout(MiddleManClientError):
+    pass
+
+
+class MiddleManErrorResponse(MiddleManClientError):
+    """ Raised when MiddleMan or SigningService answers a request with an ERROR frame. """
+
+    def __init__(self, error_code: ErrorCode, error_message: str) -> None:
+        super().__init__(f'{error_code.name}: {error_message}')
+        self.error_code = error_code
+        self.error_message = error_message
+
+    @property
+    def is_retriable(self) -> bool:
+        return self.error_code in RETRIABLE_ERROR_CODES
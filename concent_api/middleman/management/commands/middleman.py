@@ -1,7 +1,6 @@
 from django.core.management.base import BaseCommand
 
-from middleman.constants import DEFAULT_INTERNAL_PORT
-from middleman.constants import LOCALHOST_IP
+from middleman.arguments import add_middleman_arguments
 from middleman.middleman_server import MiddleMan
 
 
@@ -9,26 +8,19 @@ class Command(BaseCommand):
     help = 'Starts MiddleMan app'
 
     def add_arguments(self, parser):
-        parser.add_argument(
-            '-a',
-            '--bind-address',
-            type=str,
-            default=LOCALHOST_IP,
-            help="A port MiddleMan will be listening for Concent clients to connect."
-        )
-
-        parser.add_argument(
-            '-i',
-            '--internal-port',
-            type=int,
-            default=DEFAULT_INTERNAL_PORT,
-            help="A port MiddleMan will be listening for Concent clients to connect."
-        )
+        add_middleman_arguments(parser)
 
     def handle(self, *args, **options):
         MiddleMan(
             bind_address=options['bind_address'],
             internal_port=options['internal_port'],
+            external_port=options['external_port'],
+            request_timeout=options['request_timeout'],
+            maximum_pending_requests=options['maximum_pending_requests'],
+            maximum_pending_requests_per_connection=options['maximum_pending_requests_per_connection'],
+            stats_interval=options['stats_interval'],
+            external_bind_address=options['external_bind_address'],
+            signing_service_allowed_addresses=options['signing_service_allowed_addresses'],
         ).run()
 
         print("\nEND OF EVANGELION")
@@ -0,0 +1,174 @@
+"""
+Synchronous client used by Concent processes, e.g. Celery workers, to send requests to SigningService through MiddleMan.
+
+Connections are kept open in a small per-process pool shared by all threads, so that a request does not open
+a new TCP connection. Each connection carries one request at a time.
+"""
+from queue import Empty
+from queue import LifoQueue
+from threading import BoundedSemaphore
+from typing import List
+import itertools
+import logging
+import os
+import socket
+
+from mypy.types import Optional
+
+from middleman_protocol.constants import MAXIMUM_REQUEST_ID
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.frame import decode_batch_payload
+from middleman_protocol.frame import decode_error_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+from middleman.exceptions import MiddleManClientError
+from middleman.exceptions import MiddleManErrorResponse
+from middleman.exceptions import MiddleManRequestTimeout
+
+
+logger = logging.getLogger(__name__)
+
+
+class MiddleManConnection:
+
+    __slots__ = (
+        '_socket',
+        '_frame_decoder',
+        '_request_ids',
+    )
+
+    def __init__(self, host: str, port: int, timeout: float) -> None:
+        self._socket = socket.create_connection((host, port), timeout)
+        self._socket.settimeout(timeout)
+        self._frame_decoder = FrameDecoder()
+        self._request_ids = itertools.cycle(range(MAXIMUM_REQUEST_ID + 1))
+
+    def send_request(self, message_type: MessageType, payload: bytes) -> Frame:
+        """
+        Sends the request and returns the frame answering it, with payload copied out of the decoder's buffer.
+        Raises MiddleManRequestTimeout if no answer comes within the timeout, after which the connection must be
+        closed, because the answer may still arrive.
+        """
+        request_id = next(self._request_ids)
+        try:
+            self._socket.sendall(encode_frame(request_id, message_type, payload))
+            while True:
+                for frame in self._frame_decoder.read_frames():
+                    if frame.request_id != request_id:
+                        raise InvalidFrameError(f'Response to request {frame.request_id} received while waiting for {request_id}.')
+                    return frame._replace(payload=memoryview(frame.payload).tobytes())
+
+                buffer = self._frame_decoder.get_buffer()
+                # Stubs accept only bytearray, but any writable buffer can be received into.
+                received_bytes_count = self._socket.recv_into(buffer, len(buffer))  # type: ignore
+                if received_bytes_count == 0:
+                    raise ConnectionResetError('Connection closed by MiddleMan.')
+                self._frame_decoder.buffer_updated(received_bytes_count)
+        except socket.timeout:
+            raise MiddleManRequestTimeout(f'MiddleMan did not respond to request {request_id} in time.')
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+class MiddleManClient:
+    """
+    Thread-safe client keeping up to `pool_size` connections to MiddleMan. Threads wait for a free connection when
+    all of them are in use. Connections which fail are dropped. A request which failed because a connection reused
+    from the pool was closed is sent once more on a new one, so the client reconnects after MiddleMan restarts.
+    Signing the same data twice gives the same result, so repeating a request is safe.
+    """
+
+    def __init__(self, host: str, port: int, pool_size: int, timeout: float) -> None:
+        assert pool_size > 0
+        assert timeout > 0
+        self._host = host
+        self._port = port
+        self._timeout = timeout
+        self._connection_slots = BoundedSemaphore(pool_size)
+        self._idle_connections = LifoQueue()  # type: LifoQueue
+        self._pid = os.getpid()
+
+    def request(self, payload: bytes) -> bytes:
+        return self._send_request(MessageType.REQUEST, MessageType.RESPONSE, payload)
+
+    def batch_request(self, payloads: List[bytes]) -> List[bytes]:
+        """ Sends payloads in a single batch frame and returns responses in the same order. """
+        response_payload = self._send_request(MessageType.BATCH_REQUEST, MessageType.BATCH_RESPONSE, encode_batch_payload(payloads))
+        try:
+            responses = [item.tobytes() for item in decode_batch_payload(response_payload)]
+        except InvalidFrameError as exception:
+            raise MiddleManClientError(f'Invalid batch response: {exception}')
+        if len(responses) != len(payloads):
+            raise MiddleManClientError(f'Batch of {len(payloads)} requests answered with {len(responses)} responses.')
+        return responses
+
+    def close(self) -> None:
+        """ Closes idle connections. """
+        for connection in self._take_idle_connections():
+            connection.close()
+
+    def _send_request(self, message_type: MessageType, response_type: MessageType, payload: bytes) -> bytes:
+        with self._connection_slots:
+            try:
+                frame = self._send_request_over_pooled_connection(message_type, payload)
+            except (OSError, InvalidFrameError) as exception:
+                raise MiddleManClientError(f'Request to MiddleMan failed: {exception}')
+
+        if frame.message_type == MessageType.ERROR:
+            try:
+                (error_code, error_message) = decode_error_payload(frame.payload)
+            except InvalidFrameError as exception:
+                raise MiddleManClientError(str(exception))
+            raise MiddleManErrorResponse(error_code, error_message)
+        if frame.message_type != response_type:
+            raise MiddleManClientError(f'Unexpected response of type {frame.message_type.name}.')
+        # MiddleManConnection copies payloads out of the decoder's buffer.
+        assert isinstance(frame.payload, bytes)
+        return frame.payload
+
+    def _send_request_over_pooled_connection(self, message_type: MessageType, payload: bytes) -> Frame:
+        connection = self._get_idle_connection()
+        if connection is not None:
+            try:
+                frame = self._send_request_over_connection(connection, message_type, payload)
+            except ConnectionError as exception:
+                # MiddleMan may have been restarted since the connection was used last time.
+                logger.info(f'Connection to MiddleMan lost, reconnecting: {exception}')
+                connection = None
+        if connection is None:
+            connection = MiddleManConnection(self._host, self._port, self._timeout)
+            frame = self._send_request_over_connection(connection, message_type, payload)
+        self._idle_connections.put(connection)
+        return frame
+
+    @staticmethod
+    def _send_request_over_connection(connection: MiddleManConnection, message_type: MessageType, payload: bytes) -> Frame:
+        try:
+            return connection.send_request(message_type, payload)
+        except Exception:
+            # State of the connection is unknown, e.g. the response may still arrive, so it cannot be used any more.
+            connection.close()
+            raise
+
+    def _get_idle_connection(self) -> Optional[MiddleManConnection]:
+        # Connections opened before the process was forked, e.g. by Celery, belong to the parent process.
+        if self._pid != os.getpid():
+            self._take_idle_connections()
+            self._pid = os.getpid()
+        try:
+            return self._idle_connections.get_nowait()
+        except Empty:
+            return None
+
+    def _take_idle_connections(self) -> List[MiddleManConnection]:
+        connections = []
+        while True:
+            try:
+                connections.append(self._idle_connections.get_nowait())
+            except Empty:
+                return connections
@@ -1,24 +1,233 @@
+from bisect import bisect_left
+from collections import Counter
+from collections import defaultdict
 import asyncio
+import itertools
+import json
 import traceback
 from logging import getLogger
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+from typing import cast
 
 import signal
 
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import MAXIMUM_REQUEST_ID
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.frame import encode_error_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import encode_frame_header
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+from middleman.constants import DEFAULT_EXTERNAL_PORT
 from middleman.constants import DEFAULT_INTERNAL_PORT
+from middleman.constants import DEFAULT_MAXIMUM_PENDING_REQUESTS
+from middleman.constants import DEFAULT_MAXIMUM_PENDING_REQUESTS_PER_CONNECTION
+from middleman.constants import DEFAULT_REQUEST_TIMEOUT
+from middleman.constants import DEFAULT_STATS_INTERVAL
 from middleman.constants import ERROR_ADDRESS_ALREADY_IN_USE
+from middleman.constants import ERROR_RATE_SMOOTHING_FACTOR
+from middleman.constants import LATENCY_HISTOGRAM_BUCKETS
 from middleman.constants import LOCALHOST_IP
+from middleman.constants import MAXIMUM_FORWARDING_ATTEMPTS
+from middleman.constants import MINIMUM_SUCCESS_RATE
+from middleman.constants import RESPONSE_TIME_SMOOTHING_FACTOR
+from middleman.constants import STREAM_READ_SIZE
 
 logger = getLogger(__name__)
 crash_logger = getLogger('crash')
 
+# Frames which Concent clients may send. A batch counts as a single request towards limits of pending requests.
+REQUEST_MESSAGE_TYPES = frozenset({MessageType.REQUEST, MessageType.BATCH_REQUEST})
+
+
+class SigningServiceConnection:
+    """ Connection with one SigningService instance and counters used to balance requests between instances. """
+
+    __slots__ = (
+        'writer',
+        'remote_address',
+        'drain_lock',
+        'request_ids',
+        'responses_count',
+        'error_responses_count',
+        'timeouts_count',
+        'failed_requests_count',
+        'average_response_time',
+        'error_rate',
+    )
+
+    def __init__(self, writer: asyncio.StreamWriter, loop: asyncio.AbstractEventLoop) -> None:
+        self.writer = writer
+        self.remote_address = writer.get_extra_info('peername')
+        # Only one coroutine at a time may wait for the buffer of a StreamWriter to drain.
+        self.drain_lock = asyncio.Lock(loop=loop)
+        # IDs of requests forwarded over this connection and waiting for responses.
+        self.request_ids = set()  # type: Set[int]
+        self.responses_count = 0
+        self.error_responses_count = 0
+        self.timeouts_count = 0
+        # Number of requests which were waiting for responses when the connection was lost.
+        self.failed_requests_count = 0
+        # Moving average of seconds the instance takes to respond. A timeout counts as a response after the timeout.
+        self.average_response_time = 0.0
+        # Moving average of the share of responses which were errors or timeouts.
+        self.error_rate = 0.0
+
+    def record_response_time(self, response_time: float) -> None:
+        if self.responses_count + self.timeouts_count == 0:
+            self.average_response_time = response_time
+        else:
+            self.average_response_time += RESPONSE_TIME_SMOOTHING_FACTOR * (response_time - self.average_response_time)
+
+    def record_response_status(self, is_failed: bool) -> None:
+        self.error_rate += ERROR_RATE_SMOOTHING_FACTOR * (float(is_failed) - self.error_rate)
+
+    def get_weighted_load(self) -> float:
+        """
+        Returns the number of requests waiting for the instance, including a new one, divided by the share of its
+        recent responses which did not fail. Otherwise an instance answering every request with an error straight away
+        would always have the fewest pending requests and would receive most of them.
+        """
+        return (len(self.request_ids) + 1) / max(1.0 - self.error_rate, MINIMUM_SUCCESS_RATE)
+
+
+# Request forwarded to SigningService and waiting for the response. Requests are forwarded under IDs assigned by
+# MiddleMan, because IDs chosen by different Concent clients may collide. The payload is kept, so that the request
+# can be forwarded to another instance if the one handling it disconnects.
+PendingRequest = NamedTuple('PendingRequest', [
+    ('client_writer', asyncio.StreamWriter),
+    ('client_request_id', int),
+    ('message_type', MessageType),
+    ('payload', bytes),
+    ('timeout_handle', asyncio.Handle),
+    ('signing_service', SigningServiceConnection),
+    # Time when the request was received from the client and when it was forwarded to the current instance.
+    ('received_at', float),
+    ('forwarded_at', float),
+    ('forwarding_attempts', int),
+])
+
+QueueStats = NamedTuple('QueueStats', [
+    # Number of requests waiting for SigningService to respond.
+    ('queue_depth', int),
+    # Seconds the oldest of these requests has been waiting.
+    ('longest_wait_time', float),
+    # Average number of seconds requests waited for responses, over all responses received so far.
+    ('average_wait_time', float),
+    # Number of requests rejected because limits of pending requests were reached.
+    ('rejected_requests', int),
+])
+
+
+class LatencyHistogram:
+    """ Numbers of latencies falling into each of the LATENCY_HISTOGRAM_BUCKETS and longer ones. """
+
+    __slots__ = ('counts',)
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(LATENCY_HISTOGRAM_BUCKETS) + 1)
+
+    def record(self, latency: float) -> None:
+        self.counts[bisect_left(LATENCY_HISTOGRAM_BUCKETS, latency)] += 1
+
+    def to_dict(self) -> Dict[str, int]:
+        bucket_names = [f'<={bound}' for bound in LATENCY_HISTOGRAM_BUCKETS] + [f'>{LATENCY_HISTOGRAM_BUCKETS[-1]}']
+        return dict(zip(bucket_names, self.counts))
+
+
+SigningServiceStats = NamedTuple('SigningServiceStats', [
+    ('remote_address', tuple),
+    # Number of requests waiting for this instance to respond.
+    ('outstanding_requests', int),
+    ('responses', int),
+    # Number of responses which were errors, e.g. for invalid requests.
+    ('error_responses', int),
+    ('timeouts', int),
+    # Number of requests which were waiting for responses when the instance disconnected.
+    ('failed_requests', int),
+    # Moving average of seconds the instance takes to respond.
+    ('average_response_time', float),
+    # Moving average of the share of responses which were errors or timeouts.
+    ('error_rate', float),
+    # Number of bytes waiting in the buffer of the connection to be sent to the instance.
+    ('write_buffer_size', int),
+])
+
 
 class MiddleMan:
-    def __init__(self, bind_address=None, internal_port=None, loop=None):
+    """
+    Bridges Concent clients connecting to the internal port with SigningService, which connects to the external port.
+    Several SigningService instances may be connected at once. Each request is forwarded to the instance with
+    the fewest requests waiting for responses, weighted by the share of its recent responses which did not fail, or
+    with the shortest response times if there is a tie. Responses are routed back to the clients as they arrive,
+    in any order.
+
+    Connections to the external port are not authenticated: whoever connects receives the requests of Concent
+    to sign. The port must be reachable only by SigningService, e.g. by restricting it with a firewall or with
+    `signing_service_allowed_addresses`. `external_bind_address` allows it to listen on another interface than
+    the internal port, which must never be exposed.
+    """
+
+    def __init__(
+        self,
+        bind_address=None,
+        internal_port=None,
+        external_port=None,
+        request_timeout=None,
+        maximum_pending_requests=None,
+        maximum_pending_requests_per_connection=None,
+        stats_interval=None,
+        external_bind_address=None,
+        signing_service_allowed_addresses=None,
+        loop=None,
+    ):
         self._bind_address = bind_address if bind_address is not None else LOCALHOST_IP
+        self._external_bind_address = external_bind_address if external_bind_address is not None else self._bind_address
+        # IP addresses SigningService may connect from, or None if connections from any address are accepted.
+        self._signing_service_allowed_addresses = (
+            frozenset(signing_service_allowed_addresses) if signing_service_allowed_addresses is not None else None
+        )  # type: Optional[frozenset]
         self._internal_port = internal_port if internal_port is not None else DEFAULT_INTERNAL_PORT
+        self._external_port = external_port if external_port is not None else DEFAULT_EXTERNAL_PORT
+        self._request_timeout = request_timeout if request_timeout is not None else DEFAULT_REQUEST_TIMEOUT
+        self._maximum_pending_requests = (
+            maximum_pending_requests if maximum_pending_requests is not None else DEFAULT_MAXIMUM_PENDING_REQUESTS
+        )
+        self._maximum_pending_requests_per_connection = (
+            maximum_pending_requests_per_connection
+            if maximum_pending_requests_per_connection is not None else
+            DEFAULT_MAXIMUM_PENDING_REQUESTS_PER_CONNECTION
+        )
+        self._stats_interval = stats_interval if stats_interval is not None else DEFAULT_STATS_INTERVAL
         self._server_for_concent = None
+        self._server_for_signing_service = None
+        self._stats_handle = None  # type: Optional[asyncio.Handle]
         self._loop = loop if loop is not None else asyncio.get_event_loop()
 
+        self._signing_services = []  # type: List[SigningServiceConnection]
+        self._pending_requests = {}  # type: Dict[int, PendingRequest]
+        self._pending_requests_per_client = Counter()  # type: Counter
+        self._responses_count = 0
+        self._total_wait_time = 0.0
+        self._rejected_requests_count = 0
+        # Latencies of responses, as seen by clients, by type of request.
+        self._latency_histograms = defaultdict(LatencyHistogram)  # type: Dict[MessageType, LatencyHistogram]
+        self._bytes_received_from_clients = 0
+        self._bytes_sent_to_clients = 0
+        self._bytes_received_from_signing_services = 0
+        self._bytes_sent_to_signing_services = 0
+        self._signing_service_connections_count = 0
+        self._signing_service_disconnections_count = 0
+        self._request_id_generator = itertools.cycle(range(MAXIMUM_REQUEST_ID + 1))
+
         # Handle shutdown signal.
         self._loop.add_signal_handler(signal.SIGTERM, self._terminate_connections)
 
@@ -52,12 +261,13 @@ class MiddleMan:
             self._start_middleman()
         except OSError as exception:
             logger.error(
-                f"Exception <OSError> occurred while starting MiddleMan server for Concent: {str(exception)}"
+                f"Exception <OSError> occurred while starting MiddleMan servers: {str(exception)}"
             )
             exit(ERROR_ADDRESS_ALREADY_IN_USE)
         try:
             # Serve requests until Ctrl+C is pressed
             logger.info('MiddleMan is serving on {}'.format(self._server_for_concent.sockets[0].getsockname()))
+            logger.info('MiddleMan is waiting for SigningService on {}'.format(self._server_for_signing_service.sockets[0].getsockname()))
             self._run_forever()
         except KeyboardInterrupt:
             logger.info("Ctrl-C has been pressed.")
@@ -71,35 +281,299 @@ class MiddleMan:
         self._loop.run_forever()
 
     def _start_middleman(self) -> None:
-        server_coroutine = asyncio.start_server(
+        concent_server_coroutine = asyncio.start_server(
             self._handle_user_request,
             self._bind_address,
             self._internal_port,
             loop=self._loop
         )
-        self._server_for_concent = self._loop.run_until_complete(server_coroutine)
+        self._server_for_concent = self._loop.run_until_complete(concent_server_coroutine)
+        signing_service_server_coroutine = asyncio.start_server(
+            self._handle_signing_service_connection,
+            self._external_bind_address,
+            self._external_port,
+            loop=self._loop
+        )
+        self._server_for_signing_service = self._loop.run_until_complete(signing_service_server_coroutine)
+        if self._stats_interval > 0:
+            self._stats_handle = self._loop.call_later(self._stats_interval, self._log_stats)
 
     def _close_middleman(self) -> None:
-        self._server_for_concent.close()
-        self._loop.run_until_complete(self._server_for_concent.wait_closed())
+        if self._stats_handle is not None:
+            self._stats_handle.cancel()
+        for server in [self._server_for_concent, self._server_for_signing_service]:
+            server.close()
+            self._loop.run_until_complete(server.wait_closed())
         self._loop.close()
 
-    async def _handle_user_request(self, reader, writer) -> None:
+    async def _handle_user_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Forwards every request received over the connection to SigningService until the client closes it. """
+        frame_decoder = FrameDecoder()
+        remote_address = writer.get_extra_info('peername')
         try:
-            data = await reader.readuntil()
-            remote_address = writer.get_extra_info('peername')
-            print("Received %r from %r" % (data, remote_address))
-            await self._respond_to_user(data, writer)
+            while True:
+                data = await reader.read(STREAM_READ_SIZE)
+                if data == b'':
+                    break
+                self._bytes_received_from_clients += len(data)
+                frame_decoder.feed(data)
+                for frame in frame_decoder.read_frames():
+                    await self._respond_to_user(frame, writer)
+                # Responses are written without waiting, so the connection is not read any further until the client
+                # receives them.
+                await writer.drain()
+        except InvalidFrameError as exception:
+            logger.warning(f"Closing connection from {remote_address} after receiving invalid frame: {exception}")
         except Exception as exception:  # pylint: disable=broad-except
             crash_logger.error(
                 f"Exception occurred: {exception}, Traceback: {traceback.format_exc()}"
             )
             raise
+        finally:
+            self._forget_requests_of_client(writer)
+            writer.close()
+
+    async def _respond_to_user(self, frame: Frame, writer: asyncio.StreamWriter) -> None:
+        """
+        Forwards the request to SigningService. The response is sent to the user when it arrives. If the request
+        cannot be forwarded, the user gets an error straight away.
+        """
+        if frame.message_type not in REQUEST_MESSAGE_TYPES:
+            self._send_error(writer, frame.request_id, ErrorCode.INVALID_REQUEST, f"Unexpected message type {frame.message_type.name}.")
+            return
+
+        if len(self._signing_services) == 0:
+            self._send_error(writer, frame.request_id, ErrorCode.SIGNING_SERVICE_UNAVAILABLE, "SigningService is not connected.")
+            return
+
+        if (
+            len(self._pending_requests) >= self._maximum_pending_requests or
+            self._pending_requests_per_client[writer] >= self._maximum_pending_requests_per_connection
+        ):
+            self._rejected_requests_count += 1
+            logger.warning(
+                f"Request rejected, {len(self._pending_requests)} requests are pending, "
+                f"{self._pending_requests_per_client[writer]} of them from this connection."
+            )
+            self._send_error(writer, frame.request_id, ErrorCode.TOO_MANY_REQUESTS, "Too many pending requests, try again later.")
+            return
+
+        request_id = self._get_next_request_id()
+        signing_service = self._choose_signing_service()
+        self._forward_request(
+            request_id,
+            PendingRequest(
+                client_writer=writer,
+                client_request_id=frame.request_id,
+                message_type=frame.message_type,
+                # Payload refers to the buffer of the frame decoder, which is reused when more data is read.
+                payload=memoryview(frame.payload).tobytes(),
+                timeout_handle=self._loop.call_later(self._request_timeout, self._time_out_request, request_id),
+                signing_service=signing_service,
+                received_at=self._loop.time(),
+                forwarded_at=self._loop.time(),
+                forwarding_attempts=1,
+            )
+        )
+        self._pending_requests_per_client[writer] += 1
+        try:
+            async with signing_service.drain_lock:
+                await signing_service.writer.drain()
+        except ConnectionError:
+            # Requests waiting for the lost instance are forwarded to other ones when its connection is closed.
+            pass
+
+    def _choose_signing_service(self) -> SigningServiceConnection:
+        return min(
+            self._signing_services,
+            key=lambda signing_service: (signing_service.get_weighted_load(), signing_service.average_response_time),
+        )
+
+    def _forward_request(self, request_id: int, pending_request: PendingRequest) -> None:
+        self._pending_requests[request_id] = pending_request
+        pending_request.signing_service.request_ids.add(request_id)
+        frame_header = encode_frame_header(request_id, pending_request.message_type, pending_request.payload)
+        pending_request.signing_service.writer.writelines([frame_header, pending_request.payload])
+        self._bytes_sent_to_signing_services += len(frame_header) + len(pending_request.payload)
+
+    def get_queue_stats(self) -> QueueStats:
+        current_time = self._loop.time()
+        return QueueStats(
+            queue_depth=len(self._pending_requests),
+            longest_wait_time=max(
+                (current_time - pending_request.received_at for pending_request in self._pending_requests.values()),
+                default=0.0,
+            ),
+            average_wait_time=self._total_wait_time / self._responses_count if self._responses_count > 0 else 0.0,
+            rejected_requests=self._rejected_requests_count,
+        )
+
+    def get_signing_service_stats(self) -> List[SigningServiceStats]:
+        return [
+            SigningServiceStats(
+                remote_address=signing_service.remote_address,
+                outstanding_requests=len(signing_service.request_ids),
+                responses=signing_service.responses_count,
+                error_responses=signing_service.error_responses_count,
+                timeouts=signing_service.timeouts_count,
+                failed_requests=signing_service.failed_requests_count,
+                average_response_time=signing_service.average_response_time,
+                error_rate=signing_service.error_rate,
+                # Transports of connections accepted by the server are always writable.
+                write_buffer_size=cast(asyncio.WriteTransport, signing_service.writer.transport).get_write_buffer_size(),
+            )
+            for signing_service in self._signing_services
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ Returns statistics of MiddleMan which can be serialized to JSON. """
+        return {
+            'signing_services': [signing_service_stats._asdict() for signing_service_stats in self.get_signing_service_stats()],
+            'signing_service_connections': self._signing_service_connections_count,
+            'signing_service_disconnections': self._signing_service_disconnections_count,
+            'queue': self.get_queue_stats()._asdict(),
+            'latency_histograms': {
+                message_type.name: latency_histogram.to_dict()
+                for (message_type, latency_histogram) in self._latency_histograms.items()
+            },
+            'bytes_received_from_clients': self._bytes_received_from_clients,
+            'bytes_sent_to_clients': self._bytes_sent_to_clients,
+            'bytes_received_from_signing_services': self._bytes_received_from_signing_services,
+            'bytes_sent_to_signing_services': self._bytes_sent_to_signing_services,
+        }
+
+    def _log_stats(self) -> None:
+        logger.info(f"MiddleMan stats: {json.dumps(self.get_stats())}")
+        self._stats_handle = self._loop.call_later(self._stats_interval, self._log_stats)
+
+    async def _handle_signing_service_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Routes responses received from a SigningService instance to the users waiting for them. When the connection
+        is lost, requests waiting for its responses are forwarded to other instances.
+        """
+        remote_address = writer.get_extra_info('peername')
+        if self._signing_service_allowed_addresses is not None and remote_address[0] not in self._signing_service_allowed_addresses:
+            logger.warning(f"Rejecting connection to the SigningService port from {remote_address}, which is not an allowed address.")
+            writer.close()
+            return
+
+        signing_service = SigningServiceConnection(writer, self._loop)
+        logger.info(f"SigningService connected from {signing_service.remote_address}.")
+        self._signing_services.append(signing_service)
+        self._signing_service_connections_count += 1
+
+        frame_decoder = FrameDecoder()
+        try:
+            while True:
+                data = await reader.read(STREAM_READ_SIZE)
+                if data == b'':
+                    break
+                self._bytes_received_from_signing_services += len(data)
+                frame_decoder.feed(data)
+                for frame in frame_decoder.read_frames():
+                    if frame.message_type != MessageType.HEARTBEAT:
+                        self._route_response(frame, signing_service)
+        except InvalidFrameError as exception:
+            logger.warning(f"Closing connection from SigningService {signing_service.remote_address} after receiving invalid frame: {exception}")
+        except ConnectionError as exception:
+            logger.warning(f"Connection from SigningService {signing_service.remote_address} lost: {exception}")
+        except Exception as exception:  # pylint: disable=broad-except
+            crash_logger.error(
+                f"Exception occurred: {exception}, Traceback: {traceback.format_exc()}"
+            )
+            raise
+        finally:
+            logger.info(f"SigningService {signing_service.remote_address} disconnected.")
+            self._signing_service_disconnections_count += 1
+            self._disconnect_signing_service(signing_service)
+
+    def _route_response(self, frame: Frame, signing_service: SigningServiceConnection) -> None:
+        if frame.request_id not in signing_service.request_ids:
+            logger.warning(f"Response to request {frame.request_id} which is not pending received from SigningService.")
+            return
+
+        pending_request = self._pop_pending_request(frame.request_id)
+        response_time = self._loop.time() - pending_request.forwarded_at
+        signing_service.record_response_time(response_time)
+        signing_service.record_response_status(frame.message_type == MessageType.ERROR)
+        signing_service.responses_count += 1
+        if frame.message_type == MessageType.ERROR:
+            signing_service.error_responses_count += 1
+        wait_time = self._loop.time() - pending_request.received_at
+        self._latency_histograms[pending_request.message_type].record(wait_time)
+        self._responses_count += 1
+        self._total_wait_time += wait_time
+        frame_header = encode_frame_header(pending_request.client_request_id, frame.message_type, frame.payload)
+        # Stubs accept only bytes, but transports also send memoryviews, so the payload is not copied.
+        pending_request.client_writer.writelines([frame_header, frame.payload])  # type: ignore
+        self._bytes_sent_to_clients += len(frame_header) + len(frame.payload)
+
+    def _time_out_request(self, request_id: int) -> None:
+        pending_request = self._pop_pending_request(request_id)
+        pending_request.signing_service.record_response_time(self._loop.time() - pending_request.forwarded_at)
+        pending_request.signing_service.record_response_status(True)
+        pending_request.signing_service.timeouts_count += 1
+        self._send_error(
+            pending_request.client_writer,
+            pending_request.client_request_id,
+            ErrorCode.REQUEST_TIMEOUT,
+            f"SigningService did not respond within {self._request_timeout} seconds.",
+        )
+
+    def _disconnect_signing_service(self, signing_service: SigningServiceConnection) -> None:
+        """
+        Closes connection with a SigningService instance. Requests waiting for its responses are forwarded to other
+        instances and fail if there are none or if they have already been forwarded too many times.
+        """
+        self._signing_services.remove(signing_service)
+        signing_service.writer.close()
+        signing_service.failed_requests_count += len(signing_service.request_ids)
+        for request_id in sorted(signing_service.request_ids):
+            pending_request = self._pending_requests[request_id]
+            if len(self._signing_services) > 0 and pending_request.forwarding_attempts < MAXIMUM_FORWARDING_ATTEMPTS:
+                self._forward_request(
+                    request_id,
+                    pending_request._replace(
+                        signing_service=self._choose_signing_service(),
+                        forwarded_at=self._loop.time(),
+                        forwarding_attempts=pending_request.forwarding_attempts + 1,
+                    )
+                )
+            else:
+                self._pop_pending_request(request_id)
+                self._send_error(
+                    pending_request.client_writer,
+                    pending_request.client_request_id,
+                    ErrorCode.SIGNING_SERVICE_DISCONNECTED,
+                    "SigningService disconnected before responding.",
+                )
+        signing_service.request_ids.clear()
+
+    def _forget_requests_of_client(self, writer: asyncio.StreamWriter) -> None:
+        for (request_id, pending_request) in list(self._pending_requests.items()):
+            if pending_request.client_writer is writer:
+                self._pop_pending_request(request_id)
+
+    def _pop_pending_request(self, request_id: int) -> PendingRequest:
+        pending_request = self._pending_requests.pop(request_id)
+        pending_request.timeout_handle.cancel()
+        pending_request.signing_service.request_ids.discard(request_id)
+        self._pending_requests_per_client[pending_request.client_writer] -= 1
+        if self._pending_requests_per_client[pending_request.client_writer] == 0:
+            del self._pending_requests_per_client[pending_request.client_writer]
+        return pending_request
+
+    def _get_next_request_id(self) -> int:
+        # IDs wrap around, so an ID may still be used by a request which has not finished.
+        request_id = next(self._request_id_generator)
+        while request_id in self._pending_requests:
+            request_id = next(self._request_id_generator)
+        return request_id
 
-    async def _respond_to_user(self, data: bytes, writer: asyncio.StreamWriter) -> None:  # pylint: disable=no-self-use
-        writer.write(data)
-        await writer.drain()
-        writer.close()
+    def _send_error(self, writer: asyncio.StreamWriter, request_id: int, error_code: ErrorCode, error_message: str) -> None:
+        frame = encode_frame(request_id, MessageType.ERROR, encode_error_payload(error_code, error_message))
+        writer.write(frame)
+        self._bytes_sent_to_clients += len(frame)
 
     def _terminate_connections(self) -> None:
         logger.info('SIGTERM received - closing connections and exiting.')
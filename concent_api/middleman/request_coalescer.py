@@ -0,0 +1,87 @@
+from threading import Event
+from threading import Lock
+from typing import Callable
+from typing import List
+
+from mypy.types import Optional
+
+from middleman_protocol.constants import MAXIMUM_BATCH_SIZE
+
+
+class _Batch:
+
+    __slots__ = (
+        'payloads',
+        'results',
+        'exception',
+        'is_full',
+        'is_done',
+    )
+
+    def __init__(self) -> None:
+        self.payloads = []  # type: List[bytes]
+        self.results = []  # type: List[bytes]
+        self.exception = None  # type: Optional[Exception]
+        self.is_full = Event()
+        self.is_done = Event()
+
+
+class RequestCoalescer:
+    """
+    Combines requests submitted concurrently by different threads into batches sent with a single call of
+    `send_batch`, so that sending many requests does not take a round trip for each of them.
+
+    The first thread submitting a request to a new batch waits up to `batch_window` seconds, or until the batch is
+    full, for other requests to join. It then sends the batch itself and hands results to the other threads,
+    so no background thread is needed. An exception raised by `send_batch` is raised in all threads of the batch.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[bytes]], List[bytes]],
+        batch_window: float,
+        maximum_batch_size: int=MAXIMUM_BATCH_SIZE,
+    ) -> None:
+        assert batch_window >= 0
+        assert 0 < maximum_batch_size <= MAXIMUM_BATCH_SIZE
+        self._send_batch = send_batch
+        self._batch_window = batch_window
+        self._maximum_batch_size = maximum_batch_size
+        self._lock = Lock()
+        self._open_batch = None  # type: Optional[_Batch]
+
+    def submit(self, payload: bytes) -> bytes:
+        """ Returns result for the payload once the batch containing it is sent. """
+        with self._lock:
+            batch = self._open_batch
+            is_first_in_batch = batch is None
+            if batch is None:
+                batch = self._open_batch = _Batch()
+            index = len(batch.payloads)
+            batch.payloads.append(payload)
+            if len(batch.payloads) >= self._maximum_batch_size:
+                self._open_batch = None
+                batch.is_full.set()
+
+        if is_first_in_batch:
+            self._send(batch)
+        else:
+            batch.is_done.wait()
+
+        if batch.exception is not None:
+            raise batch.exception
+        return batch.results[index]
+
+    def _send(self, batch: _Batch) -> None:
+        batch.is_full.wait(self._batch_window)
+        with self._lock:
+            if self._open_batch is batch:
+                self._open_batch = None
+
+        try:
+            batch.results = self._send_batch(batch.payloads)
+            assert len(batch.results) == len(batch.payloads)
+        except Exception as exception:  # pylint: disable=broad-except
+            batch.exception = exception
+        finally:
+            batch.is_done.set()
@@ -0,0 +1,62 @@
+import pytest
+
+from middleman.benchmark import run_middleman_benchmark
+
+
+# Number of requests sent in a benchmark run, divided equally between clients.
+BENCHMARK_REQUESTS_COUNT = 20000
+
+# Number of seconds a simulated SigningService waits before reconnecting, like SigningService after the first failure.
+BENCHMARK_RECONNECT_DELAY = 1
+
+
+def report(capsys, benchmark_result):
+    with capsys.disabled():
+        print(
+            f'\n{benchmark_result.signing_services_count} SigningService instances, '
+            f'{benchmark_result.clients_count} clients, '
+            f'{benchmark_result.signing_latency * 1000:.0f} ms signing latency: '
+            f'{benchmark_result.requests_per_second:,.0f} requests/s, latency ' +
+            ', '.join(
+                f'p{percentile} {latency * 1000:.2f} ms'
+                for (percentile, latency) in benchmark_result.latency_percentiles.items()
+            ) +
+            f', peak RSS {benchmark_result.peak_rss / (1024 * 1024):.1f} MiB, '
+            f'reconnect recovery {benchmark_result.reconnect_recovery_time:.3f} s'
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize(('signing_services_count', 'clients_count', 'signing_latency'), [
+    (1, 1, 0),
+    (1, 10, 0),
+    (1, 100, 0),
+    (1, 100, 0.01),
+    (4, 100, 0.01),
+    (4, 500, 0.01),
+])
+def test_signing_throughput_and_latency(capsys, signing_services_count, clients_count, signing_latency):
+    benchmark_result = run_middleman_benchmark(
+        signing_services_count=signing_services_count,
+        clients_count=clients_count,
+        requests_per_client=BENCHMARK_REQUESTS_COUNT // clients_count,
+        signing_latency=signing_latency,
+        reconnect_delay=BENCHMARK_RECONNECT_DELAY,
+    )
+
+    assert benchmark_result.errors_count == 0
+    report(capsys, benchmark_result)
+
+
+def test_that_benchmark_answers_all_requests_and_measures_recovery():
+    benchmark_result = run_middleman_benchmark(
+        signing_services_count=2,
+        clients_count=3,
+        requests_per_client=10,
+        signing_latency=0,
+        reconnect_delay=0.1,
+    )
+
+    assert benchmark_result.responses_count == 30
+    assert benchmark_result.errors_count == 0
+    assert benchmark_result.reconnect_recovery_time >= 0.1
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import os
 import signal
 import socket
@@ -9,7 +10,18 @@ from assertpy import assert_that
 import mock
 import pytest
 
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import MessageType
+from middleman_protocol.constants import RETRIABLE_ERROR_CODES
+from middleman_protocol.frame import decode_error_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+from middleman.constants import DEFAULT_EXTERNAL_PORT
 from middleman.constants import DEFAULT_INTERNAL_PORT
+from middleman.constants import DEFAULT_REQUEST_TIMEOUT
 from middleman.constants import ERROR_ADDRESS_ALREADY_IN_USE
 from middleman.constants import LOCALHOST_IP
 from middleman.middleman_server import MiddleMan
@@ -21,12 +33,20 @@ class Connections():
 
 
 def assert_connection(port, delay, connection_counter):
-    message = "hello\n"
     fake_client = socket.socket()
-    send_data(fake_client, message, port, delay)
-    data = fake_client.recv(1024)
+    send_data(fake_client, encode_frame(1, MessageType.REQUEST, b"hello") + encode_frame(2, MessageType.REQUEST, b"Oi!"), port, delay)
+    frame_decoder = FrameDecoder()
+    frames = []
+    while len(frames) < 2:
+        frame_decoder.feed(fake_client.recv(1024))
+        frames += [frame._replace(payload=bytes(frame.payload)) for frame in frame_decoder.read_frames()]
     fake_client.close()
-    assert_that(data.decode()).is_equal_to(message)
+    # SigningService is not connected, so both requests fail straight away.
+    assert_that([(frame.request_id, frame.message_type) for frame in frames]).is_equal_to([
+        (1, MessageType.ERROR),
+        (2, MessageType.ERROR),
+    ])
+    assert_that(decode_error_payload(frames[0].payload)[0]).is_equal_to(ErrorCode.SIGNING_SERVICE_UNAVAILABLE)
     connection_counter.counter += 1
 
 
@@ -34,7 +54,18 @@ def send_data(fake_client, message, port, delay):
     time.sleep(delay)
     fake_client.settimeout(1)
     fake_client.connect((LOCALHOST_IP, port))
-    fake_client.send(message.encode())
+    fake_client.send(message)
+
+
+async def read_frames(reader, count):
+    frame_decoder = FrameDecoder()
+    frames = []
+    while len(frames) < count:
+        data = await reader.read(1024)
+        assert_that(data).is_not_empty()
+        frame_decoder.feed(data)
+        frames += [frame._replace(payload=bytes(frame.payload)) for frame in frame_decoder.read_frames()]
+    return frames
 
 
 def trigger_signal(pid, delay):
@@ -66,7 +97,11 @@ class TestMiddleManInitialization:
         middleman = MiddleMan()
 
         assert_that(middleman._bind_address).is_equal_to(LOCALHOST_IP)
+        assert_that(middleman._external_bind_address).is_equal_to(LOCALHOST_IP)
+        assert_that(middleman._signing_service_allowed_addresses).is_none()
         assert_that(middleman._internal_port).is_equal_to(DEFAULT_INTERNAL_PORT)
+        assert_that(middleman._external_port).is_equal_to(DEFAULT_EXTERNAL_PORT)
+        assert_that(middleman._request_timeout).is_equal_to(DEFAULT_REQUEST_TIMEOUT)
         assert_that(middleman._loop).is_equal_to(asyncio.get_event_loop())
 
 
@@ -81,37 +116,37 @@ class TestMiddleManServer:
     def teardown_method(self):
         self.patcher.stop()
 
-    def test_that_if_keyboard_interrupt_is_raised_application_will_exit_without_errors(self, unused_tcp_port, event_loop):
+    def test_that_if_keyboard_interrupt_is_raised_application_will_exit_without_errors(self, unused_tcp_port, event_loop, unused_tcp_port_factory):
         with pytest.raises(SystemExit) as exception_wrapper:
-            middleman = MiddleMan(internal_port=unused_tcp_port, loop=event_loop)
+            middleman = MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop)
             with mock.patch.object(middleman, "_run_forever", side_effect=KeyboardInterrupt):
                 middleman.run()
         assert_that(exception_wrapper.value.code).is_equal_to(None)
         self.crash_logger_mock.assert_not_called()
 
     @mock.patch("middleman.middleman_server.asyncio.start_server", side_effect=OSError)
-    def test_that_if_chosen_port_is_already_used_application_will_exit_with_error_status(self,  _start_server_mock, unused_tcp_port, event_loop):
+    def test_that_if_chosen_port_is_already_used_application_will_exit_with_error_status(self,  _start_server_mock, unused_tcp_port, event_loop, unused_tcp_port_factory):
         with pytest.raises(SystemExit) as exception_wrapper:
-            MiddleMan(internal_port=unused_tcp_port, loop=event_loop).run()
+            MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop).run()
         assert_that(exception_wrapper.value.code).is_equal_to(ERROR_ADDRESS_ALREADY_IN_USE)
         self.crash_logger_mock.assert_not_called()
 
-    def test_that_if_sigterm_is_sent_application_will_exit_without_errors(self, unused_tcp_port, event_loop):
+    def test_that_if_sigterm_is_sent_application_will_exit_without_errors(self, unused_tcp_port, event_loop, unused_tcp_port_factory):
         schedule_sigterm(delay=1)
         with pytest.raises(SystemExit) as exception_wrapper:
-            MiddleMan(internal_port=unused_tcp_port, loop=event_loop).run()
+            MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop).run()
         assert_that(exception_wrapper.value.code).is_equal_to(None)
         self.crash_logger_mock.assert_not_called()
 
-    def test_that_crash_of_the_server_is_reported_to_sentry(self, unused_tcp_port, event_loop):
-        middleman = MiddleMan(internal_port=unused_tcp_port, loop=event_loop)
+    def test_that_crash_of_the_server_is_reported_to_sentry(self, unused_tcp_port, event_loop, unused_tcp_port_factory):
+        middleman = MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop)
         error_message = "Unrecoverable error"
         with mock.patch.object(middleman, "_run_forever", side_effect=Exception(error_message)):
             middleman.run()
         self.crash_logger_mock.error.assert_called_once()
         assert_that(self.crash_logger_mock.error.mock_calls[0][1][0]).contains(error_message)
 
-    def test_that_server_accepts_connections_and_sends_data_back(self, event_loop, unused_tcp_port):
+    def test_that_server_accepts_connections_and_responds_with_error_if_signing_service_is_not_connected(self, event_loop, unused_tcp_port, unused_tcp_port_factory):
         timeout = 2
         short_delay = 0.5
         schedule_sigterm(delay=timeout)
@@ -120,22 +155,22 @@ class TestMiddleManServer:
         client_thread.start()
 
         with pytest.raises(SystemExit) as exception_wrapper:
-            MiddleMan(internal_port=unused_tcp_port, loop=event_loop).run()
+            MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop).run()
 
         client_thread.join(timeout)
         assert_that(exception_wrapper.value.code).is_equal_to(None)
         self.crash_logger_mock.assert_not_called()
         assert_that(connections.counter).is_equal_to(1)
 
-    def test_that_broken_connection_is_reported_to_sentry(self, event_loop, unused_tcp_port):
+    def test_that_broken_connection_is_reported_to_sentry(self, event_loop, unused_tcp_port, unused_tcp_port_factory):
         timeout = 2
         short_delay = 0.5
         schedule_sigterm(delay=timeout)
         fake_client = socket.socket()
-        client_thread = get_client_thread(send_data, fake_client, "Oi!\n", unused_tcp_port, short_delay)
+        client_thread = get_client_thread(send_data, fake_client, encode_frame(1, MessageType.REQUEST, b"Oi!"), unused_tcp_port, short_delay)
         client_thread.start()
 
-        middleman = MiddleMan(internal_port=unused_tcp_port, loop=event_loop)
+        middleman = MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop)
         error_message = "Connection_error"
 
         with mock.patch.object(middleman, "_respond_to_user", side_effect=Exception(error_message)):
@@ -145,3 +180,433 @@ class TestMiddleManServer:
         fake_client.close()
         self.crash_logger_mock.error.assert_called_once()
         assert_that(self.crash_logger_mock.error.mock_calls[0][1][0]).contains(error_message)
+
+    def test_that_connection_sending_invalid_frame_is_closed_without_reporting_to_sentry(self, event_loop, unused_tcp_port, unused_tcp_port_factory):
+        timeout = 2
+        short_delay = 0.5
+        schedule_sigterm(delay=timeout)
+        fake_client = socket.socket()
+        client_thread = get_client_thread(send_data, fake_client, b"hello\n" * 10, unused_tcp_port, short_delay)
+        client_thread.start()
+
+        with pytest.raises(SystemExit):
+            MiddleMan(internal_port=unused_tcp_port, external_port=unused_tcp_port_factory(), loop=event_loop).run()
+        client_thread.join(timeout)
+        data = fake_client.recv(1024)
+        fake_client.close()
+
+        assert_that(data).is_equal_to(b"")
+        self.crash_logger_mock.assert_not_called()
+
+
+class TestSigningServiceAllowedAddresses:
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, event_loop, unused_tcp_port_factory):
+        self.loop = event_loop
+        self.unused_tcp_port_factory = unused_tcp_port_factory
+
+    def _connect_signing_service(self, signing_service_allowed_addresses):
+        middleman = MiddleMan(
+            internal_port=self.unused_tcp_port_factory(),
+            external_port=self.unused_tcp_port_factory(),
+            signing_service_allowed_addresses=signing_service_allowed_addresses,
+            loop=self.loop,
+        )
+        middleman._start_middleman()
+
+        async def connect():
+            (reader, writer) = await asyncio.open_connection(LOCALHOST_IP, middleman._external_port, loop=self.loop)
+            # MiddleMan sends nothing to SigningService, so the read ends only if the connection is closed.
+            try:
+                is_closed = await asyncio.wait_for(reader.read(1), 0.2, loop=self.loop) == b''
+            except asyncio.TimeoutError:
+                is_closed = False
+            writer.close()
+            return (is_closed, len(middleman._signing_services))
+
+        try:
+            return self.loop.run_until_complete(connect())
+        finally:
+            middleman._close_middleman()
+
+    def test_that_signing_service_connecting_from_address_which_is_not_allowed_is_disconnected(self):
+        assert_that(self._connect_signing_service(['10.0.0.1'])).is_equal_to((True, 0))
+
+    def test_that_signing_service_connecting_from_allowed_address_is_accepted(self):
+        assert_that(self._connect_signing_service([LOCALHOST_IP])).is_equal_to((False, 1))
+
+
+class TestMiddleManRouting:
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, event_loop, unused_tcp_port_factory):
+        self.loop = event_loop
+        self.middleman = MiddleMan(
+            internal_port=unused_tcp_port_factory(),
+            external_port=unused_tcp_port_factory(),
+            request_timeout=0.5,
+            maximum_pending_requests=3,
+            maximum_pending_requests_per_connection=2,
+            loop=event_loop,
+        )
+        self.middleman._start_middleman()
+        with mock.patch("middleman.middleman_server.crash_logger") as self.crash_logger_mock:
+            yield
+        self.middleman._close_middleman()
+
+    async def _connect_client(self):
+        return await asyncio.open_connection(LOCALHOST_IP, self.middleman._internal_port, loop=self.loop)
+
+    async def _connect_signing_service(self):
+        signing_services_count = len(self.middleman._signing_services)
+        connection = await asyncio.open_connection(LOCALHOST_IP, self.middleman._external_port, loop=self.loop)
+        while len(self.middleman._signing_services) == signing_services_count:
+            await asyncio.sleep(0.01, loop=self.loop)
+        return connection
+
+    def test_that_responses_are_routed_to_clients_which_sent_requests_even_if_they_arrive_in_different_order(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (first_client_reader, first_client_writer) = await self._connect_client()
+            (second_client_reader, second_client_writer) = await self._connect_client()
+
+            first_client_writer.write(encode_frame(1, MessageType.REQUEST, b"first"))
+            forwarded_requests = await read_frames(signing_service_reader, 1)
+            second_client_writer.write(encode_frame(1, MessageType.REQUEST, b"second"))
+            forwarded_requests += await read_frames(signing_service_reader, 1)
+
+            assert_that(forwarded_requests[0].request_id).is_not_equal_to(forwarded_requests[1].request_id)
+            for request in reversed(forwarded_requests):
+                signing_service_writer.write(encode_frame(request.request_id, MessageType.RESPONSE, request.payload.upper()))
+
+            assert_that(await read_frames(first_client_reader, 1)).is_equal_to([Frame(1, MessageType.RESPONSE, b"FIRST")])
+            assert_that(await read_frames(second_client_reader, 1)).is_equal_to([Frame(1, MessageType.RESPONSE, b"SECOND")])
+            assert_that(self.middleman._pending_requests).is_empty()
+
+            for writer in [signing_service_writer, first_client_writer, second_client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+        self.crash_logger_mock.error.assert_not_called()
+
+    def test_that_client_receives_timeout_error_if_signing_service_does_not_respond_and_late_response_is_ignored(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(7, MessageType.REQUEST, b"hello"))
+            [request] = await read_frames(signing_service_reader, 1)
+            [error] = await read_frames(client_reader, 1)
+
+            assert_that(error.request_id).is_equal_to(7)
+            assert_that(error.message_type).is_equal_to(MessageType.ERROR)
+            assert_that(decode_error_payload(error.payload)[0]).is_equal_to(ErrorCode.REQUEST_TIMEOUT)
+
+            signing_service_writer.write(encode_frame(request.request_id, MessageType.RESPONSE, b"hello"))
+            client_writer.write(encode_frame(8, MessageType.REQUEST, b"Oi!"))
+            [request] = await read_frames(signing_service_reader, 1)
+            signing_service_writer.write(encode_frame(request.request_id, MessageType.RESPONSE, b"Oi!"))
+
+            assert_that(await read_frames(client_reader, 1)).is_equal_to([Frame(8, MessageType.RESPONSE, b"Oi!")])
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_pending_requests_fail_when_signing_service_disconnects(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            await read_frames(signing_service_reader, 1)
+            signing_service_writer.close()
+            [error] = await read_frames(client_reader, 1)
+
+            assert_that(error.request_id).is_equal_to(1)
+            assert_that(decode_error_payload(error.payload)[0]).is_equal_to(ErrorCode.SIGNING_SERVICE_DISCONNECTED)
+            assert_that(self.middleman._pending_requests).is_empty()
+            assert_that(self.middleman._signing_services).is_empty()
+
+            client_writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_requests_of_disconnected_client_are_forgotten(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (_client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            await read_frames(signing_service_reader, 1)
+            client_writer.close()
+            while self.middleman._pending_requests:
+                await asyncio.sleep(0.01, loop=self.loop)
+
+            signing_service_writer.close()
+
+        self.loop.run_until_complete(test())
+        self.crash_logger_mock.error.assert_not_called()
+
+    def test_that_frame_other_than_request_is_rejected(self):
+        async def test():
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.RESPONSE, b"hello"))
+            [error] = await read_frames(client_reader, 1)
+
+            assert_that(decode_error_payload(error.payload)[0]).is_equal_to(ErrorCode.INVALID_REQUEST)
+
+            client_writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_requests_over_per_connection_limit_are_rejected_with_retriable_error(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            for request_id in [1, 2, 3]:
+                client_writer.write(encode_frame(request_id, MessageType.REQUEST, b"hello"))
+            [error] = await read_frames(client_reader, 1)
+
+            assert_that(error.request_id).is_equal_to(3)
+            assert_that(decode_error_payload(error.payload)[0]).is_equal_to(ErrorCode.TOO_MANY_REQUESTS)
+            assert_that(RETRIABLE_ERROR_CODES).contains(ErrorCode.TOO_MANY_REQUESTS)
+
+            requests = await read_frames(signing_service_reader, 2)
+            signing_service_writer.write(encode_frame(requests[0].request_id, MessageType.RESPONSE, b"hello"))
+            await read_frames(client_reader, 1)
+            client_writer.write(encode_frame(4, MessageType.REQUEST, b"hello"))
+            [request] = await read_frames(signing_service_reader, 1)
+
+            assert_that(request.payload).is_equal_to(b"hello")
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_requests_over_global_limit_are_rejected(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            client_connections = [await self._connect_client() for _ in range(2)]
+
+            for (request_id, (_client_reader, client_writer)) in enumerate(client_connections * 2):
+                client_writer.write(encode_frame(request_id, MessageType.REQUEST, b"hello"))
+                if request_id < 3:
+                    await read_frames(signing_service_reader, 1)
+            [error] = await read_frames(client_connections[1][0], 1)
+
+            assert_that(error.request_id).is_equal_to(3)
+            assert_that(decode_error_payload(error.payload)[0]).is_equal_to(ErrorCode.TOO_MANY_REQUESTS)
+
+            for (_client_reader, client_writer) in client_connections:
+                client_writer.close()
+            signing_service_writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_queue_stats_report_pending_requests_wait_times_and_rejected_requests(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            for request_id in [1, 2, 3]:
+                client_writer.write(encode_frame(request_id, MessageType.REQUEST, b"hello"))
+            await read_frames(client_reader, 1)
+            requests = await read_frames(signing_service_reader, 2)
+            await asyncio.sleep(0.1, loop=self.loop)
+            signing_service_writer.write(encode_frame(requests[0].request_id, MessageType.RESPONSE, b"hello"))
+            await read_frames(client_reader, 1)
+
+            queue_stats = self.middleman.get_queue_stats()
+
+            assert_that(queue_stats.queue_depth).is_equal_to(1)
+            assert_that(queue_stats.longest_wait_time).is_greater_than_or_equal_to(0.1)
+            assert_that(queue_stats.average_wait_time).is_greater_than_or_equal_to(0.1)
+            assert_that(queue_stats.rejected_requests).is_equal_to(1)
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_heartbeats_from_signing_service_are_not_routed(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            [request] = await read_frames(signing_service_reader, 1)
+            signing_service_writer.write(
+                encode_frame(0, MessageType.HEARTBEAT, b"") +
+                encode_frame(request.request_id, MessageType.RESPONSE, b"hello")
+            )
+
+            assert_that(await read_frames(client_reader, 1)).is_equal_to([Frame(1, MessageType.RESPONSE, b"hello")])
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        with mock.patch("middleman.middleman_server.logger") as logger_mock:
+            self.loop.run_until_complete(test())
+        logger_mock.warning.assert_not_called()
+
+    def test_that_batch_request_is_forwarded_as_batch_and_batch_response_is_routed_back(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.BATCH_REQUEST, encode_batch_payload([b"first", b"second"])))
+            [request] = await read_frames(signing_service_reader, 1)
+
+            assert_that(request.message_type).is_equal_to(MessageType.BATCH_REQUEST)
+            assert_that(request.payload).is_equal_to(encode_batch_payload([b"first", b"second"]))
+
+            signing_service_writer.write(encode_frame(request.request_id, MessageType.BATCH_RESPONSE, request.payload))
+
+            assert_that(await read_frames(client_reader, 1)).is_equal_to([
+                Frame(1, MessageType.BATCH_RESPONSE, encode_batch_payload([b"first", b"second"])),
+            ])
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_requests_are_forwarded_to_signing_service_with_fewest_pending_requests(self):
+        async def test():
+            signing_service_connections = [await self._connect_signing_service() for _ in range(2)]
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"first") + encode_frame(2, MessageType.REQUEST, b"second"))
+            requests = [(await read_frames(reader, 1))[0] for (reader, _writer) in signing_service_connections]
+
+            assert_that(sorted(bytes(request.payload) for request in requests)).is_equal_to([b"first", b"second"])
+
+            for ((_reader, writer), request) in zip(signing_service_connections, requests):
+                writer.write(encode_frame(request.request_id, MessageType.RESPONSE, request.payload))
+            responses = await read_frames(client_reader, 2)
+
+            assert_that(sorted(responses)).is_equal_to([
+                Frame(1, MessageType.RESPONSE, b"first"),
+                Frame(2, MessageType.RESPONSE, b"second"),
+            ])
+            for signing_service_stats in self.middleman.get_signing_service_stats():
+                assert_that(signing_service_stats.outstanding_requests).is_equal_to(0)
+                assert_that(signing_service_stats.responses).is_equal_to(1)
+                assert_that(signing_service_stats.average_response_time).is_greater_than(0)
+
+            for (_reader, writer) in signing_service_connections + [(client_reader, client_writer)]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_requests_are_forwarded_to_busier_signing_service_when_idle_one_keeps_responding_with_errors(self):
+        async def test():
+            (working_reader, working_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"pending"))
+            await read_frames(working_reader, 1)
+            (failing_reader, failing_writer) = await self._connect_signing_service()
+
+            for request_id in range(2, 6):
+                client_writer.write(encode_frame(request_id, MessageType.REQUEST, b"failing"))
+                [request] = await read_frames(failing_reader, 1)
+                failing_writer.write(encode_frame(request.request_id, MessageType.ERROR, b"failure"))
+                assert_that(await read_frames(client_reader, 1)).is_equal_to([Frame(request_id, MessageType.ERROR, b"failure")])
+
+            client_writer.write(encode_frame(6, MessageType.REQUEST, b"working"))
+            [request] = await read_frames(working_reader, 1)
+
+            assert_that(request.payload).is_equal_to(b"working")
+            [working_stats, failing_stats] = self.middleman.get_signing_service_stats()
+            assert_that(working_stats.outstanding_requests).is_equal_to(2)
+            assert_that(working_stats.error_rate).is_equal_to(0)
+            assert_that(failing_stats.outstanding_requests).is_equal_to(0)
+            assert_that(failing_stats.error_responses).is_equal_to(4)
+            assert_that(failing_stats.error_rate).is_greater_than(0.5)
+
+            for writer in [working_writer, failing_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_request_pending_when_signing_service_disconnects_is_forwarded_to_another_one(self):
+        async def test():
+            (first_signing_service_reader, first_signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            [request] = await read_frames(first_signing_service_reader, 1)
+            (second_signing_service_reader, second_signing_service_writer) = await self._connect_signing_service()
+            first_signing_service_writer.close()
+            [forwarded_request] = await read_frames(second_signing_service_reader, 1)
+
+            assert_that(forwarded_request).is_equal_to(request)
+
+            second_signing_service_writer.write(encode_frame(forwarded_request.request_id, MessageType.RESPONSE, b"signed"))
+
+            assert_that(await read_frames(client_reader, 1)).is_equal_to([Frame(1, MessageType.RESPONSE, b"signed")])
+            assert_that(self.middleman._pending_requests).is_empty()
+            [signing_service_stats] = self.middleman.get_signing_service_stats()
+            assert_that(signing_service_stats.responses).is_equal_to(1)
+
+            for writer in [second_signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_timeouts_are_counted_for_signing_service_which_did_not_respond(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            await read_frames(signing_service_reader, 1)
+            await read_frames(client_reader, 1)
+            [signing_service_stats] = self.middleman.get_signing_service_stats()
+
+            assert_that(signing_service_stats.timeouts).is_equal_to(1)
+            assert_that(signing_service_stats.outstanding_requests).is_equal_to(0)
+            assert_that(signing_service_stats.average_response_time).is_greater_than_or_equal_to(0.5)
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
+
+    def test_that_stats_are_logged_as_json_with_latencies_bytes_and_connections(self):
+        async def test():
+            (signing_service_reader, signing_service_writer) = await self._connect_signing_service()
+            (client_reader, client_writer) = await self._connect_client()
+
+            client_writer.write(encode_frame(1, MessageType.REQUEST, b"hello"))
+            [request] = await read_frames(signing_service_reader, 1)
+            signing_service_writer.write(encode_frame(request.request_id, MessageType.RESPONSE, b"signed"))
+            await read_frames(client_reader, 1)
+
+            with mock.patch("middleman.middleman_server.logger") as logger_mock:
+                self.middleman._log_stats()
+            [log_message] = logger_mock.info.call_args[0]
+            stats = json.loads(log_message[len("MiddleMan stats: "):])
+
+            assert_that(stats["signing_services"]).is_length(1)
+            assert_that(stats["signing_services"][0]["responses"]).is_equal_to(1)
+            assert_that(stats["signing_service_connections"]).is_equal_to(1)
+            assert_that(stats["signing_service_disconnections"]).is_equal_to(0)
+            assert_that(stats["queue"]["queue_depth"]).is_equal_to(0)
+            assert_that(sum(stats["latency_histograms"]["REQUEST"].values())).is_equal_to(1)
+            assert_that(stats["bytes_received_from_clients"]).is_equal_to(len(encode_frame(1, MessageType.REQUEST, b"hello")))
+            assert_that(stats["bytes_sent_to_signing_services"]).is_equal_to(len(encode_frame(1, MessageType.REQUEST, b"hello")))
+            assert_that(stats["bytes_received_from_signing_services"]).is_equal_to(len(encode_frame(1, MessageType.RESPONSE, b"signed")))
+            assert_that(stats["bytes_sent_to_clients"]).is_equal_to(len(encode_frame(1, MessageType.RESPONSE, b"signed")))
+
+            for writer in [signing_service_writer, client_writer]:
+                writer.close()
+
+        self.loop.run_until_complete(test())
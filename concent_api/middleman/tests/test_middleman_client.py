@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import socket
+import threading
+
+from assertpy import assert_that
+import pytest
+
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import MessageType
+from middleman_protocol.frame import decode_batch_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_error_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.stream import FrameDecoder
+
+from middleman.constants import LOCALHOST_IP
+from middleman.exceptions import MiddleManClientError
+from middleman.exceptions import MiddleManErrorResponse
+from middleman.exceptions import MiddleManRequestTimeout
+from middleman.middleman_client import MiddleManClient
+
+
+class FakeMiddleMan:
+    """
+    Answers requests in a thread per connection. Payloads are upper-cased, b'error' is answered with an error,
+    b'silence' is not answered at all, b'close' is answered before the connection is closed and b'garbage' is answered
+    with bytes which are not a valid frame.
+    """
+
+    def __init__(self):
+        self.connections_count = 0
+        self.concurrent_connections_count = 0
+        self.maximum_concurrent_connections_count = 0
+        self._lock = threading.Lock()
+        self._server_socket = socket.socket()
+        self._server_socket.bind((LOCALHOST_IP, 0))
+        self._server_socket.listen(10)
+        self.port = self._server_socket.getsockname()[1]
+        threading.Thread(target=self._accept_connections, daemon=True).start()
+
+    def close(self):
+        self._server_socket.close()
+
+    def _accept_connections(self):
+        while True:
+            try:
+                (connection, _address) = self._server_socket.accept()
+            except OSError:
+                return
+            with self._lock:
+                self.connections_count += 1
+                self.concurrent_connections_count += 1
+                self.maximum_concurrent_connections_count = max(
+                    self.maximum_concurrent_connections_count,
+                    self.concurrent_connections_count,
+                )
+            threading.Thread(target=self._handle_connection, args=(connection,), daemon=True).start()
+
+    def _handle_connection(self, connection):
+        with closing(connection):
+            self._answer_requests(connection)
+        with self._lock:
+            self.concurrent_connections_count -= 1
+
+    def _answer_requests(self, connection):
+        frame_decoder = FrameDecoder()
+        while True:
+            data = connection.recv(1024)
+            if data == b'':
+                return
+            frame_decoder.feed(data)
+            for frame in frame_decoder.read_frames():
+                payload = bytes(frame.payload)
+                self._respond(connection, frame.request_id, frame.message_type, payload)
+                if payload == b'close':
+                    return
+
+    @staticmethod
+    def _respond(connection, request_id, message_type, payload):
+        if payload == b'silence':
+            return
+        if payload == b'garbage':
+            connection.sendall(bytes(64))
+            return
+        if payload == b'error':
+            connection.sendall(encode_frame(request_id, MessageType.ERROR, encode_error_payload(ErrorCode.REQUEST_TIMEOUT, 'Timeout.')))
+        elif message_type == MessageType.BATCH_REQUEST:
+            items = [bytes(item).upper() for item in decode_batch_payload(payload)]
+            connection.sendall(encode_frame(request_id, MessageType.BATCH_RESPONSE, encode_batch_payload(items)))
+        else:
+            connection.sendall(encode_frame(request_id, MessageType.RESPONSE, payload.upper()))
+
+
+class TestMiddleManClient:
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.fake_middleman = FakeMiddleMan()
+        self.middleman_client = MiddleManClient(LOCALHOST_IP, self.fake_middleman.port, pool_size=2, timeout=0.5)
+        yield
+        self.middleman_client.close()
+        self.fake_middleman.close()
+
+    def test_that_requests_are_answered_over_one_pooled_connection(self):
+        for payload in [b'first', b'second', b'third']:
+            assert_that(self.middleman_client.request(payload)).is_equal_to(payload.upper())
+
+        assert_that(self.fake_middleman.connections_count).is_equal_to(1)
+
+    def test_that_batch_request_is_answered_with_responses_in_order(self):
+        assert_that(self.middleman_client.batch_request([b'first', b'second'])).is_equal_to([b'FIRST', b'SECOND'])
+
+    def test_that_concurrent_requests_do_not_open_more_connections_than_pool_size(self):
+        payloads = [f'payload {index}'.encode() for index in range(20)]
+
+        with ThreadPoolExecutor(10) as executor:
+            responses = list(executor.map(self.middleman_client.request, payloads))
+
+        assert_that(responses).is_equal_to([payload.upper() for payload in payloads])
+        assert_that(self.fake_middleman.maximum_concurrent_connections_count).is_less_than_or_equal_to(2)
+
+    def test_that_client_reconnects_if_pooled_connection_was_closed(self):
+        assert_that(self.middleman_client.request(b'close')).is_equal_to(b'CLOSE')
+        assert_that(self.middleman_client.request(b'hello')).is_equal_to(b'HELLO')
+
+        assert_that(self.fake_middleman.connections_count).is_equal_to(2)
+
+    def test_that_error_response_raises_exception_with_error_code(self):
+        with pytest.raises(MiddleManErrorResponse) as exception_info:
+            self.middleman_client.request(b'error')
+
+        assert_that(exception_info.value.error_code).is_equal_to(ErrorCode.REQUEST_TIMEOUT)
+        assert_that(exception_info.value.is_retriable).is_false()
+        assert_that(self.middleman_client.request(b'hello')).is_equal_to(b'HELLO')
+        assert_that(self.fake_middleman.connections_count).is_equal_to(1)
+
+    def test_that_request_times_out_and_connection_is_not_reused(self):
+        with pytest.raises(MiddleManRequestTimeout):
+            self.middleman_client.request(b'silence')
+
+        assert_that(self.middleman_client.request(b'hello')).is_equal_to(b'HELLO')
+        assert_that(self.fake_middleman.connections_count).is_equal_to(2)
+
+    def test_that_invalid_frame_raises_client_error_and_connection_is_not_reused(self):
+        with pytest.raises(MiddleManClientError):
+            self.middleman_client.request(b'garbage')
+
+        assert_that(self.middleman_client.request(b'hello')).is_equal_to(b'HELLO')
+        assert_that(self.fake_middleman.connections_count).is_equal_to(2)
+
+    def test_that_failure_to_connect_raises_client_error(self):
+        with closing(socket.socket()) as unused_socket:
+            unused_socket.bind((LOCALHOST_IP, 0))
+            unused_port = unused_socket.getsockname()[1]
+        middleman_client = MiddleManClient(LOCALHOST_IP, unused_port, pool_size=1, timeout=0.5)
+
+        with pytest.raises(MiddleManClientError):
+            middleman_client.request(b'hello')
@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from assertpy import assert_that
+import pytest
+
+from middleman.request_coalescer import RequestCoalescer
+
+
+class TestRequestCoalescer:
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.sent_batches = []
+        self.sent_batches_lock = Lock()
+
+    def _send_batch(self, payloads):
+        with self.sent_batches_lock:
+            self.sent_batches.append(payloads)
+        return [payload.upper() for payload in payloads]
+
+    def _submit_concurrently(self, request_coalescer, payloads):
+        with ThreadPoolExecutor(len(payloads)) as executor:
+            return list(executor.map(request_coalescer.submit, payloads))
+
+    def test_that_concurrent_requests_are_sent_in_one_batch_and_get_their_own_results(self):
+        request_coalescer = RequestCoalescer(self._send_batch, batch_window=0.5)
+        payloads = [f'payload {index}'.encode() for index in range(10)]
+
+        results = self._submit_concurrently(request_coalescer, payloads)
+
+        assert_that(results).is_equal_to([payload.upper() for payload in payloads])
+        assert_that(self.sent_batches).is_length(1)
+        assert_that(sorted(self.sent_batches[0])).is_equal_to(sorted(payloads))
+
+    def test_that_full_batch_is_sent_without_waiting_for_batch_window(self):
+        request_coalescer = RequestCoalescer(self._send_batch, batch_window=60, maximum_batch_size=2)
+
+        results = self._submit_concurrently(request_coalescer, [b'a', b'b', b'c', b'd'])
+
+        assert_that(results).is_equal_to([b'A', b'B', b'C', b'D'])
+        assert_that(self.sent_batches).is_length(2)
+
+    def test_that_request_without_batch_window_is_sent_alone(self):
+        request_coalescer = RequestCoalescer(self._send_batch, batch_window=0)
+
+        assert_that(request_coalescer.submit(b'a')).is_equal_to(b'A')
+        assert_that(request_coalescer.submit(b'b')).is_equal_to(b'B')
+        assert_that(self.sent_batches).is_equal_to([[b'a'], [b'b']])
+
+    def test_that_exception_raised_while_sending_batch_is_raised_for_all_requests_in_batch(self):
+        def send_batch(_payloads):
+            raise ConnectionError('Connection lost.')
+
+        request_coalescer = RequestCoalescer(send_batch, batch_window=60, maximum_batch_size=3)
+
+        with ThreadPoolExecutor(3) as executor:
+            futures = [executor.submit(request_coalescer.submit, payload) for payload in [b'a', b'b', b'c']]
+            for future in futures:
+                with pytest.raises(ConnectionError):
+                    future.result()
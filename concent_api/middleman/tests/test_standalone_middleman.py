@@ -0,0 +1,77 @@
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from assertpy import assert_that
+import pytest
+
+from middleman.constants import LOCALHOST_IP
+
+
+CONCENT_API_DIRECTORY = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Limits which standalone MiddleMan should stay well below. `manage.py middleman` exceeds both, because it loads
+# all installed apps.
+MAXIMUM_STARTUP_TIME = 2.0
+MAXIMUM_RSS = 64 * 1024 * 1024
+
+# Modules which must not be imported by standalone MiddleMan.
+HEAVY_MODULES = ['django', 'celery', 'skimage', 'cv2', 'numpy', 'mypy', 'raven']
+
+
+def get_rss(pid):
+    with open(f'/proc/{pid}/status') as status_file:
+        for line in status_file:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    raise AssertionError('VmRSS not found.')
+
+
+def test_that_standalone_middleman_does_not_import_heavy_modules():
+    imported_modules = subprocess.check_output(
+        [sys.executable, '-c', 'import sys, middleman.__main__; print(" ".join(sys.modules))'],
+        cwd=CONCENT_API_DIRECTORY,
+    ).decode().split()
+
+    for module in HEAVY_MODULES:
+        assert_that(imported_modules).does_not_contain(module)
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='RSS is read from /proc.')
+def test_that_standalone_middleman_starts_quickly_with_low_memory_usage_and_exits_on_sigterm(unused_tcp_port_factory):
+    internal_port = unused_tcp_port_factory()
+    start_time = time.monotonic()
+    middleman_process = subprocess.Popen(
+        [
+            sys.executable, '-m', 'middleman',
+            '--internal-port', str(internal_port),
+            '--external-port', str(unused_tcp_port_factory()),
+        ],
+        cwd=CONCENT_API_DIRECTORY,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            try:
+                socket.create_connection((LOCALHOST_IP, internal_port)).close()
+                break
+            except ConnectionRefusedError:
+                assert_that(time.monotonic() - start_time).is_less_than(MAXIMUM_STARTUP_TIME)
+                assert_that(middleman_process.poll()).is_none()
+                time.sleep(0.01)
+        startup_time = time.monotonic() - start_time
+        rss = get_rss(middleman_process.pid)
+
+        middleman_process.send_signal(signal.SIGTERM)
+
+        assert_that(middleman_process.wait(timeout=5)).is_equal_to(0)
+        assert_that(startup_time).is_less_than(MAXIMUM_STARTUP_TIME)
+        assert_that(rss).is_less_than(MAXIMUM_RSS)
+    finally:
+        if middleman_process.poll() is None:
+            middleman_process.kill()
+            middleman_process.wait()
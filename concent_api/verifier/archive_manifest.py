@@ -0,0 +1,115 @@
+import logging
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from typing import NamedTuple
+
+from django.conf import settings
+from mypy.types import Optional
+
+from common.logging import log_string_message
+from verifier.exceptions import VerificationMismatch
+
+
+logger = logging.getLogger(__name__)
+
+
+ArchiveManifestEntry = NamedTuple('ArchiveManifestEntry', [
+    ('name', str),
+    ('file_size', int),
+    ('compress_size', int),
+    ('crc', int),
+])
+
+# Contents of a downloaded archive read from its central directory once and reused by all verification steps
+# instead of opening and listing the archive again.
+ArchiveManifest = NamedTuple('ArchiveManifest', [
+    ('archive_name', str),
+    ('entries', List[ArchiveManifestEntry]),
+])
+
+
+def build_archive_manifest(archive_name: str, subtask_id: str) -> ArchiveManifest:
+    """
+    Reads the list of entries of an archive from VERIFIER_STORAGE_PATH. If the archive is broken, exceeds limits
+    protecting verifier against zip bombs or contains paths outside of the directory it is unpacked to,
+    it means that the package was prepared intentionally and verification ends with MISMATCH result.
+    """
+    try:
+        with zipfile.ZipFile(os.path.join(settings.VERIFIER_STORAGE_PATH, archive_name)) as zip_file:
+            archive_manifest = ArchiveManifest(
+                archive_name=archive_name,
+                entries=[
+                    ArchiveManifestEntry(
+                        name=zip_info.filename,
+                        file_size=zip_info.file_size,
+                        compress_size=zip_info.compress_size,
+                        crc=zip_info.CRC,
+                    )
+                    for zip_info in zip_file.infolist()
+                ],
+            )
+    except zipfile.BadZipFile:
+        raise VerificationMismatch(subtask_id)
+
+    archive_error = get_archive_manifest_error(archive_manifest)
+    if archive_error is not None:
+        log_string_message(
+            logger,
+            f'Archive {archive_name} rejected: {archive_error} SUBTASK_ID: {subtask_id}.'
+        )
+        raise VerificationMismatch(subtask_id)
+    return archive_manifest
+
+
+def get_archive_manifest_error(archive_manifest: ArchiveManifest) -> Optional[str]:
+    """ Returns description of the first problem found in the archive manifest or None if the archive can be unpacked. """
+    if len(archive_manifest.entries) > settings.VERIFIER_ARCHIVE_MAX_ENTRIES:
+        return f'Number of entries exceeds {settings.VERIFIER_ARCHIVE_MAX_ENTRIES}.'
+
+    if sum(entry.file_size for entry in archive_manifest.entries) > settings.VERIFIER_ARCHIVE_MAX_UNCOMPRESSED_SIZE:
+        return f'Total size of unpacked files exceeds {settings.VERIFIER_ARCHIVE_MAX_UNCOMPRESSED_SIZE} bytes.'
+
+    for entry in archive_manifest.entries:
+        if not is_safe_relative_path(entry.name):
+            return f'Entry {entry.name} points outside of the directory the archive is unpacked to.'
+        if (
+            settings.VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO is not None and
+            entry.file_size > settings.VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO * max(entry.compress_size, 1)
+        ):
+            return f'Compression ratio of entry {entry.name} exceeds {settings.VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO}.'
+    return None
+
+
+def get_archive_manifest_file_names(archive_manifest: ArchiveManifest) -> List[str]:
+    return [entry.name for entry in archive_manifest.entries]
+
+
+def extract_archive(archive_manifest: ArchiveManifest) -> None:
+    """
+    Unpacks all entries listed in the manifest to VERIFIER_STORAGE_PATH using VERIFIER_UNPACK_THREADS threads.
+    Raises zipfile.BadZipFile if any entry is damaged.
+    """
+    # Directories are created up front, so that threads extracting files do not race to create the same ones.
+    for entry in archive_manifest.entries:
+        entry_path = os.path.join(settings.VERIFIER_STORAGE_PATH, entry.name)
+        directory_path = entry_path if entry.name.endswith('/') else os.path.dirname(entry_path)
+        os.makedirs(directory_path, exist_ok=True)
+
+    with zipfile.ZipFile(os.path.join(settings.VERIFIER_STORAGE_PATH, archive_manifest.archive_name)) as zip_file:
+        with ThreadPoolExecutor(max_workers=settings.VERIFIER_UNPACK_THREADS) as executor:
+            # Consuming results re-raises exceptions from worker threads.
+            list(executor.map(
+                lambda file_name: zip_file.extract(file_name, settings.VERIFIER_STORAGE_PATH),
+                get_archive_manifest_file_names(archive_manifest),
+            ))
+
+
+def open_archive(archive_manifest: ArchiveManifest) -> zipfile.ZipFile:
+    """ Opens the downloaded archive, so that its entries can be read without unpacking them to VERIFIER_STORAGE_PATH. """
+    return zipfile.ZipFile(os.path.join(settings.VERIFIER_STORAGE_PATH, archive_manifest.archive_name))
+
+
+def is_safe_relative_path(file_path: str) -> bool:
+    return not os.path.isabs(file_path) and '..' not in file_path.replace('\\', '/').split('/')
@@ -0,0 +1,256 @@
+"""
+End-to-end benchmark of the verification flow run without Blender and without the storage cluster.
+Verification orders go through the same tasks as in production: `blender_verification_request` and
+`upload_acknowledged` in conductor, then `blender_verification_order` executed eagerly in the same process.
+Images are rendered by the fake render backend and packages are served by StorageClusterStub.
+`verification_result` is recorded instead of being executed, because it needs a subtask in the control database.
+"""
+from collections import defaultdict
+from contextlib import ExitStack
+from contextlib import contextmanager
+from threading import Event
+from threading import Thread
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+from unittest import mock
+import hashlib
+import os
+import resource
+import time
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.db import transaction
+from django.test import override_settings
+
+from common.helpers import get_current_utc_timestamp
+from common.helpers import get_storage_result_file_path
+from common.helpers import get_storage_source_file_path
+from concent_api.celery import app as celery_app
+from conductor.tasks import blender_verification_request
+from conductor.tasks import upload_acknowledged
+from core.tasks import verification_result
+from verifier import tasks
+from verifier import utils
+from verifier.render_backends.fake import write_fake_image
+from verifier.storage_cluster_stub import StorageClusterStub
+from .constants import BENCHMARK_DISK_USAGE_SAMPLING_INTERVAL
+from .constants import BENCHMARK_SCENE_FILE
+from .constants import BENCHMARK_SCENE_FILE_SIZE
+from .constants import BENCHMARK_VERIFICATION_TIME
+
+
+BenchmarkResult = NamedTuple('BenchmarkResult', [
+    ('frames_count', int),
+    ('resolution', Tuple[int, int]),
+    ('verification_result', str),
+    # Total number of seconds spent in each phase. Phases run for every frame are summed over all frames.
+    ('phase_timings', Dict[str, float]),
+    # Peak resident set size of the whole process so far, in bytes. Does not decrease between benchmark runs.
+    ('peak_rss', int),
+    # Peak total size of files in VERIFIER_STORAGE_PATH, in bytes.
+    ('peak_disk_usage', int),
+    ('uploaded_bytes', int),
+])
+
+# Functions whose execution time is measured, as (module, function name, phase name).
+# Phases are listed in the order in which they run. Rendering, uploading and comparing of frames overlap.
+MEASURED_PHASES = [
+    (tasks, 'download_archives_from_storage', 'download'),
+    (tasks, 'build_archive_manifest', 'manifest'),
+    (tasks, 'unpack_archives', 'unpack'),
+    (utils, 'render_image', 'render'),
+    (utils, 'upload_blender_output_files_of_frame', 'upload'),
+    (utils, 'compare_rendered_frame_with_user_result_file', 'compare'),
+    (tasks, 'render_upload_and_compare_frames', 'render_upload_and_compare'),
+]
+
+
+def run_verification_benchmark(
+    frames_count: int,
+    resolution: Tuple[int, int],
+    render_latency: float,
+    output_format: str,
+    working_directory: str,
+) -> BenchmarkResult:
+    subtask_id = uuid.uuid4().hex
+    task_id = uuid.uuid4().hex
+    frames = list(range(1, frames_count + 1))
+    storage_path = os.path.join(working_directory, 'storage')
+    verifier_storage_path = os.path.join(working_directory, 'verifier')
+    os.makedirs(verifier_storage_path)
+
+    phase_timings = defaultdict(float)  # type: Dict[str, float]
+    verification_results = []  # type: List[str]
+
+    with StorageClusterStub(storage_path) as storage_cluster_stub, ExitStack() as exit_stack:
+        exit_stack.enter_context(
+            override_settings(
+                CONCENT_FEATURES=list(set(settings.CONCENT_FEATURES) | {'conductor-worker', 'verifier'}),
+                MOCK_VERIFICATION_ENABLED=False,
+                STORAGE_SERVER_INTERNAL_ADDRESS=storage_cluster_stub.address,
+                STORAGE_CLUSTER_SSL_CERTIFICATE_PATH='',
+                VERIFIER_STORAGE_PATH=verifier_storage_path,
+                VERIFIER_CACHE_PATH=None,
+                VERIFIER_PARTIAL_RESULT_PACKAGE_DOWNLOAD=False,
+                VERIFIER_RENDER_BACKEND='verifier.render_backends.fake',
+                VERIFIER_FAKE_RENDER_RESOLUTION=resolution,
+                VERIFIER_FAKE_RENDER_LATENCY=render_latency,
+            )
+        )
+        for (module, function_name, phase) in MEASURED_PHASES:
+            exit_stack.enter_context(
+                mock.patch.object(module, function_name, _measure(getattr(module, function_name), phase, phase_timings))
+            )
+        exit_stack.enter_context(
+            mock.patch.object(
+                verification_result,
+                'delay',
+                lambda _subtask_id, result, *_args: verification_results.append(result),
+            )
+        )
+        exit_stack.enter_context(_eager_celery_tasks())
+
+        (source_package_path, source_size, source_package_hash) = _prepare_source_package(storage_path, subtask_id, task_id)
+        (result_package_path, result_size, result_package_hash) = _prepare_result_package(
+            storage_path,
+            subtask_id,
+            task_id,
+            frames,
+            output_format,
+            working_directory,
+        )
+
+        disk_usage_sampler = _DiskUsageSampler(verifier_storage_path)
+        exit_stack.enter_context(disk_usage_sampler)
+
+        # Records created by conductor are not kept.
+        with transaction.atomic(using='storage'):
+            _measure(blender_verification_request, 'blender_verification_request', phase_timings)(
+                subtask_id=subtask_id,
+                source_package_path=source_package_path,
+                result_package_path=result_package_path,
+                output_format=output_format,
+                scene_file=BENCHMARK_SCENE_FILE,
+                verification_deadline=get_current_utc_timestamp() + BENCHMARK_VERIFICATION_TIME,
+                frames=frames,
+                blender_crop_script=None,
+            )
+            # Verification order is executed as part of this call.
+            _measure(upload_acknowledged, 'upload_acknowledged', phase_timings)(
+                subtask_id=subtask_id,
+                source_file_size=source_size,
+                source_package_hash=source_package_hash,
+                result_file_size=result_size,
+                result_package_hash=result_package_hash,
+            )
+            transaction.set_rollback(True, using='storage')
+
+    return BenchmarkResult(
+        frames_count=frames_count,
+        resolution=resolution,
+        verification_result=', '.join(verification_results) if verification_results else 'NONE',
+        phase_timings=dict(phase_timings),
+        peak_rss=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        peak_disk_usage=disk_usage_sampler.peak_disk_usage,
+        uploaded_bytes=storage_cluster_stub.uploaded_bytes,
+    )
+
+
+def _measure(function: Callable, phase: str, phase_timings: Dict[str, float]) -> Callable:
+    def wrapper(*args, **kwargs):
+        start_time = time.monotonic()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            # Phases may run in several threads at the same time, but each thread adds its own time.
+            phase_timings[phase] += time.monotonic() - start_time
+    return wrapper
+
+
+@contextmanager
+def _eager_celery_tasks():
+    """ Makes tasks sent with `delay()` or `apply_async()` execute immediately in the calling thread. """
+    task_always_eager = celery_app.conf.task_always_eager
+    celery_app.conf.task_always_eager = True
+    try:
+        yield
+    finally:
+        celery_app.conf.task_always_eager = task_always_eager
+
+
+class _DiskUsageSampler:
+    """ Periodically measures total size of files in a directory in a background thread and keeps the highest value. """
+
+    def __init__(self, directory_path: str) -> None:
+        self.directory_path = directory_path
+        self.peak_disk_usage = 0
+        self._stopped = Event()
+        self._thread = Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+
+    def __exit__(self, *_args):
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(BENCHMARK_DISK_USAGE_SAMPLING_INTERVAL):
+            self.peak_disk_usage = max(self.peak_disk_usage, _get_directory_size(self.directory_path))
+
+
+def _get_directory_size(directory_path: str) -> int:
+    size = 0
+    for (root, _, file_names) in os.walk(directory_path):
+        for file_name in file_names:
+            try:
+                size += os.path.getsize(os.path.join(root, file_name))
+            except FileNotFoundError:
+                # Verifier removes files while they are being counted.
+                pass
+    return size
+
+
+def _prepare_source_package(storage_path: str, subtask_id: str, task_id: str) -> Tuple[str, int, str]:
+    source_package_path = get_storage_source_file_path(subtask_id, task_id)
+    with _create_package(storage_path, source_package_path) as source_package:
+        source_package.writestr(BENCHMARK_SCENE_FILE, os.urandom(BENCHMARK_SCENE_FILE_SIZE))
+    (package_size, package_hash) = _get_package_size_and_hash(storage_path, source_package_path)
+    return (source_package_path, package_size, package_hash)
+
+
+def _prepare_result_package(
+    storage_path: str,
+    subtask_id: str,
+    task_id: str,
+    frames: List[int],
+    output_format: str,
+    working_directory: str,
+) -> Tuple[str, int, str]:
+    """ Creates result package with images identical to the ones rendered by the fake render backend. """
+    result_package_path = get_storage_result_file_path(subtask_id, task_id)
+    with _create_package(storage_path, result_package_path) as result_package:
+        for frame_number in frames:
+            result_file_name = f'result_{frame_number:>04}.{output_format.lower()}'
+            result_file_path = os.path.join(working_directory, result_file_name)
+            write_fake_image(result_file_path, BENCHMARK_SCENE_FILE, frame_number)
+            result_package.write(result_file_path, result_file_name)
+            os.remove(result_file_path)
+    (package_size, package_hash) = _get_package_size_and_hash(storage_path, result_package_path)
+    return (result_package_path, package_size, package_hash)
+
+
+def _create_package(storage_path: str, package_path: str) -> zipfile.ZipFile:
+    os.makedirs(os.path.dirname(os.path.join(storage_path, package_path)), exist_ok=True)
+    return zipfile.ZipFile(os.path.join(storage_path, package_path), 'w')
+
+
+def _get_package_size_and_hash(storage_path: str, package_path: str) -> Tuple[int, str]:
+    with open(os.path.join(storage_path, package_path), 'rb') as package:
+        content = package.read()
+    return (len(content), 'sha1:' + hashlib.sha1(content).hexdigest())
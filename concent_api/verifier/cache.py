@@ -0,0 +1,230 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import stat
+from typing import List
+
+from django.conf import settings
+from mypy.types import Optional
+
+from .constants import CACHE_CHECKSUM_CHUNK_SIZE
+from .constants import CACHE_TEMPORARY_DIRECTORY_SUFFIX
+from .constants import RENDER_CACHE_DIRECTORY
+from .constants import SOURCE_PACKAGE_CACHE_DIRECTORY
+
+
+logger = logging.getLogger(__name__)
+
+
+def get_cache_entry_path(cache_directory: str, key: str) -> str:
+    # Keys such as package hashes contain characters like ':' which should not be used in file names.
+    return os.path.join(settings.VERIFIER_CACHE_PATH, cache_directory, re.sub(r'[^\w.-]', '_', key))
+
+
+def link_cached_source_package(source_package_hash: str) -> Optional[List[str]]:
+    """
+    Hardlinks files of the cached source package into VERIFIER_STORAGE_PATH, marks it as recently used and returns
+    the list of its files. Files which already exist there are left untouched.
+    Returns None, without leaving any links behind, if the package is not cached, caching is disabled or the entry
+    is evicted by another worker while its files are being listed or linked. The package must be downloaded then.
+    """
+    if settings.VERIFIER_CACHE_PATH is None:
+        return None
+
+    cache_entry_path = get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, source_package_hash)
+    try:
+        os.utime(cache_entry_path)
+    except FileNotFoundError:
+        return None
+
+    # Files are listed and linked in one go, so the returned list always matches the files linked into the workspace.
+    linked_file_paths = []  # type: List[str]
+    try:
+        source_files_list = list_files_in_directory(cache_entry_path)
+        for file_path in source_files_list:
+            destination_path = os.path.join(settings.VERIFIER_STORAGE_PATH, file_path)
+            if os.path.exists(destination_path):
+                continue
+            os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+            os.link(os.path.join(cache_entry_path, file_path), destination_path)
+            linked_file_paths.append(destination_path)
+    except OSError as exception:
+        logger.warning(f'Cached source package {source_package_hash} was not used, exception: {exception}')
+        # Linked files are read-only, so they would prevent the downloaded package from being unpacked.
+        for linked_file_path in linked_file_paths:
+            os.unlink(linked_file_path)
+        return None
+    return source_files_list
+
+
+def store_source_package_in_cache(source_package_hash: str, source_files_list: List[str]) -> None:
+    """
+    Adds source package unpacked in VERIFIER_STORAGE_PATH to the cache. Files are hardlinked rather than copied and
+    made read-only because they are shared with workspaces of all verifications using the package.
+    Caching is only an optimization, so failures are logged and do not affect verification.
+    `source_files_list` must come from a validated ArchiveManifest, so it contains no paths outside of the workspace.
+    """
+    if settings.VERIFIER_CACHE_PATH is None:
+        return
+
+    cache_entry_path = get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, source_package_hash)
+    # The package is linked into a temporary directory first so that other workers never see an incomplete entry.
+    temporary_path = f'{cache_entry_path}.{os.getpid()}{CACHE_TEMPORARY_DIRECTORY_SUFFIX}'
+    try:
+        os.makedirs(temporary_path)
+        for file_path in source_files_list:
+            unpacked_file_path = os.path.join(settings.VERIFIER_STORAGE_PATH, file_path)
+            if not os.path.isfile(unpacked_file_path):
+                continue
+            cached_file_path = os.path.join(temporary_path, file_path)
+            os.makedirs(os.path.dirname(cached_file_path), exist_ok=True)
+            os.link(unpacked_file_path, cached_file_path)
+            os.chmod(cached_file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.rename(temporary_path, cache_entry_path)
+    except OSError as exception:
+        logger.warning(f'Source package {source_package_hash} was not cached, exception: {exception}')
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        return
+
+    evict_least_recently_used_cache_entries(SOURCE_PACKAGE_CACHE_DIRECTORY, settings.VERIFIER_SOURCE_PACKAGE_CACHE_QUOTA)
+
+
+def get_render_cache_key(
+    source_package_hash: str,
+    scene_file: str,
+    frame_number: int,
+    output_format: str,
+    blender_script: Optional[str],
+    blender_version: str,
+) -> str:
+    """
+    Returns key identifying an image rendered by Blender. The script includes any changes verifier makes to
+    the Blender crop script, e.g. the window to render, so renders of different parts of a frame do not collide.
+    """
+    blender_script_hash = hashlib.sha1(blender_script.encode()).hexdigest() if blender_script is not None else ''
+    return hashlib.sha1(
+        '\n'.join([
+            source_package_hash,
+            scene_file,
+            str(frame_number),
+            output_format,
+            blender_script_hash,
+            blender_version,
+        ]).encode()
+    ).hexdigest()
+
+
+def link_cached_render(render_cache_key: str, blender_output_file_path: str) -> bool:
+    """
+    Hardlinks the cached image to the path Blender would have written it to and marks it as recently used.
+    Returns False if the image is not cached, caching is disabled or the cached file is damaged.
+    """
+    if settings.VERIFIER_CACHE_PATH is None:
+        return False
+
+    cache_entry_path = get_cache_entry_path(RENDER_CACHE_DIRECTORY, render_cache_key)
+    try:
+        os.utime(cache_entry_path)
+        # Cached image is named after its checksum, which is verified before the image is used.
+        (cached_file_name, ) = os.listdir(cache_entry_path)
+        cached_file_path = os.path.join(cache_entry_path, cached_file_name)
+        if compute_file_sha1(cached_file_path) != cached_file_name:
+            logger.warning(f'Cached render {render_cache_key} is damaged and will be removed.')
+            remove_cache_entry(cache_entry_path)
+            return False
+        if os.path.exists(blender_output_file_path):
+            os.unlink(blender_output_file_path)
+        os.link(cached_file_path, blender_output_file_path)
+    except FileNotFoundError:
+        return False
+    except (OSError, ValueError) as exception:
+        logger.warning(f'Cached render {render_cache_key} was not used, exception: {exception}')
+        return False
+    return True
+
+
+def store_render_in_cache(render_cache_key: str, blender_output_file_path: str) -> None:
+    """ Adds image rendered by Blender to the cache. Failures are logged and do not affect verification. """
+    if settings.VERIFIER_CACHE_PATH is None:
+        return
+
+    cache_entry_path = get_cache_entry_path(RENDER_CACHE_DIRECTORY, render_cache_key)
+    temporary_path = f'{cache_entry_path}.{os.getpid()}{CACHE_TEMPORARY_DIRECTORY_SUFFIX}'
+    try:
+        os.makedirs(temporary_path)
+        cached_file_path = os.path.join(temporary_path, compute_file_sha1(blender_output_file_path))
+        os.link(blender_output_file_path, cached_file_path)
+        os.chmod(cached_file_path, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.rename(temporary_path, cache_entry_path)
+    except OSError as exception:
+        logger.warning(f'Render {render_cache_key} was not cached, exception: {exception}')
+        shutil.rmtree(temporary_path, ignore_errors=True)
+        return
+
+    evict_least_recently_used_cache_entries(RENDER_CACHE_DIRECTORY, settings.VERIFIER_RENDER_CACHE_QUOTA)
+
+
+def evict_least_recently_used_cache_entries(cache_directory: str, quota: int) -> None:
+    """ Removes least recently used entries from the cache directory until their total size does not exceed the quota. """
+    cache_directory_path = os.path.join(settings.VERIFIER_CACHE_PATH, cache_directory)
+    cache_entries = []
+    for entry_name in os.listdir(cache_directory_path):
+        if entry_name.endswith(CACHE_TEMPORARY_DIRECTORY_SUFFIX):
+            continue
+        cache_entry_path = os.path.join(cache_directory_path, entry_name)
+        try:
+            cache_entries.append((os.stat(cache_entry_path).st_mtime, get_directory_size(cache_entry_path), cache_entry_path))
+        except FileNotFoundError:
+            # Removed by another worker in the meantime.
+            continue
+
+    total_size = sum(size for (_, size, _) in cache_entries)
+    for (_, size, cache_entry_path) in sorted(cache_entries):
+        if total_size <= quota:
+            break
+        remove_cache_entry(cache_entry_path)
+        total_size -= size
+
+
+def remove_cache_entry(cache_entry_path: str) -> None:
+    # Entry is renamed first so that it disappears from the cache atomically, even if removing its files takes a while.
+    removed_entry_path = f'{cache_entry_path}.{os.getpid()}{CACHE_TEMPORARY_DIRECTORY_SUFFIX}'
+    try:
+        os.rename(cache_entry_path, removed_entry_path)
+    except OSError as exception:
+        logger.warning(f'Cache entry {cache_entry_path} was not removed, exception: {exception}')
+        return
+    shutil.rmtree(removed_entry_path, ignore_errors=True)
+
+
+def list_files_in_directory(directory_path: str) -> List[str]:
+    """
+    Returns paths, relative to the directory, of all files in the directory and its subdirectories.
+    Raises OSError instead of returning an incomplete list if a subdirectory cannot be read.
+    """
+    def raise_error(exception: OSError) -> None:
+        raise exception
+
+    return [
+        os.path.relpath(os.path.join(root, file_name), directory_path)
+        for (root, _, file_names) in os.walk(directory_path, onerror=raise_error)
+        for file_name in file_names
+    ]
+
+
+def compute_file_sha1(file_path: str) -> str:
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(CACHE_CHECKSUM_CHUNK_SIZE), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def get_directory_size(directory_path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, file_name))
+        for (root, _, file_names) in os.walk(directory_path)
+        for file_name in file_names
+    )
@@ -1,6 +1,68 @@
+import re
+
+
 CELERY_LOCKED_SUBTASK_DELAY = 60
 
 MAXIMUM_VERIFICATION_RESULT_TASK_RETRIES = 3
 
-# Defines data chunk size in bytes when unpacking archives.
-UNPACK_CHUNK_SIZE = 50  # bytes
+# Matches assignments to render settings in the Blender crop script generated by Golem,
+# e.g. "scene.render.border_min_x = 0.25".
+BLENDER_CROP_SCRIPT_RENDER_SETTING_REGEX = re.compile(r'^\s*scene\.render\.(\w+)\s*=\s*(\S+)\s*$', re.MULTILINE)
+
+# Side length of the square window over which local SSIM statistics are computed.
+SSIM_WINDOW_SIZE = 7
+
+# Constants stabilizing SSIM division, as in the original SSIM paper and scikit-image.
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+# Estimated number of bytes of intermediate float64 arrays needed per pixel and channel of an image tile
+# when computing SSIM. Used to derive tile size from VERIFIER_SSIM_MEMORY_LIMIT.
+SSIM_BYTES_PER_TILE_ELEMENT = 128
+
+# Images are not downscaled for coarse SSIM below this size in pixels, because SSIM of tiny images says little
+# about the originals.
+SSIM_PYRAMID_MIN_IMAGE_SIZE = 64
+
+# Subdirectory of VERIFIER_CACHE_PATH containing unpacked source packages, one directory per package hash.
+SOURCE_PACKAGE_CACHE_DIRECTORY = 'source_packages'
+
+# Subdirectory of VERIFIER_CACHE_PATH containing images rendered by Blender, one directory per render cache key.
+RENDER_CACHE_DIRECTORY = 'renders'
+
+# Size in bytes of chunks in which cached files are read when their checksums are verified.
+CACHE_CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+# Suffix of directories being filled or removed in VERIFIER_CACHE_PATH. Such directories are never used as cache entries.
+CACHE_TEMPORARY_DIRECTORY_SUFFIX = '.tmp'
+
+# Subdirectory of VERIFIER_CACHE_PATH containing average times needed to render a frame, one file per scene.
+FRAME_RENDER_TIME_CACHE_DIRECTORY = 'render_times'
+
+# Weight of the latest measurement in the moving average of time needed to render a frame of a scene.
+FRAME_RENDER_TIME_SMOOTHING_FACTOR = 0.3
+
+# Highest Celery priority of a verification order. Must not exceed x-max-priority of the verifier-priority queue.
+VERIFICATION_ORDER_MAX_PRIORITY = 9
+
+# Size in bytes of chunks in which the storage cluster stub sends files.
+STORAGE_CLUSTER_STUB_CHUNK_SIZE = 64 * 1024
+
+# Name and size in bytes of the scene file put in source packages prepared by the verifier benchmark.
+BENCHMARK_SCENE_FILE = 'benchmark.blend'
+BENCHMARK_SCENE_FILE_SIZE = 1024 * 1024
+
+# Number of seconds between the time benchmark verification orders are sent and their deadlines.
+BENCHMARK_VERIFICATION_TIME = 3600
+
+# Number of seconds between measurements of disk usage during the verifier benchmark.
+BENCHMARK_DISK_USAGE_SAMPLING_INTERVAL = 0.01
+
+# Prefix of lines in which a long-lived Blender worker reports results of render jobs. Other lines are Blender output.
+BLENDER_WORKER_RESULT_PREFIX = 'CONCENT_BLENDER_WORKER_RESULT '
+
+# Number of seconds a Blender worker has to exit after its stdin is closed, before it is killed.
+BLENDER_WORKER_STOP_TIMEOUT = 10
+
+# Name of the file in VERIFIER_DISK_RESERVATION_PATH locked while disk space is being reserved.
+DISK_RESERVATION_LOCK_FILE = '.lock'
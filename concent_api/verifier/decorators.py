@@ -4,6 +4,7 @@ from django.conf import settings
 
 from core.constants import VerificationResult
 from core.tasks import verification_result
+from verifier.disk_space import release_disk_space
 from verifier.exceptions import VerificationError
 from verifier.exceptions import VerificationMismatch
 from verifier.utils import clean_directory
@@ -29,4 +30,5 @@ def handle_verification_results(task):
         finally:
             # Remove any files left in VERIFIER_STORAGE_PATH.
             clean_directory(settings.VERIFIER_STORAGE_PATH)
+            release_disk_space()
     return wrapper
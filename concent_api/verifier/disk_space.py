@@ -0,0 +1,152 @@
+"""
+Admission control protecting verifiers from running out of disk space. Before anything is downloaded, a verification
+reserves the space it is expected to need. Reservations of all verifiers using the same disk are kept as files in
+VERIFIER_DISK_RESERVATION_PATH and made under a lock, so that together they never exceed the free space.
+A verification which does not fit is put back in the queue instead of failing halfway through unpacking.
+
+Each worker process runs one verification at a time, so reservations are named after the host and the process.
+Reservations left by workers which crashed expire at the deadline of their verification.
+"""
+from contextlib import contextmanager
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Tuple
+import fcntl
+import logging
+import os
+import shutil
+import socket
+
+from django.conf import settings
+
+from common.helpers import get_current_utc_timestamp
+from common.logging import log_string_message
+from verifier.cache import get_directory_size
+from .constants import DISK_RESERVATION_LOCK_FILE
+
+
+logger = logging.getLogger(__name__)
+
+
+DiskSpaceMetrics = NamedTuple('DiskSpaceMetrics', [
+    # Bytes available on the disk holding VERIFIER_STORAGE_PATH.
+    ('free_space', int),
+    # Bytes reserved by verifications in progress. Part of it may already be used by their files.
+    ('reserved_space', int),
+    # Bytes taken by files in VERIFIER_CACHE_PATH. Cached files are hardlinked from workspaces, so the space
+    # is freed only when they are evicted from the cache and removed from workspaces.
+    ('cache_size', int),
+])
+
+
+def estimate_required_disk_space(source_size: int, result_size: int) -> int:
+    """
+    Returns number of bytes needed to verify the subtask. Both archives are kept until verification ends,
+    the source package is unpacked and rendered images take about as much space as provider's results,
+    which are read straight from the result archive.
+    """
+    unpacked_source_size = int(source_size * settings.VERIFIER_ESTIMATED_UNPACKED_SIZE_RATIO)
+    return source_size + result_size + unpacked_source_size + result_size
+
+
+def reserve_disk_space(subtask_id: str, required_space: int, verification_deadline: int) -> bool:
+    """
+    Reserves disk space for the verification until `release_disk_space()` is called or the deadline passes.
+    Returns False if the space left after other reservations and VERIFIER_MIN_FREE_DISK_SPACE is not enough.
+    Always succeeds if VERIFIER_DISK_RESERVATION_PATH is not set.
+    """
+    if settings.VERIFIER_DISK_RESERVATION_PATH is None:
+        return True
+
+    os.makedirs(settings.VERIFIER_DISK_RESERVATION_PATH, exist_ok=True)
+    with _lock_disk_reservations():
+        free_space = get_free_disk_space()
+        reserved_space = get_reserved_disk_space()
+        is_reserved = required_space <= free_space - reserved_space - settings.VERIFIER_MIN_FREE_DISK_SPACE
+        if is_reserved:
+            with open(get_disk_reservation_file_path(), 'w') as reservation_file:
+                reservation_file.write(f'{required_space} {verification_deadline}')
+
+    # The cache size is only logged, so the cache is walked after the lock is released
+    # and does not hold up reservations of other verifiers.
+    log_string_message(
+        logger,
+        f'Disk space {"reserved" if is_reserved else "not available"} for SUBTASK_ID {subtask_id}.',
+        f'Required space: {required_space}.',
+        f'Free space: {free_space}.',
+        f'Reserved space: {reserved_space}.',
+        f'Cache size: {get_cache_size()}.',
+    )
+    return is_reserved
+
+
+def release_disk_space() -> None:
+    """ Removes reservation made by this worker process, if there is any. """
+    if settings.VERIFIER_DISK_RESERVATION_PATH is None:
+        return
+
+    try:
+        os.remove(get_disk_reservation_file_path())
+    except FileNotFoundError:
+        pass
+
+
+def get_disk_space_metrics() -> DiskSpaceMetrics:
+    return DiskSpaceMetrics(
+        free_space=get_free_disk_space(),
+        reserved_space=get_reserved_disk_space(),
+        cache_size=get_cache_size(),
+    )
+
+
+def get_free_disk_space() -> int:
+    return shutil.disk_usage(settings.VERIFIER_STORAGE_PATH).free
+
+
+def get_reserved_disk_space() -> int:
+    return sum(required_space for (required_space, _) in get_disk_reservations())
+
+
+def get_cache_size() -> int:
+    """ Walks the whole cache, so it should not be called while disk reservations are locked. """
+    return get_directory_size(settings.VERIFIER_CACHE_PATH) if settings.VERIFIER_CACHE_PATH is not None else 0
+
+
+def get_disk_reservations() -> List[Tuple[int, int]]:
+    """ Returns (required space, verification deadline) of every reservation which has not expired. """
+    if settings.VERIFIER_DISK_RESERVATION_PATH is None or not os.path.isdir(settings.VERIFIER_DISK_RESERVATION_PATH):
+        return []
+
+    current_timestamp = get_current_utc_timestamp()
+    disk_reservations = []
+    for file_name in os.listdir(settings.VERIFIER_DISK_RESERVATION_PATH):
+        if file_name == DISK_RESERVATION_LOCK_FILE:
+            continue
+        try:
+            with open(os.path.join(settings.VERIFIER_DISK_RESERVATION_PATH, file_name)) as reservation_file:
+                (required_space, verification_deadline) = (int(value) for value in reservation_file.read().split())
+        except FileNotFoundError:
+            # Released in the meantime.
+            continue
+        except ValueError:
+            logger.warning(f'Disk reservation {file_name} is damaged and will be ignored.')
+            continue
+        if verification_deadline < current_timestamp:
+            continue
+        disk_reservations.append((required_space, verification_deadline))
+    return disk_reservations
+
+
+def get_disk_reservation_file_path() -> str:
+    return os.path.join(settings.VERIFIER_DISK_RESERVATION_PATH, f'{socket.gethostname()}.{os.getpid()}')
+
+
+@contextmanager
+def _lock_disk_reservations() -> Iterator[None]:
+    with open(os.path.join(settings.VERIFIER_DISK_RESERVATION_PATH, DISK_RESERVATION_LOCK_FILE), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
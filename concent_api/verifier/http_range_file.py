@@ -0,0 +1,87 @@
+from typing import IO
+from typing import cast
+import io
+import zipfile
+
+import requests
+
+
+class HttpRangeFile(io.RawIOBase):
+    """
+    Read-only, seekable file object reading a remote file with HTTP range requests.
+    Allows zipfile to read the central directory and selected members of a remote archive without downloading all of it.
+    Should be wrapped in io.BufferedReader, otherwise every small read results in a separate request.
+    The session is closed together with the file.
+    """
+
+    def __init__(self, url: str, size: int, session: requests.Session) -> None:
+        super().__init__()
+        self._url = url
+        self._size = size
+        self._session = session
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int=io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._size + offset
+        else:
+            raise ValueError(f'Invalid whence ({whence})')
+        if position < 0:
+            raise ValueError(f'Negative seek position {position}')
+        self._position = position
+        return position
+
+    def close(self) -> None:
+        if not self.closed:
+            self._session.close()
+        super().close()
+
+    def readinto(self, buffer) -> int:
+        if self._position >= self._size or len(buffer) == 0:
+            return 0
+
+        last_byte = min(self._position + len(buffer), self._size) - 1
+        response = self._session.get(self._url, headers={'Range': f'bytes={self._position}-{last_byte}'})
+        # Server which ignores the Range header would send the whole file, which is exactly what should be avoided.
+        if response.status_code != 206:
+            raise OSError(f'Range request to {self._url} failed with status code {response.status_code}')
+
+        data = response.content
+        buffer[:len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class HttpRangeZipFile(zipfile.ZipFile):
+    """
+    Archive read from a remote file with HTTP range requests. Unlike ZipFile opened from a file object, it closes
+    the file, and with it the session, when it is closed or fails to be opened.
+    """
+
+    def __init__(self, url: str, size: int, session: requests.Session, buffer_size: int) -> None:
+        self._remote_file = io.BufferedReader(HttpRangeFile(url, size, session), buffer_size=buffer_size)
+        try:
+            # BufferedReader is a binary file, but typeshed does not annotate it as IO[bytes].
+            super().__init__(cast(IO[bytes], self._remote_file))
+        except BaseException:
+            self._remote_file.close()
+            raise
+
+    def close(self) -> None:
+        try:
+            super().close()
+        finally:
+            self._remote_file.close()
@@ -0,0 +1,89 @@
+import tempfile
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from conductor.models import BlenderSubtaskDefinition
+from verifier.benchmark import MEASURED_PHASES
+from verifier.benchmark import run_verification_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs the whole verification flow with the fake render backend and a local storage cluster stub '
+        'and reports per-phase timings, peak memory and disk usage for each number of frames and image size. '
+        'Requires "verifier" and "conductor-worker" in CONCENT_FEATURES and a migrated storage database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-f',
+            '--frames',
+            type=int,
+            nargs='+',
+            default=[1, 4],
+            help="Numbers of frames of benchmarked subtasks."
+        )
+
+        parser.add_argument(
+            '-r',
+            '--resolutions',
+            type=str,
+            nargs='+',
+            default=['320x240', '1920x1080'],
+            help="Sizes of rendered images, in WIDTHxHEIGHT format."
+        )
+
+        parser.add_argument(
+            '-l',
+            '--render-latency',
+            type=float,
+            default=0.0,
+            help="Number of seconds the fake render backend spends on every image."
+        )
+
+        parser.add_argument(
+            '-o',
+            '--output-format',
+            type=str,
+            choices=[BlenderSubtaskDefinition.OutputFormat.PNG.name, BlenderSubtaskDefinition.OutputFormat.JPG.name],
+            default=BlenderSubtaskDefinition.OutputFormat.PNG.name,
+            help="Format of rendered images."
+        )
+
+    def handle(self, *args, **options):
+        resolutions = [parse_resolution(resolution) for resolution in options['resolutions']]
+        phases = ['blender_verification_request', 'upload_acknowledged'] + [phase for (_, _, phase) in MEASURED_PHASES]
+
+        self.stdout.write(' '.join(['frames', 'resolution', 'result'] + phases + ['peak_rss_mib', 'peak_disk_mib', 'uploaded_mib']))
+        # Runs are ordered from the smallest one, because peak memory usage is measured for the whole process.
+        for resolution in sorted(resolutions, key=lambda resolution: resolution[0] * resolution[1]):
+            for frames_count in sorted(options['frames']):
+                with tempfile.TemporaryDirectory() as working_directory:
+                    benchmark_result = run_verification_benchmark(
+                        frames_count=frames_count,
+                        resolution=resolution,
+                        render_latency=options['render_latency'],
+                        output_format=options['output_format'],
+                        working_directory=working_directory,
+                    )
+                self.stdout.write(' '.join(
+                    [
+                        str(benchmark_result.frames_count),
+                        '{}x{}'.format(*benchmark_result.resolution),
+                        benchmark_result.verification_result,
+                    ] +
+                    [f'{benchmark_result.phase_timings.get(phase, 0.0):.3f}' for phase in phases] +
+                    [
+                        f'{size / (1024 * 1024):.1f}'
+                        for size in [benchmark_result.peak_rss, benchmark_result.peak_disk_usage, benchmark_result.uploaded_bytes]
+                    ]
+                ))
+
+
+def parse_resolution(resolution: str):
+    try:
+        (width, height) = (int(dimension) for dimension in resolution.lower().split('x'))
+    except ValueError:
+        raise CommandError(f'Invalid resolution {resolution}, expected WIDTHxHEIGHT.')
+    return (width, height)
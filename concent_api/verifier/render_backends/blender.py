@@ -0,0 +1,66 @@
+import logging
+import subprocess
+from functools import lru_cache
+
+from django.conf import settings
+from mypy.types import Optional
+
+from common.helpers import get_current_utc_timestamp
+from verifier.utils import adjust_format_name
+from verifier.utils import generate_base_blender_output_file_name
+from verifier.utils import generate_verifier_storage_file_path
+
+
+logger = logging.getLogger(__name__)
+
+
+def run_blender(
+    scene_file: str,
+    output_format: str,
+    frame_number: int,
+    verification_deadline: int,
+    script_file: Optional[str],
+) -> subprocess.CompletedProcess:
+    output_format = adjust_format_name(output_format)
+
+    blender_command = [
+        "blender",
+        "-b", f"{generate_verifier_storage_file_path(scene_file)}",
+    ]
+
+    if script_file is not None:
+        blender_command += [
+            "-y",  # enable scripting by default
+            "-P", f"{generate_verifier_storage_file_path(script_file)}",
+        ]
+
+    blender_command += [
+        "-o", f"{generate_base_blender_output_file_name(scene_file)}",
+        "-noaudio",
+        "-F", f"{output_format}",
+        "-t", f"{settings.BLENDER_THREADS}",  # cpu_count
+        "-f", f"{frame_number}",  # frame
+    ]
+    return subprocess.run(
+        blender_command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        timeout=(verification_deadline - get_current_utc_timestamp()),
+    )
+
+
+@lru_cache()
+def get_blender_version() -> Optional[str]:
+    """ Returns the first line of `blender --version` output, or None if it cannot be determined. """
+    try:
+        completed_process = subprocess.run(
+            ["blender", "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except (OSError, subprocess.SubprocessError) as exception:
+        logger.warning(f'Blender version could not be determined, exception: {exception}')
+        return None
+    if completed_process.returncode != 0 or not completed_process.stdout.strip():
+        return None
+    return completed_process.stdout.decode(errors='replace').splitlines()[0].strip()
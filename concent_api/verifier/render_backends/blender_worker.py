@@ -0,0 +1,196 @@
+"""
+Render backend which keeps Blender running between renders. One worker process is started per scene file with
+the scene loaded and receives render jobs through its stdin, so that Blender does not start and load the scene
+again for every frame or window. Up to VERIFIER_BLENDER_WORKER_MAX_SCENES workers are kept, the least recently used
+one is stopped first. A worker is recycled after VERIFIER_BLENDER_WORKER_MAX_JOBS jobs or when its memory usage
+exceeds VERIFIER_BLENDER_WORKER_MAX_MEMORY. Workers are stopped when the process using them exits.
+"""
+from collections import OrderedDict
+from queue import Empty
+from queue import Queue
+from threading import Thread
+from typing import List
+from typing import Tuple
+import atexit
+import json
+import logging
+import os
+import subprocess
+import time
+
+from celery.signals import worker_process_shutdown
+from django.conf import settings
+from mypy.types import Optional
+
+from common.helpers import get_current_utc_timestamp
+from verifier.render_backends import blender
+from verifier.utils import adjust_format_name
+from verifier.utils import generate_base_blender_output_file_name
+from verifier.utils import generate_verifier_storage_file_path
+from ..constants import BLENDER_WORKER_RESULT_PREFIX
+from ..constants import BLENDER_WORKER_STOP_TIMEOUT
+
+
+logger = logging.getLogger(__name__)
+
+# Scene files are identified by path and inode, so that a file replaced by the next verification, even with the same
+# name, gets a new worker. A source package linked from the cache keeps its inode and its worker.
+SceneIdentity = Tuple[str, int, int, int]
+
+
+class BlenderWorker:
+
+    def __init__(self, scene_file_path: str) -> None:
+        self.jobs_count = 0
+        self._process = subprocess.Popen(
+            get_blender_worker_command(scene_file_path),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        # Output is read in a separate thread, so that waiting for the result of a job can time out.
+        self._output_lines = Queue()  # type: Queue
+        self._reader_thread = Thread(target=self._read_output, daemon=True)
+        self._reader_thread.start()
+
+    def _read_output(self) -> None:
+        for line in self._process.stdout:
+            self._output_lines.put(line)
+        self._output_lines.put(None)
+
+    def is_alive(self) -> bool:
+        return self._process.poll() is None
+
+    def get_memory_usage(self) -> int:
+        """ Returns resident set size of the worker process in bytes, or 0 if it cannot be determined. """
+        try:
+            with open(f'/proc/{self._process.pid}/statm') as statm_file:
+                return int(statm_file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def render(self, job: dict, timeout: float) -> subprocess.CompletedProcess:
+        """
+        Sends the job to the worker and waits for its result. Raises subprocess.TimeoutExpired and stops the worker
+        if the job does not finish in time.
+        """
+        self.jobs_count += 1
+        self._process.stdin.write((json.dumps(job) + '\n').encode())
+        self._process.stdin.flush()
+
+        output_lines = []  # type: List[bytes]
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                line = self._output_lines.get(timeout=max(deadline - time.monotonic(), 0))
+            except Empty:
+                # Blender may be in the middle of rendering, so it is not asked to exit.
+                self._process.kill()
+                self.stop()
+                raise subprocess.TimeoutExpired(self._process.args, timeout, output=b''.join(output_lines))
+            if line is None:
+                # Blender crashed or exited, so the job ends just like a failed Blender process would.
+                return subprocess.CompletedProcess(self._process.args, self._process.wait() or 1, b''.join(output_lines), b'')
+            if line.startswith(BLENDER_WORKER_RESULT_PREFIX.encode()):
+                returncode = json.loads(line[len(BLENDER_WORKER_RESULT_PREFIX):].decode())['returncode']
+                output = b''.join(output_lines)
+                # Blender writes errors to stdout, so the output is also passed as stderr when the job fails.
+                return subprocess.CompletedProcess(self._process.args, returncode, output, output if returncode != 0 else b'')
+            output_lines.append(line)
+
+    def stop(self) -> None:
+        if self._process.poll() is None:
+            self._process.stdin.close()
+            try:
+                self._process.wait(timeout=BLENDER_WORKER_STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._reader_thread.join()
+
+
+_workers = OrderedDict()  # type: OrderedDict
+
+
+def run_blender(
+    scene_file: str,
+    output_format: str,
+    frame_number: int,
+    verification_deadline: int,
+    script_file: Optional[str],
+) -> subprocess.CompletedProcess:
+    scene_file_path = generate_verifier_storage_file_path(scene_file)
+    worker = get_blender_worker(scene_file_path)
+    try:
+        return worker.render(
+            {
+                'script_file': generate_verifier_storage_file_path(script_file) if script_file is not None else None,
+                'output': generate_base_blender_output_file_name(scene_file),
+                'output_format': adjust_format_name(output_format),
+                'threads': settings.BLENDER_THREADS,
+                'frame_number': frame_number,
+            },
+            timeout=verification_deadline - get_current_utc_timestamp(),
+        )
+    finally:
+        if (
+            not worker.is_alive() or
+            worker.jobs_count >= settings.VERIFIER_BLENDER_WORKER_MAX_JOBS or
+            worker.get_memory_usage() > settings.VERIFIER_BLENDER_WORKER_MAX_MEMORY
+        ):
+            logger.info(f'Blender worker for scene {scene_file} is stopped after {worker.jobs_count} jobs.')
+            remove_blender_worker(worker)
+
+
+def get_blender_version() -> Optional[str]:
+    return blender.get_blender_version()
+
+
+def get_blender_worker(scene_file_path: str) -> BlenderWorker:
+    """ Returns worker with the scene loaded, starting a new one if needed, and marks it as recently used. """
+    scene_stat = os.stat(scene_file_path)
+    scene_identity = (scene_file_path, scene_stat.st_ino, scene_stat.st_size, scene_stat.st_mtime_ns)  # type: SceneIdentity
+    if scene_identity in _workers:
+        _workers.move_to_end(scene_identity)
+        return _workers[scene_identity]
+
+    while len(_workers) >= settings.VERIFIER_BLENDER_WORKER_MAX_SCENES:
+        (_, least_recently_used_worker) = _workers.popitem(last=False)
+        least_recently_used_worker.stop()
+
+    worker = BlenderWorker(scene_file_path)
+    _workers[scene_identity] = worker
+    return worker
+
+
+def remove_blender_worker(worker: BlenderWorker) -> None:
+    for (scene_identity, other_worker) in list(_workers.items()):
+        if other_worker is worker:
+            del _workers[scene_identity]
+    worker.stop()
+
+
+def stop_blender_workers() -> None:
+    while _workers:
+        (_, worker) = _workers.popitem()
+        worker.stop()
+
+
+# Celery pool processes exit without running atexit handlers, so workers are also stopped when they shut down.
+atexit.register(stop_blender_workers)
+
+
+@worker_process_shutdown.connect
+def stop_blender_workers_on_worker_process_shutdown(**_kwargs) -> None:
+    stop_blender_workers()
+
+
+def get_blender_worker_command(scene_file_path: str) -> List[str]:
+    return [
+        "blender",
+        "-b", scene_file_path,
+        "-y",  # enable scripting by default
+        "-noaudio",
+        "-P", os.path.join(os.path.dirname(os.path.abspath(__file__)), 'blender_worker_script.py'),
+        "--", BLENDER_WORKER_RESULT_PREFIX,
+    ]
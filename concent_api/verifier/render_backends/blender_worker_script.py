@@ -0,0 +1,88 @@
+"""
+Control script run by a long-lived Blender process started by verifier.render_backends.blender_worker.
+It must be executed by Blender, e.g. `blender -b scene.blend -y -P blender_worker_script.py -- PREFIX`, and does not import
+anything from Concent.
+
+The scene given on the command line stays loaded. Render jobs are read from stdin, one JSON object per line,
+and each is answered with a single line starting with the prefix passed after `--` followed by a JSON object.
+Anything else written to stdout, e.g. Blender's own messages, belongs to the output of the current job.
+
+Every job is processed just like a separate `blender -b scene -y -P script -o output -F format -t threads -f frame`
+call. Render settings changed by the job's script are restored afterwards, so that they do not affect next jobs.
+"""
+import json
+import sys
+import traceback
+
+import bpy  # pylint: disable=import-error
+
+
+def get_settings_to_restore():
+    settings_to_restore = []
+    for scene in bpy.data.scenes:
+        settings_to_restore += [scene.render, scene.render.image_settings]
+        if hasattr(scene, 'cycles'):
+            settings_to_restore.append(scene.cycles)
+    return settings_to_restore
+
+
+def save_settings(settings_to_restore):
+    saved_settings = []
+    for settings in settings_to_restore:
+        for rna_property in settings.bl_rna.properties:
+            if rna_property.identifier == 'rna_type' or rna_property.is_readonly or rna_property.type in {'POINTER', 'COLLECTION'}:
+                continue
+            value = getattr(settings, rna_property.identifier)
+            # Array properties are returned as views of the settings and must be copied.
+            if getattr(rna_property, 'is_array', False):
+                value = tuple(value)
+            saved_settings.append((settings, rna_property.identifier, value))
+    return saved_settings
+
+
+def restore_settings(saved_settings):
+    for (settings, identifier, value) in saved_settings:
+        try:
+            setattr(settings, identifier, value)
+        except (AttributeError, TypeError, ValueError):
+            # Some properties cannot be set in every state of the scene, e.g. enums depending on the render engine.
+            pass
+
+
+def render(job):
+    if job['script_file'] is not None:
+        with open(job['script_file']) as script_file:
+            exec(compile(script_file.read(), job['script_file'], 'exec'), {'__name__': '__main__'})  # pylint: disable=exec-used
+
+    for scene in bpy.data.scenes:
+        scene.render.filepath = job['output']
+        scene.render.image_settings.file_format = job['output_format']
+        scene.render.threads_mode = 'FIXED'
+        scene.render.threads = job['threads']
+
+    scene = bpy.context.scene
+    scene.frame_set(job['frame_number'])
+    bpy.ops.render.render(write_still=True)
+
+
+def main():
+    # Blender leaves arguments after `--` for the script.
+    result_prefix = sys.argv[sys.argv.index('--') + 1]
+    saved_settings = save_settings(get_settings_to_restore())
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        try:
+            render(job)
+            returncode = 0
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc(file=sys.stdout)
+            returncode = 1
+        finally:
+            restore_settings(saved_settings)
+        sys.stdout.write(result_prefix + json.dumps({'returncode': returncode}) + '\n')
+        sys.stdout.flush()
+
+
+main()
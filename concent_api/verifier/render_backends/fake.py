@@ -0,0 +1,55 @@
+"""
+Render backend which does not need Blender. Instead of rendering the scene it writes a deterministic image of
+VERIFIER_FAKE_RENDER_RESOLUTION after waiting VERIFIER_FAKE_RENDER_LATENCY seconds, so that the verification flow
+can be exercised and benchmarked on machines without Blender. The Blender script, including the render border,
+is ignored and the whole image is always written.
+"""
+import subprocess
+import time
+import zlib
+
+from django.conf import settings
+from mypy.types import Optional
+from numpy.core.records import ndarray
+import numpy
+
+from verifier.utils import generate_full_blender_output_file_name
+from verifier.utils import import_cv2
+
+
+def run_blender(
+    scene_file: str,
+    output_format: str,
+    frame_number: int,
+    verification_deadline: int,  # pylint: disable=unused-argument
+    script_file: Optional[str],  # pylint: disable=unused-argument
+) -> subprocess.CompletedProcess:
+    time.sleep(settings.VERIFIER_FAKE_RENDER_LATENCY)
+    write_fake_image(
+        generate_full_blender_output_file_name(scene_file, frame_number, output_format),
+        scene_file,
+        frame_number,
+    )
+    return subprocess.CompletedProcess(args=[], returncode=0, stdout=b'', stderr=b'')
+
+
+def get_blender_version() -> Optional[str]:
+    (width, height) = settings.VERIFIER_FAKE_RENDER_RESOLUTION
+    return f'Fake renderer {width}x{height}'
+
+
+def generate_fake_image(scene_file: str, frame_number: int) -> ndarray:
+    """ Returns an image which depends only on the scene file name, the frame number and the configured resolution. """
+    (width, height) = settings.VERIFIER_FAKE_RENDER_RESOLUTION
+    random_state = numpy.random.RandomState(zlib.crc32(f'{scene_file}:{frame_number}'.encode()))
+    return random_state.randint(0, 256, size=(height, width, 3), dtype=numpy.uint8)
+
+
+def write_fake_image(file_path: str, scene_file: str, frame_number: int) -> None:
+    """
+    Writes the fake image to a file in the format determined by its extension. Can be used to prepare result files
+    which match images written by this backend.
+    """
+    cv2 = import_cv2()
+    if not cv2.imwrite(file_path, generate_fake_image(scene_file, frame_number)):
+        raise OSError(f'Fake image could not be written to {file_path}')
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from mypy.types import Optional
+
+from common.constants import ErrorCode
+from common.helpers import get_current_utc_timestamp
+from common.logging import log_string_message
+from verifier.cache import get_cache_entry_path
+from verifier.exceptions import VerificationError
+from .constants import CACHE_TEMPORARY_DIRECTORY_SUFFIX
+from .constants import FRAME_RENDER_TIME_CACHE_DIRECTORY
+from .constants import FRAME_RENDER_TIME_SMOOTHING_FACTOR
+from .constants import VERIFICATION_ORDER_MAX_PRIORITY
+
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_verification_time(frames_count: int, packages_size: int, frame_render_time: float) -> float:
+    """ Returns estimated number of seconds needed to download packages of given total size and render all frames. """
+    return packages_size / settings.VERIFIER_ESTIMATED_DOWNLOAD_RATE + frames_count * frame_render_time
+
+
+def get_verification_order_priority(verification_deadline: int, estimated_verification_time: float) -> int:
+    """
+    Returns Celery priority of the verification order based on its slack, i.e. time left after the estimated
+    verification would finish. Orders with less slack get higher priority, so workers take the one closest to missing
+    its deadline first. Every VERIFIER_PRIORITY_SLACK_STEP seconds of slack lower the priority by one.
+    """
+    slack = verification_deadline - get_current_utc_timestamp() - estimated_verification_time
+    priority = VERIFICATION_ORDER_MAX_PRIORITY - int(max(slack, 0) // settings.VERIFIER_PRIORITY_SLACK_STEP)
+    return max(priority, 0)
+
+
+def ensure_verification_can_finish_before_deadline(
+    subtask_id: str,
+    verification_deadline: int,
+    estimated_verification_time: float,
+) -> None:
+    """
+    Ends verification with an error before any work is done if its deadline has passed while the order was waiting
+    in the queue. If the deadline is still ahead but the verification is estimated to take longer, it is only logged,
+    unless VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE is enabled.
+    """
+    current_timestamp = get_current_utc_timestamp()
+    if verification_deadline <= current_timestamp:
+        error_message = f'Verification deadline {verification_deadline} has passed before verification started.'
+    elif current_timestamp + estimated_verification_time > verification_deadline:
+        error_message = (
+            f'Verification is estimated to take {estimated_verification_time:.0f} seconds '
+            f'and cannot finish before deadline {verification_deadline}.'
+        )
+        if not settings.VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE:
+            log_string_message(logger, f'{error_message} SUBTASK_ID: {subtask_id}.')
+            return
+    else:
+        return
+
+    log_string_message(
+        logger,
+        f'{error_message} SUBTASK_ID: {subtask_id}.',
+        f'ErrorCode: {ErrorCode.VERIFIER_VERIFICATION_DEADLINE_CANNOT_BE_MET.name}'
+    )
+    raise VerificationError(
+        error_message,
+        ErrorCode.VERIFIER_VERIFICATION_DEADLINE_CANNOT_BE_MET,
+        subtask_id,
+    )
+
+
+def get_frame_render_time_estimate(source_package_hash: str, scene_file: str) -> float:
+    """
+    Returns average number of seconds Blender needed to render a frame of the scene on this verifier so far,
+    or VERIFIER_ESTIMATED_FRAME_RENDER_TIME if the scene has not been rendered yet or caching is disabled.
+    """
+    if settings.VERIFIER_CACHE_PATH is None:
+        return settings.VERIFIER_ESTIMATED_FRAME_RENDER_TIME
+
+    try:
+        with open(get_frame_render_time_file_path(source_package_hash, scene_file)) as file:
+            return float(file.read())
+    except (OSError, ValueError):
+        return settings.VERIFIER_ESTIMATED_FRAME_RENDER_TIME
+
+
+def record_frame_render_time(source_package_hash: Optional[str], scene_file: str, render_time: float) -> None:
+    """
+    Updates the exponential moving average of the time needed to render a frame of the scene.
+    Render times are kept in VERIFIER_CACHE_PATH and are not recorded if caching is disabled.
+    """
+    if settings.VERIFIER_CACHE_PATH is None or source_package_hash is None:
+        return
+
+    file_path = get_frame_render_time_file_path(source_package_hash, scene_file)
+    if os.path.exists(file_path):
+        previous_render_time = get_frame_render_time_estimate(source_package_hash, scene_file)
+        render_time = (
+            FRAME_RENDER_TIME_SMOOTHING_FACTOR * render_time +
+            (1 - FRAME_RENDER_TIME_SMOOTHING_FACTOR) * previous_render_time
+        )
+
+    # The file is replaced atomically so that other workers never read a partially written value.
+    temporary_file_path = f'{file_path}.{os.getpid()}{CACHE_TEMPORARY_DIRECTORY_SUFFIX}'
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(temporary_file_path, 'w') as file:
+            file.write(str(render_time))
+        os.replace(temporary_file_path, file_path)
+    except OSError as exception:
+        logger.warning(f'Render time of scene {scene_file} was not recorded, exception: {exception}')
+
+
+def get_frame_render_time_file_path(source_package_hash: str, scene_file: str) -> str:
+    return get_cache_entry_path(
+        FRAME_RENDER_TIME_CACHE_DIRECTORY,
+        hashlib.sha1(f'{source_package_hash}\n{scene_file}'.encode()).hexdigest(),
+    )
@@ -0,0 +1,133 @@
+import math
+from typing import Iterator
+from typing import Tuple
+
+import numpy
+from numpy.core.records import ndarray
+
+from .constants import SSIM_BYTES_PER_TILE_ELEMENT
+from .constants import SSIM_K1
+from .constants import SSIM_K2
+from .constants import SSIM_WINDOW_SIZE
+
+
+def compute_ssim(image_1: ndarray, image_2: ndarray, memory_limit: int) -> float:
+    """
+    Computes mean structural similarity of two images, averaged over all colour channels.
+
+    The result is the same as the one of skimage.measure.compare_ssim(image_1, image_2, multichannel=True) with default
+    parameters, i.e. the mean of SSIM over every 7x7 window lying entirely inside the image. Instead of filtering whole
+    images at once, windows are processed in tiles overlapping by the window size, so that intermediate floating point
+    arrays never take more than roughly `memory_limit` bytes, regardless of image size.
+    """
+    if image_1.shape != image_2.shape:
+        raise ValueError('Input images must have the same dimensions.')
+    if image_1.ndim == 2:
+        image_1 = image_1[:, :, numpy.newaxis]
+        image_2 = image_2[:, :, numpy.newaxis]
+
+    (height, width, channels) = image_1.shape
+    if min(height, width) < SSIM_WINDOW_SIZE:
+        raise ValueError('win_size exceeds image extent.')
+
+    data_range = get_ssim_data_range(image_1)
+    ssim_sum = 0.0
+    for (rows, columns) in iterate_over_ssim_tiles(height, width, channels, memory_limit):
+        ssim_sum += compute_ssim_sum_for_tile(
+            image_1[rows, columns],
+            image_2[rows, columns],
+            data_range,
+        )
+
+    number_of_windows = (height - SSIM_WINDOW_SIZE + 1) * (width - SSIM_WINDOW_SIZE + 1) * channels
+    return float(ssim_sum / number_of_windows)
+
+
+def get_ssim_data_range(image: ndarray) -> float:
+    # Same assumptions as in scikit-image: integer images span the whole range of their type
+    # and floating point images lie between -1 and 1.
+    if numpy.issubdtype(image.dtype, numpy.integer):
+        type_info = numpy.iinfo(image.dtype)
+        return float(type_info.max) - float(type_info.min)
+    return 2.0
+
+
+def iterate_over_ssim_tiles(height: int, width: int, channels: int, memory_limit: int) -> Iterator[Tuple[slice, slice]]:
+    """
+    Yields row and column slices of image tiles which together contain every SSIM window exactly once.
+    Neighbouring tiles overlap by SSIM_WINDOW_SIZE - 1 pixels.
+    """
+    (tile_height, tile_width) = get_ssim_tile_shape(height, width, channels, memory_limit)
+    windows_per_tile_row = tile_height - SSIM_WINDOW_SIZE + 1
+    windows_per_tile_column = tile_width - SSIM_WINDOW_SIZE + 1
+
+    for first_row in range(0, height - SSIM_WINDOW_SIZE + 1, windows_per_tile_row):
+        for first_column in range(0, width - SSIM_WINDOW_SIZE + 1, windows_per_tile_column):
+            yield (
+                slice(first_row, min(first_row + tile_height, height)),
+                slice(first_column, min(first_column + tile_width, width)),
+            )
+
+
+def get_ssim_tile_shape(height: int, width: int, channels: int, memory_limit: int) -> Tuple[int, int]:
+    """
+    Returns the largest tile shape that fits in the memory limit. Full-width strips are preferred because they are cheaper
+    to slice. The tile is never smaller than two windows in each direction, even if the limit is lower than that.
+    """
+    minimum_tile_size = min(2 * SSIM_WINDOW_SIZE, height, width)
+    max_tile_pixels = max(
+        memory_limit // (SSIM_BYTES_PER_TILE_ELEMENT * channels),
+        minimum_tile_size ** 2,
+    )
+
+    if max_tile_pixels // width >= minimum_tile_size:
+        return (min(height, max_tile_pixels // width), width)
+
+    tile_size = int(math.sqrt(max_tile_pixels))
+    return (min(height, tile_size), min(width, tile_size))
+
+
+def compute_ssim_sum_for_tile(tile_1: ndarray, tile_2: ndarray, data_range: float) -> float:
+    """ Returns the sum of SSIM values of all windows lying entirely inside the tile, summed over all channels. """
+    x = tile_1.astype(numpy.float64)
+    y = tile_2.astype(numpy.float64)
+
+    mean_x = compute_window_means(x)
+    mean_y = compute_window_means(y)
+    # Sample covariance, as in scikit-image.
+    covariance_normalization = SSIM_WINDOW_SIZE ** 2 / (SSIM_WINDOW_SIZE ** 2 - 1)
+    variance_x = covariance_normalization * (compute_window_means(x * x) - mean_x * mean_x)
+    variance_y = covariance_normalization * (compute_window_means(y * y) - mean_y * mean_y)
+    covariance = covariance_normalization * (compute_window_means(x * y) - mean_x * mean_y)
+
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+    ssim_map = (
+        ((2 * mean_x * mean_y + c1) * (2 * covariance + c2)) /
+        ((mean_x * mean_x + mean_y * mean_y + c1) * (variance_x + variance_y + c2))
+    )
+    return float(ssim_map.sum())
+
+
+def compute_window_means(array: ndarray) -> ndarray:
+    """
+    Returns the mean of every SSIM_WINDOW_SIZE x SSIM_WINDOW_SIZE window lying entirely inside the array,
+    separately for each channel. Uses cumulative sums so the cost does not depend on the window size.
+    """
+    window_sums = array
+    for axis in (0, 1):
+        cumulative_sums = numpy.cumsum(window_sums, axis=axis)
+        leading = [slice(None)] * window_sums.ndim
+        trailing = [slice(None)] * window_sums.ndim
+        leading[axis] = slice(SSIM_WINDOW_SIZE, None)
+        trailing[axis] = slice(None, -SSIM_WINDOW_SIZE)
+        first_window = [slice(None)] * window_sums.ndim
+        first_window[axis] = slice(SSIM_WINDOW_SIZE - 1, SSIM_WINDOW_SIZE)
+        window_sums = numpy.concatenate(
+            (
+                cumulative_sums[tuple(first_window)],
+                cumulative_sums[tuple(leading)] - cumulative_sums[tuple(trailing)],
+            ),
+            axis=axis,
+        )
+    return window_sums / SSIM_WINDOW_SIZE ** 2
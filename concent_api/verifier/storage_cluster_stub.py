@@ -0,0 +1,157 @@
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock
+from threading import Thread
+from typing import Tuple
+import os
+import re
+
+from mypy.types import Optional
+
+from gatekeeper.constants import CLUSTER_DOWNLOAD_PATH
+from .constants import STORAGE_CLUSTER_STUB_CHUNK_SIZE
+
+
+class StorageClusterStub:
+    """
+    Minimal local imitation of the storage cluster used to exercise verifier without the real one. Files from
+    `storage_path` are served at download/<path>, also with HTTP range requests, and anything posted to upload/
+    is accepted and counted. File transfer tokens are not checked.
+    """
+
+    def __init__(self, storage_path: str, bind_address: str='127.0.0.1', port: int=0) -> None:
+        self.storage_path = storage_path
+        self.uploaded_files_count = 0
+        self.uploaded_bytes = 0
+        self._lock = Lock()
+        self._server = _StorageClusterStubServer((bind_address, port), self)
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def address(self) -> str:
+        (host, port) = self._server.server_address
+        return f'http://{host}:{port}/'
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> 'StorageClusterStub':
+        self.start()
+        return self
+
+    def __exit__(self, *_args) -> None:
+        self.stop()
+
+    def register_upload(self, size: int) -> None:
+        with self._lock:
+            self.uploaded_files_count += 1
+            self.uploaded_bytes += size
+
+
+class _StorageClusterStubServer(ThreadingMixIn, HTTPServer):
+    """ HTTP server handling each request in a new thread. Request handlers reach the stub through it. """
+
+    daemon_threads = True
+
+    def __init__(self, server_address: Tuple[str, int], storage_cluster_stub: StorageClusterStub) -> None:
+        super().__init__(server_address, _StorageClusterStubRequestHandler)
+        self.storage_cluster_stub = storage_cluster_stub
+
+
+class _StorageClusterStubRequestHandler(BaseHTTPRequestHandler):
+
+    # Keeps connections alive, so that verifier can reuse them just like with the real storage cluster.
+    protocol_version = 'HTTP/1.1'
+
+    server = None  # type: _StorageClusterStubServer
+
+    def do_HEAD(self):
+        self._send_file(include_body=False)
+
+    def do_GET(self):
+        self._send_file(include_body=True)
+
+    def do_POST(self):
+        if self.path.lstrip('/') != 'upload/':
+            self._send_empty_response(404)
+            return
+
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            size = self._read_chunked_body()
+        else:
+            size = len(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        self.server.storage_cluster_stub.register_upload(size)
+        self._send_empty_response(200)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        # Requests are not logged, because the stub is used to measure verifier performance.
+        pass
+
+    def _send_file(self, include_body: bool) -> None:
+        file_path = self._get_file_path()
+        if file_path is None or not os.path.isfile(file_path):
+            self._send_empty_response(404)
+            return
+
+        file_size = os.path.getsize(file_path)
+        byte_range = re.fullmatch(r'bytes=(\d+)-(\d*)', str(self.headers.get('Range', '')))
+        if byte_range is None:
+            (first_byte, last_byte) = (0, file_size - 1)
+            self.send_response(200)
+        else:
+            first_byte = int(byte_range.group(1))
+            last_byte = min(int(byte_range.group(2)), file_size - 1) if byte_range.group(2) != '' else file_size - 1
+            if first_byte > last_byte:
+                self._send_empty_response(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {first_byte}-{last_byte}/{file_size}')
+        self.send_header('Content-Length', str(last_byte - first_byte + 1))
+        self.end_headers()
+
+        if include_body:
+            with open(file_path, 'rb') as file:
+                file.seek(first_byte)
+                _copy_bytes(file, self.wfile, last_byte - first_byte + 1)
+
+    def _get_file_path(self) -> Optional[str]:
+        path = self.path.lstrip('/')
+        if not path.startswith(CLUSTER_DOWNLOAD_PATH):
+            return None
+        relative_path = os.path.normpath(path[len(CLUSTER_DOWNLOAD_PATH):])
+        if os.path.isabs(relative_path) or relative_path.startswith('..'):
+            return None
+        return os.path.join(self.server.storage_cluster_stub.storage_path, relative_path)
+
+    def _read_chunked_body(self) -> int:
+        size = 0
+        while True:
+            chunk_size = int(self.rfile.readline().split(b';')[0], 16)
+            if chunk_size == 0:
+                # Skip trailers, if any, up to the empty line ending the body.
+                while self.rfile.readline() not in (b'\r\n', b'\n', b''):
+                    pass
+                return size
+            size += len(self.rfile.read(chunk_size))
+            self.rfile.readline()
+
+    def _send_empty_response(self, status_code: int) -> None:
+        self.send_response(status_code)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def _copy_bytes(source, destination, length: int) -> None:
+    remaining = length
+    while remaining > 0:
+        chunk = source.read(min(remaining, STORAGE_CLUSTER_STUB_CHUNK_SIZE))
+        if not chunk:
+            break
+        destination.write(chunk)
+        remaining -= len(chunk)
@@ -1,3 +1,4 @@
+from contextlib import ExitStack
 import logging
 import os
 from typing import List
@@ -15,20 +16,30 @@ from core.transfer_operations import create_file_transfer_token_for_concent
 from common.decorators import log_task_errors
 from common.decorators import provides_concent_feature
 from common.logging import log_string_message
+from verifier.archive_manifest import build_archive_manifest
+from verifier.archive_manifest import get_archive_manifest_file_names
+from verifier.archive_manifest import open_archive
+from verifier.cache import link_cached_source_package
+from verifier.cache import store_source_package_in_cache
 from verifier.decorators import handle_verification_results
+from verifier.disk_space import estimate_required_disk_space
+from verifier.disk_space import reserve_disk_space
+from verifier.scheduling import ensure_verification_can_finish_before_deadline
+from verifier.scheduling import estimate_verification_time
+from verifier.scheduling import get_frame_render_time_estimate
+from verifier.scheduling import get_verification_order_priority
 from verifier.utils import delete_source_files
 from verifier.utils import download_archives_from_storage
 from verifier.utils import unpack_archives
 from verifier.utils import validate_downloaded_archives
-from .utils import compare_all_rendered_images_with_user_results_files
 from .utils import compare_minimum_ssim_with_results
 from .utils import ensure_enough_result_files_provided
 from .utils import ensure_frames_have_related_files_to_compare
-from .utils import get_files_list_from_archive
-from .utils import generate_verifier_storage_file_path
+from .utils import get_frames_to_verify
+from .utils import open_remote_archive
+from .utils import parse_blender_crop_script
 from .utils import parse_result_files_with_frames
-from .utils import render_images_by_frames
-from .utils import upload_blender_output_file
+from .utils import render_upload_and_compare_frames
 
 
 logger = logging.getLogger(__name__)
@@ -88,6 +99,40 @@ def blender_verification_order(
         )
         return
 
+    # Long frame lists may be verified using a sample of frames. Sampled frames are rendered first.
+    frames_to_verify = get_frames_to_verify(frames, subtask_id)
+
+    # Order which cannot be finished in time is rejected before anything is downloaded or rendered.
+    estimated_verification_time = estimate_verification_time(
+        len(frames_to_verify),
+        source_size + result_size,
+        get_frame_render_time_estimate(source_package_hash, scene_file),
+    )
+    ensure_verification_can_finish_before_deadline(subtask_id, verification_deadline, estimated_verification_time)
+
+    # If there is not enough disk space for the packages, the order is put back in the queue, so that it is taken
+    # later or by another verifier. The deadline is checked again when it is taken.
+    if not reserve_disk_space(subtask_id, estimate_required_disk_space(source_size, result_size), verification_deadline):
+        blender_verification_order.apply_async(
+            kwargs=dict(
+                subtask_id=subtask_id,
+                source_package_path=source_package_path,
+                source_size=source_size,
+                source_package_hash=source_package_hash,
+                result_package_path=result_package_path,
+                result_size=result_size,
+                result_package_hash=result_package_hash,
+                output_format=output_format,
+                scene_file=scene_file,
+                verification_deadline=verification_deadline,
+                frames=frames,
+                blender_crop_script=blender_crop_script,
+            ),
+            countdown=settings.VERIFIER_DISK_SPACE_RETRY_DELAY,
+            priority=get_verification_order_priority(verification_deadline, estimated_verification_time),
+        )
+        return
+
     # Generate a FileTransferToken valid for a download of any file listed in the order.
     file_transfer_token = create_file_transfer_token_for_concent(
         subtask_id=subtask_id,
@@ -105,60 +150,112 @@ def blender_verification_order(
         result_package_path: f'result_{os.path.basename(result_package_path)}',
     }
 
-    download_archives_from_storage(
-        file_transfer_token,
-        subtask_id,
-        package_paths_to_downloaded_archive_names
-    )
+    # If another subtask of the same task has been verified recently, its unpacked source package is linked into
+    # the workspace and only the result package is downloaded.
+    cached_source_files_list = link_cached_source_package(source_package_hash)
+    package_paths_to_archive_names_to_download = dict(package_paths_to_downloaded_archive_names)
+    files_of_packages_not_downloaded = []  # type: List[str]
+    if cached_source_files_list is not None:
+        del package_paths_to_archive_names_to_download[source_package_path]
+        files_of_packages_not_downloaded += cached_source_files_list
 
-    validate_downloaded_archives(subtask_id, package_paths_to_downloaded_archive_names.values(), scene_file)
+    # The result archive is closed when verification ends or fails. If it is read from the storage cluster, this closes
+    # connections used to read it.
+    with ExitStack() as exit_stack:
+        # Result package may contain many more files than the ones which are going to be compared. In such case only
+        # its central directory is read from the storage cluster at first and the needed files are downloaded later.
+        if settings.VERIFIER_PARTIAL_RESULT_PACKAGE_DOWNLOAD:
+            del package_paths_to_archive_names_to_download[result_package_path]
+            result_archive = open_remote_archive(file_transfer_token, result_package_path, result_size, subtask_id)
+            exit_stack.callback(result_archive.close)
+            files_of_packages_not_downloaded += result_archive.namelist()
 
-    unpack_archives(package_paths_to_downloaded_archive_names.values(), subtask_id)
+        download_archives_from_storage(
+            file_transfer_token,
+            subtask_id,
+            package_paths_to_archive_names_to_download
+        )
 
-    result_files_list = get_files_list_from_archive(
-        generate_verifier_storage_file_path(package_paths_to_downloaded_archive_names[result_package_path])
-    )
+        # Downloaded archives are listed once and the manifests are used by all further steps.
+        package_paths_to_archive_manifests = {
+            package_path: build_archive_manifest(archive_name, subtask_id)
+            for (package_path, archive_name) in package_paths_to_archive_names_to_download.items()
+        }
 
-    ensure_enough_result_files_provided(
-        frames=frames,
-        result_files_list=result_files_list,
-        subtask_id=subtask_id,
-    )
+        validate_downloaded_archives(
+            subtask_id,
+            package_paths_to_archive_manifests.values(),
+            scene_file,
+            files_of_packages_not_downloaded,
+        )
 
-    parsed_files_to_compare = parse_result_files_with_frames(
-        frames=frames,
-        result_files_list=result_files_list,
-        output_format=output_format,
-    )
+        # Result files are decoded straight from the result archive, so only the source package is unpacked.
+        unpack_archives(
+            [
+                archive_manifest
+                for (package_path, archive_manifest) in package_paths_to_archive_manifests.items()
+                if package_path != result_package_path
+            ],
+            subtask_id,
+        )
 
-    ensure_frames_have_related_files_to_compare(
-        frames=frames,
-        parsed_files_to_compare=parsed_files_to_compare,
-        subtask_id=subtask_id,
-    )
+        if cached_source_files_list is None:
+            source_files_list = get_archive_manifest_file_names(package_paths_to_archive_manifests[source_package_path])
+            store_source_package_in_cache(source_package_hash, source_files_list)
+        else:
+            source_files_list = cached_source_files_list
 
-    (blender_output_file_name_list, parsed_files_to_compare) = render_images_by_frames(
-        parsed_files_to_compare=parsed_files_to_compare,
-        frames=frames,
-        output_format=output_format,
-        scene_file=scene_file,
-        subtask_id=subtask_id,
-        verification_deadline=verification_deadline,
-        blender_crop_script=blender_crop_script,
-    )
+        if settings.VERIFIER_PARTIAL_RESULT_PACKAGE_DOWNLOAD:
+            result_files_list = result_archive.namelist()
+        else:
+            result_files_list = get_archive_manifest_file_names(package_paths_to_archive_manifests[result_package_path])
+            result_archive = open_archive(package_paths_to_archive_manifests[result_package_path])
+            exit_stack.callback(result_archive.close)
 
-    delete_source_files(package_paths_to_downloaded_archive_names[source_package_path])
+        ensure_enough_result_files_provided(
+            frames=frames,
+            result_files_list=result_files_list,
+            subtask_id=subtask_id,
+        )
 
-    upload_blender_output_file(
-        frames=frames,
-        blender_output_file_name_list=blender_output_file_name_list,
-        output_format=output_format,
-        subtask_id=subtask_id,
-    )
+        parsed_files_to_compare = parse_result_files_with_frames(
+            frames=frames,
+            result_files_list=result_files_list,
+            output_format=output_format,
+        )
 
-    ssim_list = compare_all_rendered_images_with_user_results_files(
-        parsed_files_to_compare=parsed_files_to_compare,
-        subtask_id=subtask_id,
-    )
+        ensure_frames_have_related_files_to_compare(
+            frames=frames,
+            parsed_files_to_compare=parsed_files_to_compare,
+            subtask_id=subtask_id,
+        )
+
+        # If the crop script defines a render border, only the part of the frame inside it is rendered and compared.
+        crop_region = parse_blender_crop_script(blender_crop_script)
+
+        # Frames are compared and uploaded while the next ones are being rendered.
+        # Rendering stops at the first frame that does not match.
+        try:
+            ssim_list = render_upload_and_compare_frames(
+                parsed_files_to_compare=parsed_files_to_compare,
+                frames=frames_to_verify,
+                output_format=output_format,
+                scene_file=scene_file,
+                subtask_id=subtask_id,
+                verification_deadline=verification_deadline,
+                blender_crop_script=blender_crop_script,
+                crop_region=crop_region,
+                source_package_hash=source_package_hash,
+                result_archive=result_archive,
+            )
+        finally:
+            # Blender output files are added to the list of files to compare of every rendered frame.
+            log_string_message(
+                logger,
+                f'Frames rendered for SUBTASK_ID {subtask_id}: '
+                f'{sum(1 for frame_files in parsed_files_to_compare.values() if len(frame_files) > 1)} of {len(frames)}.'
+            )
+
+    delete_source_files(package_paths_to_downloaded_archive_names[source_package_path], source_files_list)
 
     compare_minimum_ssim_with_results(ssim_list, subtask_id)
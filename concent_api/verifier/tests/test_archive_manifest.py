@@ -0,0 +1,75 @@
+import os
+import zipfile
+
+from assertpy import assert_that
+from django.test import override_settings
+import pytest
+
+from verifier.archive_manifest import ArchiveManifestEntry
+from verifier.archive_manifest import build_archive_manifest
+from verifier.archive_manifest import extract_archive
+from verifier.exceptions import VerificationMismatch
+
+
+class TestArchiveManifest(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.verifier_storage_path = str(tmpdir)
+        with override_settings(
+            VERIFIER_STORAGE_PATH=self.verifier_storage_path,
+            VERIFIER_ARCHIVE_MAX_ENTRIES=1000,
+            VERIFIER_ARCHIVE_MAX_UNCOMPRESSED_SIZE=1024 * 1024,
+            VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO=None,
+            VERIFIER_UNPACK_THREADS=4,
+        ):
+            yield
+
+    def _create_archive(self, files, compression=zipfile.ZIP_STORED):
+        with zipfile.ZipFile(os.path.join(self.verifier_storage_path, 'source.zip'), 'w', compression) as zip_file:
+            for (file_name, content) in files.items():
+                zip_file.writestr(file_name, content)
+
+    def test_that_manifest_lists_names_sizes_and_crcs_of_archive_entries(self):
+        self._create_archive({'kitten.blend': b'kitten'})
+
+        archive_manifest = build_archive_manifest('source.zip', self.subtask_id)
+
+        assert_that(archive_manifest.archive_name).is_equal_to('source.zip')
+        assert_that(archive_manifest.entries).is_equal_to([
+            ArchiveManifestEntry(name='kitten.blend', file_size=6, compress_size=6, crc=zipfile.crc32(b'kitten')),
+        ])
+
+    def test_that_archive_which_is_not_a_zip_file_raises_verification_mismatch(self):
+        with open(os.path.join(self.verifier_storage_path, 'source.zip'), 'wb') as file:
+            file.write(b'not a zip file')
+
+        with pytest.raises(VerificationMismatch) as exception_wrapper:
+            build_archive_manifest('source.zip', self.subtask_id)
+        assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
+
+    @pytest.mark.parametrize(('files', 'settings_to_override'), [
+        ({f'{i}.png': b'' for i in range(11)}, {'VERIFIER_ARCHIVE_MAX_ENTRIES': 10}),
+        ({'a.png': b'a' * 600, 'b.png': b'b' * 600}, {'VERIFIER_ARCHIVE_MAX_UNCOMPRESSED_SIZE': 1000}),
+        ({'a.png': b'a' * 100000}, {'VERIFIER_ARCHIVE_MAX_COMPRESSION_RATIO': 100}),
+        ({'../a.png': b'a'}, {}),
+        ({'/tmp/a.png': b'a'}, {}),
+    ])
+    def test_that_archive_exceeding_limits_raises_verification_mismatch(self, files, settings_to_override):
+        self._create_archive(files, zipfile.ZIP_DEFLATED)
+
+        with override_settings(**settings_to_override):
+            with pytest.raises(VerificationMismatch):
+                build_archive_manifest('source.zip', self.subtask_id)
+
+    def test_that_all_archive_entries_are_extracted(self):
+        files = {f'textures/{i}/texture.png': bytes([i]) * 100 for i in range(100)}
+        files['kitten.blend'] = b'kitten'
+        self._create_archive(files)
+
+        extract_archive(build_archive_manifest('source.zip', self.subtask_id))
+
+        for (file_name, content) in files.items():
+            with open(os.path.join(self.verifier_storage_path, file_name), 'rb') as file:
+                assert_that(file.read()).is_equal_to(content)
@@ -0,0 +1,127 @@
+import os
+import subprocess
+import sys
+
+from assertpy import assert_that
+from celery.signals import worker_process_shutdown
+from django.test import override_settings
+import mock
+import pytest
+
+from verifier.render_backends import blender_worker
+from verifier.utils import generate_full_blender_output_file_name
+
+
+# Imitates Blender running blender_worker_script.py. Jobs for frame 13 fail and jobs for frame 666 never finish.
+FAKE_BLENDER_WORKER_SCRIPT = '''
+import json
+import sys
+import time
+
+result_prefix = sys.argv[sys.argv.index('--') + 1]
+for line in sys.stdin:
+    job = json.loads(line)
+    print('Fra:{} rendering'.format(job['frame_number']))
+    if job['frame_number'] == 666:
+        time.sleep(60)
+    returncode = 1 if job['frame_number'] == 13 else 0
+    if returncode == 0:
+        with open('{}{:04}.{}'.format(job['output'], job['frame_number'], job['output_format'].lower()), 'w') as file:
+            file.write('image')
+    print(result_prefix + json.dumps({'returncode': returncode}))
+    sys.stdout.flush()
+'''
+
+
+class TestBlenderWorker(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.verifier_storage_path = str(tmpdir.mkdir('verifier_storage'))
+        self.fake_blender_worker_script_path = str(tmpdir.join('fake_blender_worker_script.py'))
+        with open(self.fake_blender_worker_script_path, 'w') as file:
+            file.write(FAKE_BLENDER_WORKER_SCRIPT)
+        self._create_scene_file('scene.blend')
+
+        with override_settings(
+            VERIFIER_STORAGE_PATH=self.verifier_storage_path,
+            VERIFIER_BLENDER_WORKER_MAX_SCENES=2,
+            VERIFIER_BLENDER_WORKER_MAX_JOBS=10,
+            VERIFIER_BLENDER_WORKER_MAX_MEMORY=1024 * 1024 * 1024,
+        ), mock.patch(
+            'verifier.render_backends.blender_worker.get_blender_worker_command',
+            side_effect=lambda _scene_file_path: self._get_fake_blender_worker_command(),
+        ), mock.patch(
+            'verifier.render_backends.blender_worker.BlenderWorker',
+            wraps=blender_worker.BlenderWorker,
+        ) as self.mock_blender_worker:  # noqa: E125
+            yield
+            blender_worker.stop_blender_workers()
+
+    def _get_fake_blender_worker_command(self):
+        return [sys.executable, self.fake_blender_worker_script_path, '--', blender_worker.BLENDER_WORKER_RESULT_PREFIX]
+
+    def _create_scene_file(self, scene_file):
+        with open(os.path.join(self.verifier_storage_path, scene_file), 'w') as file:
+            file.write(scene_file)
+
+    def _render(self, frame_number, scene_file='scene.blend', verification_deadline=None):
+        return blender_worker.run_blender(
+            scene_file,
+            'PNG',
+            frame_number,
+            verification_deadline if verification_deadline is not None else blender_worker.get_current_utc_timestamp() + 60,
+            None,
+        )
+
+    def test_that_one_worker_renders_all_frames_of_the_scene(self):
+        for frame_number in [1, 2, 3]:
+            completed_process = self._render(frame_number)
+
+            assert_that(completed_process.args).is_equal_to(self._get_fake_blender_worker_command())
+            assert_that(completed_process.returncode).is_equal_to(0)
+            assert_that(completed_process.stdout).contains(f'Fra:{frame_number}'.encode())
+            assert_that(os.path.isfile(generate_full_blender_output_file_name('scene.blend', frame_number, 'PNG'))).is_true()
+
+        assert_that(self.mock_blender_worker.call_count).is_equal_to(1)
+
+    def test_that_worker_is_recycled_after_maximum_number_of_jobs(self):
+        with override_settings(VERIFIER_BLENDER_WORKER_MAX_JOBS=2):
+            for frame_number in [1, 2, 3]:
+                self._render(frame_number)
+
+        assert_that(self.mock_blender_worker.call_count).is_equal_to(2)
+
+    def test_that_replaced_scene_file_gets_new_worker_and_least_recently_used_worker_is_stopped(self):
+        with override_settings(VERIFIER_BLENDER_WORKER_MAX_SCENES=1):
+            self._render(1)
+            self._create_scene_file('other_scene.blend')
+            self._render(1, 'other_scene.blend')
+            os.remove(os.path.join(self.verifier_storage_path, 'scene.blend'))
+            self._create_scene_file('scene.blend')
+            os.utime(os.path.join(self.verifier_storage_path, 'scene.blend'), ns=(1, 1))
+            self._render(2)
+
+        assert_that(self.mock_blender_worker.call_count).is_equal_to(3)
+        assert_that(blender_worker._workers).is_length(1)  # pylint: disable=protected-access
+
+    def test_that_failed_job_returns_output_as_stderr_and_worker_is_kept(self):
+        completed_process = self._render(13)
+        self._render(1)
+
+        assert_that(completed_process.returncode).is_equal_to(1)
+        assert_that(completed_process.stderr).contains(b'Fra:13')
+        assert_that(self.mock_blender_worker.call_count).is_equal_to(1)
+
+    def test_that_worker_which_does_not_finish_before_deadline_is_stopped(self):
+        with pytest.raises(subprocess.TimeoutExpired):
+            self._render(666, verification_deadline=blender_worker.get_current_utc_timestamp() + 1)
+
+        assert_that(blender_worker._workers).is_empty()  # pylint: disable=protected-access
+
+    def test_that_workers_are_stopped_when_celery_worker_process_shuts_down(self):
+        self._render(1)
+
+        worker_process_shutdown.send(sender=None, pid=os.getpid(), exitcode=0)
+
+        assert_that(blender_worker._workers).is_empty()  # pylint: disable=protected-access
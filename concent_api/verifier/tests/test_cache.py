@@ -0,0 +1,207 @@
+import os
+import subprocess
+
+from assertpy import assert_that
+from django.test import override_settings
+import mock
+import pytest
+
+from verifier.cache import evict_least_recently_used_cache_entries
+from verifier.cache import get_cache_entry_path
+from verifier.cache import get_render_cache_key
+from verifier.cache import link_cached_render
+from verifier.cache import link_cached_source_package
+from verifier.cache import remove_cache_entry
+from verifier.cache import store_render_in_cache
+from verifier.cache import store_source_package_in_cache
+from verifier.constants import RENDER_CACHE_DIRECTORY
+from verifier.constants import SOURCE_PACKAGE_CACHE_DIRECTORY
+from verifier.utils import render_image
+
+
+class TestSourcePackageCache(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.source_package_hash = 'sha1:95a0f391c7ad86686ab1366bcd519ba5ab3cce89'
+        self.verifier_storage_path = str(tmpdir.mkdir('verifier_storage'))
+        self.verifier_cache_path = str(tmpdir.mkdir('verifier_cache'))
+        self.source_files = {
+            'scene.blend': b'scene',
+            'textures/texture.png': b'texture',
+        }
+        for (file_name, content) in self.source_files.items():
+            os.makedirs(os.path.dirname(os.path.join(self.verifier_storage_path, file_name)), exist_ok=True)
+            with open(os.path.join(self.verifier_storage_path, file_name), 'wb') as file:
+                file.write(content)
+
+        with override_settings(
+            VERIFIER_STORAGE_PATH=self.verifier_storage_path,
+            VERIFIER_CACHE_PATH=self.verifier_cache_path,
+            VERIFIER_SOURCE_PACKAGE_CACHE_QUOTA=1024,
+        ):
+            yield
+
+    def _clean_verifier_storage(self):
+        for file_name in self.source_files:
+            os.remove(os.path.join(self.verifier_storage_path, file_name))
+
+    def _is_cached(self, source_package_hash):
+        return os.path.isdir(get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, source_package_hash))
+
+    def test_that_source_package_is_not_cached_until_it_is_stored(self):
+        assert_that(link_cached_source_package(self.source_package_hash)).is_none()
+
+    def test_that_stored_source_package_is_linked_into_verifier_storage(self):
+        store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+        self._clean_verifier_storage()
+
+        cached_files_list = link_cached_source_package(self.source_package_hash)
+
+        assert_that(sorted(cached_files_list)).is_equal_to(sorted(self.source_files))
+        for (file_name, content) in self.source_files.items():
+            with open(os.path.join(self.verifier_storage_path, file_name), 'rb') as file:
+                assert_that(file.read()).is_equal_to(content)
+
+    def test_that_cached_files_are_read_only(self):
+        store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+
+        cache_entry_path = get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, self.source_package_hash)
+        for file_name in self.source_files:
+            assert_that(os.stat(os.path.join(cache_entry_path, file_name)).st_mode & 0o222).is_equal_to(0)
+
+    def test_that_files_already_present_in_verifier_storage_are_not_replaced_by_cached_ones(self):
+        store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+        self._clean_verifier_storage()
+        with open(os.path.join(self.verifier_storage_path, 'scene.blend'), 'wb') as file:
+            file.write(b'result')
+
+        link_cached_source_package(self.source_package_hash)
+
+        with open(os.path.join(self.verifier_storage_path, 'scene.blend'), 'rb') as file:
+            assert_that(file.read()).is_equal_to(b'result')
+
+    def test_that_source_package_evicted_while_being_linked_is_not_used_and_leaves_no_files_behind(self):
+        store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+        self._clean_verifier_storage()
+        cache_entry_path = get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, self.source_package_hash)
+        link = os.link
+
+        def link_and_evict(source_path, destination_path):
+            # Another worker evicts the entry right after the first file has been linked.
+            link(source_path, destination_path)
+            remove_cache_entry(cache_entry_path)
+
+        with mock.patch('verifier.cache.os.link', side_effect=link_and_evict):
+            cached_files_list = link_cached_source_package(self.source_package_hash)
+
+        assert_that(cached_files_list).is_none()
+        for file_name in self.source_files:
+            assert_that(os.path.exists(os.path.join(self.verifier_storage_path, file_name))).is_false()
+
+    def test_that_source_package_evicted_while_being_listed_is_not_used(self):
+        store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+        self._clean_verifier_storage()
+        cache_entry_path = get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, self.source_package_hash)
+        scandir = os.scandir
+
+        def evict_and_scandir(path):
+            # Another worker evicts the entry after its top directory has been listed.
+            if path != cache_entry_path:
+                remove_cache_entry(cache_entry_path)
+            return scandir(path)
+
+        with mock.patch('os.scandir', side_effect=evict_and_scandir):
+            cached_files_list = link_cached_source_package(self.source_package_hash)
+
+        assert_that(cached_files_list).is_none()
+        for file_name in self.source_files:
+            assert_that(os.path.exists(os.path.join(self.verifier_storage_path, file_name))).is_false()
+
+    def test_that_nothing_is_cached_if_caching_is_disabled(self):
+        with override_settings(VERIFIER_CACHE_PATH=None):
+            store_source_package_in_cache(self.source_package_hash, list(self.source_files))
+
+            assert_that(link_cached_source_package(self.source_package_hash)).is_none()
+        assert_that(os.listdir(self.verifier_cache_path)).is_empty()
+
+    def test_that_least_recently_used_source_packages_are_evicted_when_quota_is_exceeded(self):
+        other_source_package_hashes = ['sha1:1', 'sha1:2']
+        for (i, source_package_hash) in enumerate(other_source_package_hashes + [self.source_package_hash]):
+            store_source_package_in_cache(source_package_hash, list(self.source_files))
+            os.utime(get_cache_entry_path(SOURCE_PACKAGE_CACHE_DIRECTORY, source_package_hash), (i, i))
+
+        # Every package takes 12 bytes, so only the two most recently used ones fit in the quota.
+        evict_least_recently_used_cache_entries(SOURCE_PACKAGE_CACHE_DIRECTORY, 24)
+
+        assert_that(self._is_cached('sha1:1')).is_false()
+        assert_that(self._is_cached('sha1:2')).is_true()
+        assert_that(self._is_cached(self.source_package_hash)).is_true()
+
+
+class TestRenderCache(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.source_package_hash = 'sha1:95a0f391c7ad86686ab1366bcd519ba5ab3cce89'
+        self.verifier_storage_path = str(tmpdir.mkdir('verifier_storage'))
+        self.verifier_cache_path = str(tmpdir.mkdir('verifier_cache'))
+        self.blender_output_file_path = os.path.join(self.verifier_storage_path, 'out_scene.blend_0001.png')
+        self.render_cache_key = get_render_cache_key(self.source_package_hash, 'scene.blend', 1, 'PNG', None, 'Blender 2.79')
+
+        with override_settings(
+            VERIFIER_STORAGE_PATH=self.verifier_storage_path,
+            VERIFIER_CACHE_PATH=self.verifier_cache_path,
+            VERIFIER_RENDER_CACHE_QUOTA=1024,
+        ):
+            yield
+
+    def _render(self, *_args, **_kwargs):
+        with open(self.blender_output_file_path, 'wb') as file:
+            file.write(b'image')
+        return subprocess.CompletedProcess([], 0)
+
+    def test_that_render_cache_key_depends_on_blender_script_and_version(self):
+        keys = {
+            self.render_cache_key,
+            get_render_cache_key(self.source_package_hash, 'scene.blend', 1, 'PNG', 'script', 'Blender 2.79'),
+            get_render_cache_key(self.source_package_hash, 'scene.blend', 1, 'PNG', None, 'Blender 2.80'),
+            get_render_cache_key(self.source_package_hash, 'scene.blend', 2, 'PNG', None, 'Blender 2.79'),
+        }
+
+        assert_that(keys).is_length(4)
+
+    def test_that_cached_render_is_linked_to_blender_output_file_path(self):
+        self._render()
+        store_render_in_cache(self.render_cache_key, self.blender_output_file_path)
+        os.remove(self.blender_output_file_path)
+
+        assert_that(link_cached_render(self.render_cache_key, self.blender_output_file_path)).is_true()
+        with open(self.blender_output_file_path, 'rb') as file:
+            assert_that(file.read()).is_equal_to(b'image')
+
+    def test_that_damaged_cached_render_is_removed_instead_of_being_used(self):
+        self._render()
+        store_render_in_cache(self.render_cache_key, self.blender_output_file_path)
+        os.remove(self.blender_output_file_path)
+        cache_entry_path = get_cache_entry_path(RENDER_CACHE_DIRECTORY, self.render_cache_key)
+        (cached_file_name, ) = os.listdir(cache_entry_path)
+        os.chmod(os.path.join(cache_entry_path, cached_file_name), 0o644)
+        with open(os.path.join(cache_entry_path, cached_file_name), 'wb') as file:
+            file.write(b'damaged')
+
+        assert_that(link_cached_render(self.render_cache_key, self.blender_output_file_path)).is_false()
+        assert_that(os.path.exists(cache_entry_path)).is_false()
+        assert_that(os.path.exists(self.blender_output_file_path)).is_false()
+
+    def test_that_blender_is_run_only_once_for_the_same_frame_of_the_same_source_package(self):
+        with mock.patch('verifier.utils.get_blender_version', return_value='Blender 2.79'), \
+            mock.patch('verifier.utils.run_blender', side_effect=self._render) as mock_run_blender:  # noqa: E125
+            for _ in range(2):
+                render_image(1, 'PNG', 'scene.blend', self.subtask_id, None, source_package_hash=self.source_package_hash)
+                os.remove(self.blender_output_file_path)
+            render_image(1, 'PNG', 'scene.blend', self.subtask_id, None)
+
+        assert_that(mock_run_blender.call_count).is_equal_to(2)
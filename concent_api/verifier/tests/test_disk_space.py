@@ -0,0 +1,99 @@
+import fcntl
+import os
+
+from assertpy import assert_that
+from django.test import override_settings
+import mock
+import pytest
+
+from common.helpers import get_current_utc_timestamp
+from verifier.constants import DISK_RESERVATION_LOCK_FILE
+from verifier.disk_space import estimate_required_disk_space
+from verifier.disk_space import get_disk_reservation_file_path
+from verifier.disk_space import get_disk_space_metrics
+from verifier.disk_space import release_disk_space
+from verifier.disk_space import reserve_disk_space
+
+
+class TestDiskSpaceReservations(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.verification_deadline = get_current_utc_timestamp() + 60
+        self.disk_reservation_path = str(tmpdir.join('reservations'))
+        self.verifier_cache_path = str(tmpdir.mkdir('cache'))
+        with override_settings(
+            VERIFIER_STORAGE_PATH=str(tmpdir.mkdir('verifier')),
+            VERIFIER_CACHE_PATH=self.verifier_cache_path,
+            VERIFIER_DISK_RESERVATION_PATH=self.disk_reservation_path,
+            VERIFIER_MIN_FREE_DISK_SPACE=100,
+        ), mock.patch(
+            'verifier.disk_space.shutil.disk_usage',
+            return_value=mock.Mock(free=1000),
+        ):  # noqa: E125
+            yield
+
+    def _add_reservation_of_other_worker(self, file_name, required_space, verification_deadline):
+        with open(os.path.join(self.disk_reservation_path, file_name), 'w') as reservation_file:
+            reservation_file.write(f'{required_space} {verification_deadline}')
+
+    def test_that_required_disk_space_includes_archives_unpacked_source_package_and_rendered_images(self):
+        with override_settings(VERIFIER_ESTIMATED_UNPACKED_SIZE_RATIO=3):
+            assert_that(estimate_required_disk_space(100, 10)).is_equal_to(100 + 10 + 300 + 10)
+
+    def test_that_disk_space_is_reserved_until_it_is_released(self):
+        assert_that(reserve_disk_space(self.subtask_id, 900, self.verification_deadline)).is_true()
+        assert_that(get_disk_space_metrics().reserved_space).is_equal_to(900)
+
+        release_disk_space()
+
+        assert_that(get_disk_space_metrics().reserved_space).is_equal_to(0)
+        assert_that(os.path.exists(get_disk_reservation_file_path())).is_false()
+
+    def test_that_disk_space_is_not_reserved_if_it_is_needed_by_other_verifications(self):
+        os.makedirs(self.disk_reservation_path)
+        self._add_reservation_of_other_worker('other-host.1', 500, self.verification_deadline)
+
+        assert_that(reserve_disk_space(self.subtask_id, 401, self.verification_deadline)).is_false()
+        assert_that(reserve_disk_space(self.subtask_id, 400, self.verification_deadline)).is_true()
+
+    def test_that_expired_and_damaged_reservations_are_ignored(self):
+        os.makedirs(self.disk_reservation_path)
+        self._add_reservation_of_other_worker('other-host.1', 500, get_current_utc_timestamp() - 1)
+        with open(os.path.join(self.disk_reservation_path, 'other-host.2'), 'w') as reservation_file:
+            reservation_file.write('damaged')
+
+        assert_that(reserve_disk_space(self.subtask_id, 900, self.verification_deadline)).is_true()
+
+    def test_that_metrics_include_free_space_reserved_space_and_cache_size(self):
+        with open(os.path.join(self.verifier_cache_path, 'cached_file'), 'wb') as cached_file:
+            cached_file.write(b'x' * 10)
+        reserve_disk_space(self.subtask_id, 200, self.verification_deadline)
+
+        disk_space_metrics = get_disk_space_metrics()
+
+        assert_that(disk_space_metrics.free_space).is_equal_to(1000)
+        assert_that(disk_space_metrics.reserved_space).is_equal_to(200)
+        assert_that(disk_space_metrics.cache_size).is_equal_to(10)
+
+    def test_that_cache_size_is_computed_after_disk_reservations_are_unlocked(self):
+        def get_directory_size_checking_lock(directory_path):
+            with open(os.path.join(self.disk_reservation_path, DISK_RESERVATION_LOCK_FILE)) as lock_file:
+                # Raises BlockingIOError if the lock is still held.
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            return 0
+
+        with mock.patch(
+            'verifier.disk_space.get_directory_size',
+            side_effect=get_directory_size_checking_lock,
+        ) as mock_get_directory_size:  # noqa: E125
+            assert_that(reserve_disk_space(self.subtask_id, 200, self.verification_deadline)).is_true()
+
+        mock_get_directory_size.assert_called_once_with(self.verifier_cache_path)
+
+    def test_that_disk_space_is_always_available_if_reservations_are_disabled(self):
+        with override_settings(VERIFIER_DISK_RESERVATION_PATH=None):
+            assert_that(reserve_disk_space(self.subtask_id, 10 ** 12, self.verification_deadline)).is_true()
+            release_disk_space()
@@ -0,0 +1,77 @@
+import io
+import re
+import zipfile
+
+from assertpy import assert_that
+import mock
+import pytest
+import requests
+
+from verifier.http_range_file import HttpRangeFile
+from verifier.http_range_file import HttpRangeZipFile
+
+
+class TestHttpRangeFile(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr('result_0001.png', b'1' * 1000)
+            for i in range(100):
+                zip_file.writestr(f'extra_{i}.bin', bytes(range(256)) * 400)
+        self.archive_content = archive.getvalue()
+        self.requested_ranges = []
+        self.session = mock.create_autospec(spec=requests.Session, spec_set=True)
+        self.session.get.side_effect = self._get
+
+    def _get(self, _url, headers):
+        (first_byte, last_byte) = map(int, re.match(r'bytes=(\d+)-(\d+)$', headers['Range']).groups())
+        self.requested_ranges.append((first_byte, last_byte))
+        return mock.Mock(status_code=206, content=self.archive_content[first_byte:last_byte + 1])
+
+    def _open(self, buffer_size=4096):
+        return io.BufferedReader(
+            HttpRangeFile('http://storage/download/result.zip', len(self.archive_content), self.session),
+            buffer_size=buffer_size,
+        )
+
+    def test_that_file_can_be_read_from_any_position(self):
+        remote_file = self._open()
+
+        remote_file.seek(-100, io.SEEK_END)
+        assert_that(remote_file.read()).is_equal_to(self.archive_content[-100:])
+        remote_file.seek(10)
+        assert_that(remote_file.read(20)).is_equal_to(self.archive_content[10:30])
+
+    def test_that_only_central_directory_and_needed_member_are_downloaded(self):
+        with zipfile.ZipFile(self._open()) as zip_file:
+            assert_that(zip_file.namelist()).is_length(101)
+            assert_that(zip_file.read('result_0001.png')).is_equal_to(b'1' * 1000)
+
+        downloaded_bytes = sum(last_byte - first_byte + 1 for (first_byte, last_byte) in self.requested_ranges)
+        assert_that(downloaded_bytes).is_less_than(len(self.archive_content) // 2)
+
+    def test_that_server_ignoring_range_header_raises_os_error(self):
+        self.session.get.side_effect = None
+        self.session.get.return_value = mock.Mock(status_code=200, content=self.archive_content)
+
+        with pytest.raises(OSError):
+            self._open().read(10)
+
+    def test_that_closing_remote_archive_closes_session(self):
+        zip_file = HttpRangeZipFile('http://storage/download/result.zip', len(self.archive_content), self.session, buffer_size=4096)
+        assert_that(zip_file.namelist()).is_length(101)
+        self.session.close.assert_not_called()
+
+        zip_file.close()
+
+        self.session.close.assert_called_once_with()
+
+    def test_that_session_is_closed_if_remote_file_is_not_an_archive(self):
+        self.archive_content = bytes(1000)
+
+        with pytest.raises(zipfile.BadZipFile):
+            HttpRangeZipFile('http://storage/download/result.zip', len(self.archive_content), self.session, buffer_size=4096)
+
+        self.session.close.assert_called_once_with()
@@ -104,12 +104,12 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage,\
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True) as mock_open_archive, \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.mocked_parse_result_files_with_frames()) as mock_parse_result_files_with_frames, \
-            mock.patch('verifier.tasks.render_images_by_frames', autospec=True, return_value=(self.blender_output_file_name_list, self.parsed_all_files)) as mock_render_image, \
+            mock.patch('verifier.tasks.render_upload_and_compare_frames', autospec=True, return_value=[1.0]) as mock_render_image, \
             mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
-            mock.patch('verifier.tasks.upload_blender_output_file', autospec=True) as mock_try_to_upload_file, \
-            mock.patch('verifier.tasks.compare_all_rendered_images_with_user_results_files') as compare_all_rendered_images_with_user_results_files, \
             mock.patch('verifier.tasks.compare_minimum_ssim_with_results', side_effect=self._verification_results_match(self.subtask_id)) as compare_minimum_ssim_with_results:  # noqa: E125
 
             current_time = get_current_utc_timestamp()
@@ -129,11 +129,13 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
                 self.report_computed_task.task_to_compute,
             ),
             blender_crop_script=self.compute_task_def['extra_data']['script_src'],
+            crop_region=None,
+            source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+            result_archive=mock_open_archive.return_value,
         )
         self.assertEqual(mock_delete_source_files.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
-        self.assertEqual(mock_try_to_upload_file.call_count, 1)
-        self.assertEqual(compare_all_rendered_images_with_user_results_files.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(compare_minimum_ssim_with_results.call_count, 1)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
         self.mock_verification_result.assert_called_once_with(
@@ -145,12 +147,12 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True) as mock_open_archive, \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.mocked_parse_result_files_with_frames()) as mock_parse_result_files_with_frames, \
-            mock.patch('verifier.tasks.render_images_by_frames', autospec=True, return_value=(self.blender_output_file_name_list, self.parsed_all_files)) as mock_render_image, \
+            mock.patch('verifier.tasks.render_upload_and_compare_frames', autospec=True, return_value=[1.0]) as mock_render_image, \
             mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
-            mock.patch('verifier.tasks.upload_blender_output_file', autospec=True) as mock_try_to_upload_file, \
-            mock.patch('verifier.tasks.compare_all_rendered_images_with_user_results_files', autospec=True) as mock_compare_all_rendered_images_with_user_results_files, \
             mock.patch('verifier.tasks.compare_minimum_ssim_with_results', side_effect=self._verification_results_mismatch(self.subtask_id)) as compare_minimum_ssim_with_results:  # noqa: E125
             current_time = get_current_utc_timestamp()
             self._send_blender_verification_order(current_time=current_time)
@@ -169,13 +171,15 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
                 self.report_computed_task.task_to_compute,
             ),
             blender_crop_script=self.compute_task_def['extra_data']['script_src'],
+            crop_region=None,
+            source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+            result_archive=mock_open_archive.return_value,
         )
         self.assertEqual(mock_delete_source_files.call_count, 1)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
-        self.assertEqual(mock_try_to_upload_file.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(compare_minimum_ssim_with_results.call_count, 1)
-        self.assertEqual(mock_compare_all_rendered_images_with_user_results_files.call_count, 1)
         self.mock_verification_result.assert_called_once_with(
             self.subtask_id,
             VerificationResult.MISMATCH.name,
@@ -202,8 +206,25 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
             ErrorCode.VERIFIER_FILE_DOWNLOAD_FAILED.name,
         )
 
+    @override_settings(VERIFIER_DISK_SPACE_RETRY_DELAY=30)
+    def test_that_blender_verification_order_is_requeued_without_downloading_anything_if_disk_space_is_not_available(self):
+        with mock.patch('verifier.tasks.reserve_disk_space', autospec=True, return_value=False) as mock_reserve_disk_space, \
+            mock.patch('verifier.tasks.blender_verification_order.apply_async', autospec=True) as mock_apply_async, \
+            mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
+            mock.patch('core.tasks.verification_result.delay', autospec=True) as mock_verification_result:  # noqa: E125
+            self._send_blender_verification_order()
+
+        self.assertEqual(mock_reserve_disk_space.call_count, 1)
+        self.assertEqual(mock_apply_async.call_count, 1)
+        self.assertEqual(mock_apply_async.call_args[1]['kwargs']['subtask_id'], self.subtask_id)
+        self.assertEqual(mock_apply_async.call_args[1]['kwargs']['frames'], self.frames)
+        self.assertEqual(mock_apply_async.call_args[1]['countdown'], 30)
+        self.assertEqual(mock_download_archives_from_storage.call_count, 0)
+        self.assertEqual(mock_verification_result.call_count, 0)
+
     def test_that_blender_verification_order_should_call_verification_result_with_result_error_if_validation_of_downloaded_archives_fails(self):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True), \
             mock.patch(
                 'verifier.tasks.validate_downloaded_archives',
                 side_effect=VerificationError(
@@ -225,6 +246,7 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
 
     def test_blender_verification_order_should_call_verification_result_with_result_error_if_unpacking_archive_fails(self):
         with  mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True), \
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', side_effect=VerificationError(
             "error",
@@ -248,23 +270,26 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True), \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.mocked_parse_result_files_with_frames()) as mock_parse_result_files_with_frames, \
             mock.patch('core.tasks.verification_result.delay', autospec=True) as mock_verification_result, \
             mock.patch(
-                'verifier.tasks.render_images_by_frames',
+                'verifier.tasks.render_upload_and_compare_frames',
                 side_effect=VerificationError(
                     'error',
                     ErrorCode.VERIFIER_RUNNING_BLENDER_FAILED,
                     self.subtask_id
                 ),
-                autospec=True, return_value=(True, True)):  # noqa: E125
+                autospec=True):  # noqa: E125
 
             self._send_blender_verification_order()
 
         self.assertEqual(mock_download_archives_from_storage.call_count, 1)
         self.assertEqual(mock_validate_downloaded_archives.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
         self.assertEqual(mock_unpack_archives.call_count, 1)
         mock_verification_result.assert_called_once_with(
@@ -278,20 +303,20 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True) as mock_open_archive, \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.mocked_parse_result_files_with_frames()) as mock_parse_result_files_with_frames, \
-            mock.patch('verifier.tasks.render_images_by_frames', autospec=True, return_value=(self.blender_output_file_name_list, self.parsed_all_files)) as mock_render_image, \
-            mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
-            mock.patch('verifier.tasks.upload_blender_output_file', autospec=True) as mock_try_to_upload_file, \
             mock.patch(
-                'verifier.tasks.compare_all_rendered_images_with_user_results_files',
+                'verifier.tasks.render_upload_and_compare_frames',
                 autospec=True,
                 side_effect=VerificationError(
                     'error',
                     ErrorCode.VERIFIER_LOADING_FILES_INTO_MEMORY_FAILED,
                     self.subtask_id
                 ),
-            ), \
+            ) as mock_render_image, \
+            mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
             mock.patch('verifier.tasks.verification_result.delay', autospec=True) as mock_verification_result:  # noqa: E125
 
             current_time = get_current_utc_timestamp()
@@ -300,7 +325,8 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         self.assertEqual(mock_download_archives_from_storage.call_count, 1)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
         self.assertEqual(mock_validate_downloaded_archives.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(mock_unpack_archives.call_count, 1)
         mock_render_image.assert_called_once_with(
             frames=self.frames,
@@ -313,9 +339,11 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
                 self.report_computed_task.task_to_compute,
             ),
             blender_crop_script=self.compute_task_def['extra_data']['script_src'],
+            crop_region=None,
+            source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+            result_archive=mock_open_archive.return_value,
         )
-        self.assertEqual(mock_delete_source_files.call_count, 1)
-        self.assertEqual(mock_try_to_upload_file.call_count, 1)
+        self.assertEqual(mock_delete_source_files.call_count, 0)
         mock_verification_result.assert_called_once_with(
             self.subtask_id,
             VerificationResult.ERROR.name,
@@ -327,20 +355,20 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage, \
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True) as mock_open_archive, \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.mocked_parse_result_files_with_frames()) as mock_parse_result_files_with_frames, \
-            mock.patch('verifier.tasks.render_images_by_frames', autospec=True, return_value=(self.blender_output_file_name_list, self.parsed_all_files)) as mock_render_image, \
-            mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
-            mock.patch('verifier.tasks.upload_blender_output_file', autospec=True) as mock_try_to_upload_file, \
             mock.patch(
-                'verifier.tasks.compare_all_rendered_images_with_user_results_files',
+                'verifier.tasks.render_upload_and_compare_frames',
                 autospec=True,
                 side_effect=VerificationError(
                     'error',
                     ErrorCode.VERIFIER_COMPUTING_SSIM_FAILED,
                     self.subtask_id
                 ),
-            ), \
+            ) as mock_render_image, \
+            mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
             mock.patch('verifier.tasks.verification_result.delay', autospec=True) as mock_verification_result:  # noqa: E125
 
             current_time = get_current_utc_timestamp()
@@ -349,7 +377,8 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         self.assertEqual(mock_download_archives_from_storage.call_count, 1)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
         self.assertEqual(mock_validate_downloaded_archives.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(mock_unpack_archives.call_count, 1)
         mock_render_image.assert_called_once_with(
             frames=self.frames,
@@ -362,9 +391,11 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
                 self.report_computed_task.task_to_compute,
             ),
             blender_crop_script=self.compute_task_def['extra_data']['script_src'],
+            crop_region=None,
+            source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+            result_archive=mock_open_archive.return_value,
         )
-        self.assertEqual(mock_delete_source_files.call_count, 1)
-        self.assertEqual(mock_try_to_upload_file.call_count, 1)
+        self.assertEqual(mock_delete_source_files.call_count, 0)
         mock_verification_result.assert_called_once_with(
             self.subtask_id,
             VerificationResult.ERROR.name,
@@ -376,12 +407,12 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
         with mock.patch('verifier.tasks.download_archives_from_storage', autospec=True) as mock_download_archives_from_storage,\
             mock.patch('verifier.tasks.validate_downloaded_archives', autospec=True) as mock_validate_downloaded_archives, \
             mock.patch('verifier.tasks.unpack_archives', autospec=True) as mock_unpack_archives, \
-            mock.patch('verifier.tasks.get_files_list_from_archive', autospec=True, side_effect=[self.multi_frames]) as mock_get_files_list_from_archive, \
+            mock.patch('verifier.tasks.build_archive_manifest', autospec=True) as mock_build_archive_manifest, \
+            mock.patch('verifier.tasks.open_archive', autospec=True) as mock_open_archive, \
+            mock.patch('verifier.tasks.get_archive_manifest_file_names', autospec=True, return_value=self.multi_frames) as mock_get_archive_manifest_file_names, \
             mock.patch('verifier.tasks.parse_result_files_with_frames', autospec=True, return_value=self.parsed_multi_frames_files) as mock_parse_result_files_with_frames, \
-            mock.patch('verifier.tasks.render_images_by_frames', autospec=True, return_value=(self.multi_frames_blender_output_file_name_list, self.parsed_multi_frames_files)) as mock_render_image, \
+            mock.patch('verifier.tasks.render_upload_and_compare_frames', autospec=True, return_value=[1.0, 1.0]) as mock_render_image, \
             mock.patch('verifier.tasks.delete_source_files', autospec=True) as mock_delete_source_files, \
-            mock.patch('verifier.tasks.upload_blender_output_file', autospec=True) as mock_try_to_upload_file, \
-            mock.patch('verifier.tasks.compare_all_rendered_images_with_user_results_files', autospec=True) as mock_compare_all_rendered_images_with_user_results_files, \
             mock.patch('verifier.tasks.compare_minimum_ssim_with_results', side_effect=self._verification_results_match(self.subtask_id)) as compare_minimum_ssim_with_results:  # noqa: E125
 
             current_time = get_current_utc_timestamp()
@@ -405,11 +436,13 @@ class VerifierVerificationIntegrationTest(ConcentIntegrationTestCase):
                 self.report_computed_task.task_to_compute,
             ),
             blender_crop_script=self.compute_task_def['extra_data']['script_src'],
+            crop_region=None,
+            source_package_hash=self.report_computed_task.task_to_compute.package_hash,
+            result_archive=mock_open_archive.return_value,
         )
         self.assertEqual(mock_delete_source_files.call_count, 1)
-        self.assertEqual(mock_get_files_list_from_archive.call_count, 1)
-        self.assertEqual(mock_try_to_upload_file.call_count, 1)
-        self.assertEqual(mock_compare_all_rendered_images_with_user_results_files.call_count, 1)
+        self.assertEqual(mock_build_archive_manifest.call_count, 2)
+        self.assertEqual(mock_get_archive_manifest_file_names.call_count, 2)
         self.assertEqual(compare_minimum_ssim_with_results.call_count, 1)
         self.assertEqual(mock_parse_result_files_with_frames.call_count, 1)
         self.mock_verification_result.assert_called_once_with(
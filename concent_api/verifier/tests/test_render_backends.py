@@ -0,0 +1,39 @@
+from assertpy import assert_that
+from django.test import override_settings
+import pytest
+
+from verifier.render_backends.fake import generate_fake_image
+from verifier.utils import generate_full_blender_output_file_name
+from verifier.utils import get_blender_version
+from verifier.utils import import_cv2
+from verifier.utils import run_blender
+
+
+class TestFakeRenderBackend(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        with override_settings(
+            VERIFIER_STORAGE_PATH=str(tmpdir),
+            VERIFIER_RENDER_BACKEND='verifier.render_backends.fake',
+            VERIFIER_FAKE_RENDER_RESOLUTION=(64, 48),
+            VERIFIER_FAKE_RENDER_LATENCY=0.0,
+        ):
+            yield
+
+    def test_that_fake_backend_writes_image_of_configured_size_where_blender_would(self):
+        completed_process = run_blender('scene.blend', 'PNG', 1, 0, None)
+
+        assert_that(completed_process.returncode).is_equal_to(0)
+        image = import_cv2().imread(generate_full_blender_output_file_name('scene.blend', 1, 'PNG'))
+        assert_that(image.shape).is_equal_to((48, 64, 3))
+        assert_that((image == generate_fake_image('scene.blend', 1)).all()).is_true()
+
+    def test_that_fake_images_are_deterministic_and_differ_between_frames(self):
+        assert_that((generate_fake_image('scene.blend', 1) == generate_fake_image('scene.blend', 1)).all()).is_true()
+        assert_that((generate_fake_image('scene.blend', 1) == generate_fake_image('scene.blend', 2)).all()).is_false()
+
+    def test_that_renderer_version_depends_on_backend(self):
+        assert_that(get_blender_version()).is_equal_to('Fake renderer 64x48')
+        with override_settings(VERIFIER_FAKE_RENDER_RESOLUTION=(32, 32)):
+            assert_that(get_blender_version()).is_equal_to('Fake renderer 32x32')
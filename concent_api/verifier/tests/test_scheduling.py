@@ -0,0 +1,110 @@
+from assertpy import assert_that
+from django.test import override_settings
+from freezegun import freeze_time
+import pytest
+
+from common.constants import ErrorCode
+from common.helpers import get_current_utc_timestamp
+from verifier.constants import VERIFICATION_ORDER_MAX_PRIORITY
+from verifier.exceptions import VerificationError
+from verifier.scheduling import ensure_verification_can_finish_before_deadline
+from verifier.scheduling import estimate_verification_time
+from verifier.scheduling import get_frame_render_time_estimate
+from verifier.scheduling import get_verification_order_priority
+from verifier.scheduling import record_frame_render_time
+
+
+class TestVerificationOrderPriority(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        with override_settings(
+            VERIFIER_ESTIMATED_DOWNLOAD_RATE=1024,
+            VERIFIER_PRIORITY_SLACK_STEP=60,
+        ):
+            yield
+
+    def test_that_verification_time_includes_download_and_rendering_of_all_frames(self):
+        assert_that(estimate_verification_time(3, 2048, 10.0)).is_equal_to(32.0)
+
+    @freeze_time('2018-09-01 12:00:00')
+    def test_that_order_with_less_slack_gets_higher_priority(self):
+        current_timestamp = get_current_utc_timestamp()
+
+        priorities = [
+            get_verification_order_priority(current_timestamp + deadline_offset, 100)
+            for deadline_offset in [100, 130, 250, 400, 100000]
+        ]
+
+        assert_that(priorities).is_equal_to([
+            VERIFICATION_ORDER_MAX_PRIORITY,
+            VERIFICATION_ORDER_MAX_PRIORITY,
+            VERIFICATION_ORDER_MAX_PRIORITY - 2,
+            VERIFICATION_ORDER_MAX_PRIORITY - 5,
+            0,
+        ])
+
+    @freeze_time('2018-09-01 12:00:00')
+    def test_that_order_which_cannot_meet_deadline_gets_highest_priority(self):
+        assert_that(
+            get_verification_order_priority(get_current_utc_timestamp() - 10, 100)
+        ).is_equal_to(VERIFICATION_ORDER_MAX_PRIORITY)
+
+
+class TestEnsureVerificationCanFinishBeforeDeadline(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.subtask_id = '1234-5678-9101-1213'
+        with freeze_time('2018-09-01 12:00:00'):
+            self.current_timestamp = get_current_utc_timestamp()
+            yield
+
+    def test_that_verification_which_can_finish_in_time_is_not_rejected(self):
+        with override_settings(VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE=True):
+            ensure_verification_can_finish_before_deadline(self.subtask_id, self.current_timestamp + 100, 50)
+
+    def test_that_verification_whose_deadline_has_passed_is_rejected(self):
+        with override_settings(VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE=False):
+            with pytest.raises(VerificationError) as exception_wrapper:
+                ensure_verification_can_finish_before_deadline(self.subtask_id, self.current_timestamp, 0)
+
+        assert_that(exception_wrapper.value.error_code).is_equal_to(ErrorCode.VERIFIER_VERIFICATION_DEADLINE_CANNOT_BE_MET)
+        assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
+
+    def test_that_verification_estimated_to_exceed_deadline_is_rejected_only_if_enabled(self):
+        with override_settings(VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE=False):
+            ensure_verification_can_finish_before_deadline(self.subtask_id, self.current_timestamp + 100, 150)
+
+        with override_settings(VERIFIER_REJECT_VERIFICATION_EXCEEDING_DEADLINE=True):
+            with pytest.raises(VerificationError):
+                ensure_verification_can_finish_before_deadline(self.subtask_id, self.current_timestamp + 100, 150)
+
+
+class TestFrameRenderTime(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.source_package_hash = 'sha1:95a0f391c7ad86686ab1366bcd519ba5ab3cce89'
+        with override_settings(
+            VERIFIER_CACHE_PATH=str(tmpdir),
+            VERIFIER_ESTIMATED_FRAME_RENDER_TIME=60,
+        ):
+            yield
+
+    def test_that_default_render_time_is_used_for_scene_which_has_not_been_rendered(self):
+        assert_that(get_frame_render_time_estimate(self.source_package_hash, 'scene.blend')).is_equal_to(60)
+
+    def test_that_render_time_estimate_follows_measured_render_times(self):
+        record_frame_render_time(self.source_package_hash, 'scene.blend', 10.0)
+        assert_that(get_frame_render_time_estimate(self.source_package_hash, 'scene.blend')).is_equal_to(10.0)
+
+        record_frame_render_time(self.source_package_hash, 'scene.blend', 20.0)
+        assert_that(get_frame_render_time_estimate(self.source_package_hash, 'scene.blend')).is_between(10.0, 20.0)
+        assert_that(get_frame_render_time_estimate(self.source_package_hash, 'other_scene.blend')).is_equal_to(60)
+
+    def test_that_render_times_are_not_recorded_if_caching_is_disabled(self):
+        with override_settings(VERIFIER_CACHE_PATH=None):
+            record_frame_render_time(self.source_package_hash, 'scene.blend', 10.0)
+
+        assert_that(get_frame_render_time_estimate(self.source_package_hash, 'scene.blend')).is_equal_to(60)
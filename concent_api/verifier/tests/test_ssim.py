@@ -0,0 +1,83 @@
+from assertpy import assert_that
+from numpy import ones
+from numpy.random import RandomState
+from skimage.measure import compare_ssim
+import pytest
+
+from verifier.ssim import compute_ssim
+from verifier.ssim import get_ssim_tile_shape
+from verifier.ssim import iterate_over_ssim_tiles
+
+
+class TestComputeSsim(object):
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        random_state = RandomState(1234)
+        self.image_1 = random_state.randint(0, 256, size=(61, 83, 3)).astype('uint8')
+        noise = random_state.randint(-40, 41, size=self.image_1.shape)
+        self.image_2 = (self.image_1 + noise).clip(0, 255).astype('uint8')
+
+    @pytest.mark.parametrize('memory_limit', [
+        1,
+        40 * 1024,
+        400 * 1024,
+        256 * 1024 * 1024,
+    ])
+    def test_that_tiled_ssim_is_equal_to_ssim_of_whole_images(self, memory_limit):
+        expected_ssim = compare_ssim(self.image_1, self.image_2, multichannel=True)
+
+        ssim = compute_ssim(self.image_1, self.image_2, memory_limit)
+
+        assert_that(ssim).is_close_to(expected_ssim, 1e-9)
+
+    def test_that_tiled_ssim_of_grayscale_images_is_equal_to_ssim_of_whole_images(self):
+        expected_ssim = compare_ssim(self.image_1[:, :, 0], self.image_2[:, :, 0])
+
+        ssim = compute_ssim(self.image_1[:, :, 0], self.image_2[:, :, 0], 1)
+
+        assert_that(ssim).is_close_to(expected_ssim, 1e-9)
+
+    def test_that_ssim_of_identical_images_is_equal_one(self):
+        image = ones(shape=(120, 90, 3), dtype='uint8')
+
+        assert_that(compute_ssim(image, image, 1)).is_equal_to(1.0)
+
+    def test_that_images_with_different_shapes_raise_value_error(self):
+        with pytest.raises(ValueError):
+            compute_ssim(self.image_1, self.image_2[1:], 1)
+
+    def test_that_images_smaller_than_ssim_window_raise_value_error(self):
+        with pytest.raises(ValueError):
+            compute_ssim(self.image_1[:5], self.image_2[:5], 1)
+
+
+class TestSsimTiles(object):
+
+    @pytest.mark.parametrize(('height', 'width', 'memory_limit'), [
+        (61, 83, 1),
+        (61, 83, 40 * 1024),
+        (61, 83, 256 * 1024 * 1024),
+        (7, 7, 1),
+        (200, 500, 64 * 1024),
+    ])  # pylint: disable=no-self-use
+    def test_that_tiles_contain_every_ssim_window_exactly_once(self, height, width, memory_limit):
+        window_origins = []
+        for (rows, columns) in iterate_over_ssim_tiles(height, width, 3, memory_limit):
+            window_origins += [
+                (row, column)
+                for row in range(rows.start, rows.stop - 6)
+                for column in range(columns.start, columns.stop - 6)
+            ]
+
+        assert_that(window_origins).is_length((height - 6) * (width - 6))
+        assert_that(set(window_origins)).is_length(len(window_origins))
+
+    @pytest.mark.parametrize(('height', 'width', 'expected_shape'), [
+        (4320, 7680, (273, 7680)),
+        (100, 300000, (100, 1448)),
+        (100, 100, (100, 100)),
+    ])  # pylint: disable=no-self-use
+    def test_that_tile_shape_fits_memory_limit(self, height, width, expected_shape):
+        tile_shape = get_ssim_tile_shape(height, width, 1, 256 * 1024 * 1024)
+
+        assert_that(tile_shape).is_equal_to(expected_shape)
@@ -0,0 +1,46 @@
+import io
+import os
+
+from assertpy import assert_that
+import pytest
+import requests
+
+from verifier.http_range_file import HttpRangeFile
+from verifier.storage_cluster_stub import StorageClusterStub
+
+
+class TestStorageClusterStub(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.content = bytes(range(256)) * 100
+        os.makedirs(os.path.join(str(tmpdir), 'blender', 'source'))
+        with open(os.path.join(str(tmpdir), 'blender', 'source', 'package.zip'), 'wb') as file:
+            file.write(self.content)
+
+        with StorageClusterStub(str(tmpdir)) as self.storage_cluster_stub:
+            yield
+
+    def test_that_stub_serves_whole_files_and_ranges(self):
+        url = self.storage_cluster_stub.address + 'download/blender/source/package.zip'
+        with requests.Session() as session:
+            assert_that(session.get(url).content).is_equal_to(self.content)
+
+            remote_file = HttpRangeFile(url, len(self.content), session)
+            remote_file.seek(1000)
+            buffer = bytearray(300)
+            remote_file.readinto(buffer)
+
+        assert_that(bytes(buffer)).is_equal_to(self.content[1000:1300])
+
+    def test_that_stub_does_not_serve_files_outside_of_storage_path(self):
+        for path in ['download/../package.zip', 'download/blender/source/missing.zip', 'blender/source/package.zip']:
+            assert_that(requests.get(self.storage_cluster_stub.address + path).status_code).is_equal_to(404)
+
+    def test_that_stub_counts_uploaded_files_sent_at_once_and_in_chunks(self):
+        requests.post(self.storage_cluster_stub.address + 'upload/', data=b'a' * 100)
+        requests.post(self.storage_cluster_stub.address + 'upload/', data=iter([b'b' * 10, b'c' * 20]))
+        requests.post(self.storage_cluster_stub.address + 'upload/', data=io.BytesIO(b'd' * 5))
+
+        assert_that(self.storage_cluster_stub.uploaded_files_count).is_equal_to(3)
+        assert_that(self.storage_cluster_stub.uploaded_bytes).is_equal_to(135)
@@ -1,10 +1,15 @@
 from unittest import TestCase
-from zipfile import BadZipFile
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
 
 from assertpy import assert_that
 from django.conf import settings
 from django.test import override_settings
 import mock
+from numpy import arange
 from numpy import ones
 from numpy import zeros
 from numpy.core.records import ndarray
@@ -12,6 +17,8 @@ import pytest
 
 from common.constants import ErrorCode
 from core.constants import VerificationResult
+from verifier.archive_manifest import ArchiveManifest
+from verifier.archive_manifest import ArchiveManifestEntry
 from verifier.exceptions import VerificationError
 from verifier.exceptions import VerificationMismatch
 from verifier.utils import adjust_format_name
@@ -19,15 +26,31 @@ from verifier.utils import are_image_sizes_and_color_channels_equal
 from verifier.utils import compare_all_rendered_images_with_user_results_files
 from verifier.utils import compare_images
 from verifier.utils import compare_minimum_ssim_with_results
+from verifier.utils import compute_file_checksum_and_size
+from verifier.utils import CropRegion
+from verifier.utils import crop_result_image_to_window
 from verifier.utils import ensure_enough_result_files_provided
 from verifier.utils import ensure_frames_have_related_files_to_compare
 from verifier.utils import generate_base_blender_output_file_name
+from verifier.utils import generate_blender_render_window_script
 from verifier.utils import generate_full_blender_output_file_name
 from verifier.utils import generate_upload_file_path
 from verifier.utils import generate_verifier_storage_file_path
+from verifier.utils import get_crop_window
+from verifier.utils import get_frames_to_verify
+from verifier.utils import get_windows_to_render
+from verifier.utils import get_windows_to_verify
+from verifier.utils import ImageWindow
+from verifier.utils import import_cv2
+from verifier.utils import load_result_image
+from verifier.utils import parse_blender_crop_script
 from verifier.utils import parse_result_files_with_frames
+from verifier.utils import render_frame
 from verifier.utils import render_images_by_frames
+from verifier.utils import render_upload_and_compare_frames
+from verifier.utils import try_to_upload_blender_output_file
 from verifier.utils import upload_blender_output_file
+from verifier.utils import upload_blender_output_files_of_frame
 from verifier.utils import validate_downloaded_archives
 
 
@@ -233,6 +256,152 @@ class VerifierUtilsTest(TestCase):
         with self.assertRaises(VerificationError):
             compare_images(self.image_ones, self.image_diffrent_size, 'subtask_id')
 
+    @override_settings(
+        VERIFIER_MIN_SSIM=0.95,
+        VERIFIER_SSIM_PYRAMID_LEVELS=2,
+        VERIFIER_SSIM_PYRAMID_DECISION_MARGIN=0.02,
+    )
+    def test_that_ssim_far_from_verifier_min_ssim_is_decided_at_coarsest_pyramid_level(self):
+        with mock.patch('verifier.utils.compute_ssim', autospec=True, return_value=1.0) as mock_compute_ssim:
+            ssim = compare_images(self.image_ones, self.image_ones, 'subtask_id')
+
+        self.assertEqual(ssim, 1.0)
+        self.assertEqual(mock_compute_ssim.call_count, 1)
+        self.assertEqual(mock_compute_ssim.call_args[0][0].shape, (480, 270, 3))
+
+    @override_settings(
+        VERIFIER_MIN_SSIM=0.95,
+        VERIFIER_SSIM_PYRAMID_LEVELS=2,
+        VERIFIER_SSIM_PYRAMID_DECISION_MARGIN=0.02,
+    )
+    def test_that_ssim_close_to_verifier_min_ssim_is_computed_at_full_resolution(self):
+        with mock.patch('verifier.utils.compute_ssim', autospec=True, side_effect=[0.96, 0.94, 0.955]) as mock_compute_ssim:
+            ssim = compare_images(self.image_ones, self.image_ones, 'subtask_id')
+
+        self.assertEqual(ssim, 0.955)
+        self.assertEqual(mock_compute_ssim.call_count, 3)
+        self.assertEqual(mock_compute_ssim.call_args[0][0].shape, self.image_ones.shape)
+
+    @override_settings(
+        VERIFIER_MIN_SSIM=0.95
+    )
+    def test_that_comparison_stops_at_first_frame_with_ssim_not_above_verifier_min_ssim(self):
+        with mock.patch('verifier.utils.load_images', side_effect=self.image_pairs) as mock_load_images, \
+            mock.patch('verifier.utils.are_image_sizes_and_color_channels_equal', return_value=True), \
+            mock.patch('verifier.utils.compare_images', side_effect=[0.95, 0.99]) as mock_compare_images:  # noqa: E125
+
+            with self.assertRaises(VerificationMismatch):
+                compare_all_rendered_images_with_user_results_files(
+                    parsed_files_to_compare=self.correct_parsed_all_files,
+                    subtask_id=self.subtask_id,
+                )
+
+        self.assertEqual(mock_load_images.call_count, 1)
+        self.assertEqual(mock_compare_images.call_count, 1)
+
+    @override_settings(
+        VERIFIER_MIN_SSIM=0.95
+    )
+    def test_that_render_upload_and_compare_frames_renders_uploads_and_compares_every_frame(self):
+        with mock.patch('verifier.utils.render_image', autospec=True) as mock_render_image, \
+            mock.patch('verifier.utils.try_to_upload_blender_output_file', autospec=True) as mock_try_to_upload, \
+            mock.patch('verifier.utils.load_images', side_effect=self.image_pairs) as mock_load_images, \
+            mock.patch('verifier.utils.are_image_sizes_and_color_channels_equal', return_value=True), \
+            mock.patch('verifier.utils.compare_images', side_effect=[0.99, 0.98]):  # noqa: E125
+
+            ssim_list = render_upload_and_compare_frames(
+                parsed_files_to_compare=self.parsed_files_to_compare,
+                frames=self.frames,
+                output_format=self.output_format,
+                scene_file=self.scene_file,
+                subtask_id=self.subtask_id,
+                verification_deadline=None,
+                blender_crop_script=None,
+            )
+
+        self.assertEqual(ssim_list, [0.99, 0.98])
+        self.assertEqual(self.parsed_files_to_compare, self.correct_parsed_all_files)
+        self.assertEqual(mock_render_image.call_count, 2)
+        self.assertEqual(mock_try_to_upload.call_count, 2)
+        mock_load_images.assert_any_call(
+            self.correct_blender_output_file_name_list[1],
+            self.correct_parsed_all_files[2][0],
+            self.subtask_id,
+            None,
+        )
+
+    @override_settings(
+        VERIFIER_MIN_SSIM=0.95
+    )
+    def test_that_render_upload_and_compare_frames_stops_rendering_after_first_mismatched_frame(self):
+        self.parsed_files_to_compare[3] = ['/tmp/result_0003.png']
+        with mock.patch('verifier.utils.render_image', autospec=True) as mock_render_image, \
+            mock.patch('verifier.utils.try_to_upload_blender_output_file', autospec=True) as mock_try_to_upload, \
+            mock.patch('verifier.utils.load_images', side_effect=self.image_pairs) as mock_load_images, \
+            mock.patch('verifier.utils.are_image_sizes_and_color_channels_equal', return_value=True), \
+            mock.patch('verifier.utils.compare_images', side_effect=[0.5, 0.99]):  # noqa: E125
+
+            with self.assertRaises(VerificationMismatch):
+                render_upload_and_compare_frames(
+                    parsed_files_to_compare=self.parsed_files_to_compare,
+                    frames=[1, 2, 3],
+                    output_format=self.output_format,
+                    scene_file=self.scene_file,
+                    subtask_id=self.subtask_id,
+                    verification_deadline=None,
+                    blender_crop_script=None,
+                )
+
+        # The second frame is rendered while the first one is being compared.
+        self.assertEqual(mock_render_image.call_count, 2)
+        self.assertEqual(mock_try_to_upload.call_count, 2)
+        self.assertEqual(mock_load_images.call_count, 1)
+
+
+class TestStreamingUpload(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.file_content = bytes(range(256)) * 1000
+        with tempfile.NamedTemporaryFile(dir=settings.VERIFIER_STORAGE_PATH, delete=False) as file:
+            file.write(self.file_content)
+        self.file_name = os.path.basename(file.name)
+        yield
+        os.remove(file.name)
+
+    @pytest.mark.parametrize('file_content', [
+        b'',
+        b'a',
+        bytes(range(256)) * 1000,
+    ])  # pylint: disable=no-self-use
+    def test_that_checksum_and_size_of_file_are_the_same_as_of_its_content(self, file_content):
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(file_content)
+            file.flush()
+
+            (checksum, size) = compute_file_checksum_and_size(file.name)
+
+        assert_that(checksum).is_equal_to('sha1:' + hashlib.sha1(file_content).hexdigest())
+        assert_that(size).is_equal_to(len(file_content))
+
+    def test_that_blender_output_file_is_streamed_to_storage_cluster_instead_of_being_read_into_memory(self):
+        uploaded_chunks = []
+
+        def read_uploaded_file(file_content, *_args):
+            uploaded_chunks.append(file_content.read())
+
+        with mock.patch('verifier.utils.create_file_transfer_token_for_concent', autospec=True) as mock_create_token, \
+            mock.patch('verifier.utils.upload_file_to_storage_cluster', side_effect=read_uploaded_file) as mock_upload:  # noqa: E125
+            try_to_upload_blender_output_file(self.file_name, 'PNG', self.subtask_id, 1)
+
+        assert_that(isinstance(mock_upload.call_args[0][0], bytes)).is_false()
+        assert_that(uploaded_chunks).is_equal_to([self.file_content])
+        assert_that(mock_create_token.call_args[1]['result_size']).is_equal_to(len(self.file_content))
+        assert_that(mock_create_token.call_args[1]['result_package_hash']).is_equal_to(
+            'sha1:' + hashlib.sha1(self.file_content).hexdigest()
+        )
+
 
 class TestGenerateFilePathMethods():
 
@@ -304,25 +473,286 @@ class TestValidateDownloadedArchives(object):
     def setUp(self):
         self.scene_file = "kitten.blend"
         self.subtask_id = "777"
-        self.archives_list = ["source.zip", "result.zip"]
 
-    def test_that_if_archive_is_not_a_zip_file_verification_mismatch_is_raised(self):
-        with mock.patch("verifier.utils.get_files_list_from_archive", side_effect=BadZipFile):
-            with pytest.raises(VerificationMismatch) as exception_wrapper:
-                validate_downloaded_archives(self.subtask_id, self.archives_list, self.scene_file)
-            assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
+    def _create_archive_manifests(self, source_files, result_files):
+        return [
+            ArchiveManifest(
+                archive_name=archive_name,
+                entries=[ArchiveManifestEntry(name=file_name, file_size=1, compress_size=1, crc=0) for file_name in file_names],
+            )
+            for (archive_name, file_names) in [("source.zip", source_files), ("result.zip", result_files)]
+        ]
 
     def test_that_if_scene_file_is_missing_in_archived_files_verification_mismatch_is_raised(self):
-        with mock.patch("verifier.utils.get_files_list_from_archive", side_effect=["", "result.png"]):
-            with pytest.raises(VerificationMismatch) as exception_wrapper:
-                validate_downloaded_archives(self.subtask_id, self.archives_list, self.scene_file)
-            assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
+        with pytest.raises(VerificationMismatch) as exception_wrapper:
+            validate_downloaded_archives(
+                self.subtask_id,
+                self._create_archive_manifests([], ["result.png"]),
+                self.scene_file,
+            )
+        assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
 
     def test_that_if_one_of_the_files_to_be_unpacked_already_exists_verification_error_is_raised(self):
-        with mock.patch("verifier.utils.get_files_list_from_archive", side_effect=["kitten.blend", "result.png"]):
-            with mock.patch("verifier.utils.os.listdir", return_value="result.png"):
-                with pytest.raises(VerificationError) as exception_wrapper:
-                    validate_downloaded_archives(self.subtask_id, self.archives_list, self.scene_file)
-                assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
-                assert_that(exception_wrapper.value.error_code).\
-                    is_equal_to(ErrorCode.VERIFIER_UNPACKING_ARCHIVE_FAILED)
+        with mock.patch("verifier.utils.os.listdir", return_value=["result.png"]):
+            with pytest.raises(VerificationError) as exception_wrapper:
+                validate_downloaded_archives(
+                    self.subtask_id,
+                    self._create_archive_manifests(["kitten.blend"], ["result.png"]),
+                    self.scene_file,
+                )
+            assert_that(exception_wrapper.value.subtask_id).is_equal_to(self.subtask_id)
+            assert_that(exception_wrapper.value.error_code).\
+                is_equal_to(ErrorCode.VERIFIER_UNPACKING_ARCHIVE_FAILED)
+
+    def test_that_scene_file_in_package_which_was_not_downloaded_is_accepted(self):
+        validate_downloaded_archives(
+            self.subtask_id,
+            self._create_archive_manifests([], ["result_0001.png"]),
+            self.scene_file,
+            ["kitten.blend"],
+        )
+
+
+class TestLoadResultImage(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self, tmpdir):
+        self.subtask_id = "777"
+        self.verifier_storage_path = str(tmpdir)
+        self.image = arange(2 * 3 * 3, dtype='uint8').reshape((2, 3, 3))
+        self.result_archive = zipfile.ZipFile(io.BytesIO(), 'w')
+        self.result_archive.writestr('result/result_0001.png', import_cv2().imencode('.png', self.image)[1].tobytes())
+        self.result_archive.writestr('result/log.txt', 'log')
+        with override_settings(VERIFIER_STORAGE_PATH=self.verifier_storage_path):
+            yield
+
+    def test_that_result_image_is_decoded_from_archive_without_unpacking_it(self):
+        image = load_result_image(
+            os.path.join(self.verifier_storage_path, 'result/result_0001.png'),
+            self.subtask_id,
+            self.result_archive,
+        )
+
+        assert_that((image == self.image).all()).is_true()
+        assert_that(os.listdir(self.verifier_storage_path)).is_empty()
+
+    @pytest.mark.parametrize(('file_name', 'error_code'), [
+        ('result/result_0002.png', ErrorCode.VERIFIER_UNPACKING_ARCHIVE_FAILED),
+        ('result/log.txt', ErrorCode.VERIFIER_LOADING_FILES_WITH_OPENCV_FAILED),
+    ])  # pylint: disable=no-self-use
+    def test_that_missing_or_invalid_result_image_raises_verification_error(self, file_name, error_code):
+        with pytest.raises(VerificationError) as exception_wrapper:
+            load_result_image(os.path.join(self.verifier_storage_path, file_name), self.subtask_id, self.result_archive)
+
+        assert_that(exception_wrapper.value.error_code).is_equal_to(error_code)
+
+    def test_that_failure_of_reading_remote_archive_raises_verification_error(self):
+        with mock.patch.object(self.result_archive, 'read', side_effect=OSError):
+            with pytest.raises(VerificationError) as exception_wrapper:
+                load_result_image(
+                    os.path.join(self.verifier_storage_path, 'result/result_0001.png'),
+                    self.subtask_id,
+                    self.result_archive,
+                )
+        assert_that(exception_wrapper.value.error_code).is_equal_to(ErrorCode.VERIFIER_FILE_DOWNLOAD_FAILED)
+
+
+class TestCropRegion(object):
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.blender_crop_script = (
+            'import bpy\n'
+            'for scene in bpy.data.scenes:\n'
+            '    scene.render.tile_x = 0\n'
+            '    scene.render.resolution_x = 1024\n'
+            '    scene.render.resolution_y = 768\n'
+            '    scene.render.resolution_percentage = 100\n'
+            '    scene.render.use_border = True\n'
+            '    scene.render.use_crop_to_border = True\n'
+            '    scene.render.border_max_x = 0.75\n'
+            '    scene.render.border_min_x = 0.25\n'
+            '    scene.render.border_min_y = 0.5\n'
+            '    scene.render.border_max_y = 1.0\n'
+            '    scene.render.use_compositing = bool(False)\n'
+        )
+        self.crop_region = CropRegion(
+            resolution_x=1024,
+            resolution_y=768,
+            border_min_x=0.25,
+            border_max_x=0.75,
+            border_min_y=0.5,
+            border_max_y=1.0,
+            use_crop_to_border=True,
+        )
+
+    def test_that_crop_region_is_read_from_blender_crop_script(self):
+        assert_that(parse_blender_crop_script(self.blender_crop_script)).is_equal_to(self.crop_region)
+
+    @pytest.mark.parametrize('blender_crop_script', [
+        None,
+        '# This template is rendered by',
+        'scene.render.use_border = False\nscene.render.resolution_x = 1024\n',
+        'scene.render.use_border = True\nscene.render.resolution_x = 1024\n',
+    ])  # pylint: disable=no-self-use
+    def test_that_crop_region_is_none_if_blender_crop_script_does_not_define_render_border(self, blender_crop_script):
+        assert_that(parse_blender_crop_script(blender_crop_script)).is_none()
+
+    def test_that_crop_window_is_measured_from_top_left_corner_of_the_frame(self):
+        assert_that(get_crop_window(self.crop_region)).is_equal_to(ImageWindow(x_min=256, y_min=0, x_max=768, y_max=384))
+
+    def test_that_render_window_script_makes_blender_truncate_border_to_window_edges(self):
+        window = ImageWindow(x_min=300, y_min=17, x_max=555, y_max=383)
+        border = dict(
+            line.strip().replace('scene.render.', '').split(' = ')
+            for line in generate_blender_render_window_script(self.crop_region, window).splitlines()
+            if 'border_' in line
+        )
+
+        rendered_crop_region = self.crop_region._replace(**{key: float(value) for key, value in border.items()})
+
+        assert_that(get_crop_window(rendered_crop_region)).is_equal_to(window)
+
+    def test_that_whole_crop_window_is_verified_if_tile_sampling_is_disabled(self):
+        with override_settings(VERIFIER_TILE_SAMPLING_MIN_PIXELS=None):
+            windows = get_windows_to_verify(self.crop_region, self.subtask_id, 1)
+
+        assert_that(windows).is_equal_to([get_crop_window(self.crop_region)])
+
+    def test_that_sampled_tiles_are_inside_crop_window_and_do_not_change_between_calls(self):
+        crop_window = get_crop_window(self.crop_region)
+        with override_settings(
+            VERIFIER_TILE_SAMPLING_MIN_PIXELS=1000,
+            VERIFIER_SAMPLED_TILES_COUNT=3,
+            VERIFIER_SAMPLED_TILE_SIZE=100,
+        ):
+            windows = get_windows_to_verify(self.crop_region, self.subtask_id, 1)
+            windows_again = get_windows_to_verify(self.crop_region, self.subtask_id, 1)
+
+        assert_that(windows).is_length(3)
+        assert_that(windows).is_equal_to(windows_again)
+        for window in windows:
+            assert crop_window.x_min <= window.x_min < window.x_max <= crop_window.x_max
+            assert crop_window.y_min <= window.y_min < window.y_max <= crop_window.y_max
+            assert window.x_max - window.x_min <= 100 and window.y_max - window.y_min <= 100
+
+    @pytest.mark.parametrize(('use_crop_to_border', 'image_shape', 'offset'), [
+        (True, (384, 512, 3), (0, 0)),
+        (False, (768, 1024, 3), (0, 256)),
+    ])
+    def test_that_window_is_cut_out_of_result_image_depending_on_whether_it_was_cropped(self, use_crop_to_border, image_shape, offset):
+        crop_region = self.crop_region._replace(use_crop_to_border=use_crop_to_border)
+        window = ImageWindow(x_min=300, y_min=10, x_max=310, y_max=30)
+        result_image = arange(image_shape[0] * image_shape[1] * image_shape[2]).reshape(image_shape)
+
+        result_window = crop_result_image_to_window(result_image, crop_region, window)
+
+        assert_that(result_window.shape).is_equal_to((20, 10, 3))
+        assert_that(result_window[0, 0].tolist()).is_equal_to(
+            result_image[window.y_min + offset[0], window.x_min - 256 + offset[1]].tolist()
+        )
+
+    def test_that_window_is_not_cut_out_of_result_image_with_size_not_matching_crop_script(self):
+        window = ImageWindow(x_min=300, y_min=10, x_max=310, y_max=30)
+
+        assert_that(crop_result_image_to_window(zeros((768, 1024, 3)), self.crop_region, window)).is_none()
+
+    def test_that_render_images_by_frames_renders_each_sampled_tile_to_separate_file(self):
+        with override_settings(
+            VERIFIER_TILE_SAMPLING_MIN_PIXELS=1000,
+            VERIFIER_SAMPLED_TILES_COUNT=2,
+            VERIFIER_SAMPLED_TILE_SIZE=100,
+        ):
+            with mock.patch('verifier.utils.render_image', autospec=True) as mock_render_image, \
+                    mock.patch('verifier.utils.os.rename', autospec=True) as mock_rename:
+                (blender_output_file_name_list, parsed_files_to_compare) = render_images_by_frames(
+                    parsed_files_to_compare={1: ['/tmp/result_0001.png']},
+                    frames=[1],
+                    output_format='PNG',
+                    scene_file='scene.blend',
+                    subtask_id=self.subtask_id,
+                    verification_deadline=None,
+                    blender_crop_script=self.blender_crop_script,
+                    crop_region=self.crop_region,
+                )
+
+        expected_file_names = [
+            '/tmp/out_scene.blend_0001_tile_0.png',
+            '/tmp/out_scene.blend_0001_tile_1.png',
+        ]
+        assert_that(mock_render_image.call_count).is_equal_to(2)
+        assert_that(mock_rename.call_count).is_equal_to(2)
+        assert_that(blender_output_file_name_list).is_equal_to(expected_file_names)
+        assert_that(parsed_files_to_compare).is_equal_to({1: ['/tmp/result_0001.png'] + expected_file_names})
+
+    @pytest.mark.parametrize(('are_windows_rendered', 'expected_record_count'), [
+        ([True, True], 1),
+        ([True, False], 0),
+    ])
+    def test_that_render_time_is_recorded_once_per_frame_only_if_no_window_was_cached(self, are_windows_rendered, expected_record_count):
+        with override_settings(
+            VERIFIER_TILE_SAMPLING_MIN_PIXELS=1000,
+            VERIFIER_SAMPLED_TILES_COUNT=2,
+            VERIFIER_SAMPLED_TILE_SIZE=100,
+        ):
+            windows = get_windows_to_render(self.crop_region, self.subtask_id, 1)
+            with mock.patch('verifier.utils.render_image', autospec=True, side_effect=are_windows_rendered), \
+                    mock.patch('verifier.utils.os.rename', autospec=True), \
+                    mock.patch('verifier.utils.record_frame_render_time', autospec=True) as mock_record_frame_render_time:
+                render_frame(1, 'PNG', 'scene.blend', self.subtask_id, None, self.blender_crop_script, self.crop_region, windows, 'sha1:hash')
+
+        assert_that(mock_record_frame_render_time.call_count).is_equal_to(expected_record_count)
+
+    def test_that_tile_files_of_frame_are_uploaded_with_tile_indices(self):
+        tile_file_names = [
+            '/tmp/out_scene.blend_0001_tile_0.png',
+            '/tmp/out_scene.blend_0001_tile_1.png',
+        ]
+        with mock.patch('verifier.utils.try_to_upload_blender_output_file', autospec=True) as mock_try_to_upload:
+            upload_blender_output_files_of_frame(1, tile_file_names, 'PNG', self.subtask_id, are_tile_files=True)
+
+        assert_that([call[0][4] for call in mock_try_to_upload.call_args_list]).is_equal_to([0, 1])
+
+
+class TestGetFramesToVerify(object):
+
+    @pytest.fixture(autouse=True)
+    def setUp(self):
+        self.subtask_id = '1234-5678-9101-1213'
+        self.frames = list(range(1, 41))
+
+    def test_that_all_frames_are_verified_in_original_order_if_frame_sampling_is_disabled(self):
+        with override_settings(VERIFIER_FRAME_SAMPLING_MIN_FRAMES=None):
+            assert_that(get_frames_to_verify(self.frames, self.subtask_id)).is_equal_to(self.frames)
+
+    def test_that_short_frame_lists_are_not_sampled(self):
+        with override_settings(VERIFIER_FRAME_SAMPLING_MIN_FRAMES=41, VERIFIER_SAMPLED_FRAMES_COUNT=5):
+            assert_that(get_frames_to_verify(self.frames, self.subtask_id)).is_equal_to(self.frames)
+
+    def test_that_sampled_frames_go_first_followed_by_remaining_frames_and_do_not_change_between_calls(self):
+        with override_settings(
+            VERIFIER_FRAME_SAMPLING_MIN_FRAMES=10,
+            VERIFIER_SAMPLED_FRAMES_COUNT=5,
+            VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE=True,
+        ):
+            frames_to_verify = get_frames_to_verify(self.frames, self.subtask_id)
+            frames_to_verify_again = get_frames_to_verify(self.frames, self.subtask_id)
+
+        assert_that(frames_to_verify).is_equal_to(frames_to_verify_again)
+        assert_that(sorted(frames_to_verify)).is_equal_to(self.frames)
+        assert_that(frames_to_verify[:5]).is_sorted()
+        assert_that(frames_to_verify[5:]).is_sorted()
+        assert_that(frames_to_verify).is_not_equal_to(self.frames)
+
+    def test_that_only_sampled_frames_are_verified_if_policy_does_not_require_all_frames(self):
+        with override_settings(
+            VERIFIER_FRAME_SAMPLING_MIN_FRAMES=10,
+            VERIFIER_SAMPLED_FRAMES_COUNT=5,
+            VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE=False,
+        ):
+            frames_to_verify = get_frames_to_verify(self.frames, self.subtask_id)
+            frames_of_other_subtask_to_verify = get_frames_to_verify(self.frames, 'other-subtask')
+
+        assert_that(frames_to_verify).is_length(5)
+        assert_that(frames_to_verify).is_subset_of(self.frames)
+        assert_that(frames_to_verify).is_not_equal_to(frames_of_other_subtask_to_verify)
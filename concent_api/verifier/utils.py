@@ -1,40 +1,82 @@
-import hashlib
+import importlib
 from base64 import b64encode
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import NamedTuple
 from typing import Tuple
 import logging
 import os
+import random
 import re
 import subprocess
+import time
 import zipfile
 
 from django.conf import settings
 from golem_messages import message
 from golem_messages.shortcuts import dump
 from mypy.types import Optional
+import numpy
 from numpy.core.records import ndarray
-from skimage.measure import compare_ssim
+from requests.adapters import HTTPAdapter
 import requests
 
 from common.constants import ErrorCode
-from common.helpers import get_current_utc_timestamp
 from common.helpers import upload_file_to_storage_cluster
 from common.logging import log_string_message
 from core.constants import VerificationResult
 from core.tasks import verification_result
 from core.transfer_operations import create_file_transfer_token_for_concent, send_request_to_storage_cluster
 from gatekeeper.constants import CLUSTER_DOWNLOAD_PATH
+from verifier.archive_manifest import ArchiveManifest
+from verifier.archive_manifest import extract_archive
+from verifier.archive_manifest import get_archive_manifest_file_names
+from verifier.cache import compute_file_sha1
+from verifier.cache import get_render_cache_key
+from verifier.cache import link_cached_render
+from verifier.cache import store_render_in_cache
 from verifier.exceptions import VerificationError
 from verifier.exceptions import VerificationMismatch
-from .constants import UNPACK_CHUNK_SIZE
+from verifier.http_range_file import HttpRangeZipFile
+from verifier.scheduling import record_frame_render_time
+from verifier.ssim import compute_ssim
+from .constants import BLENDER_CROP_SCRIPT_RENDER_SETTING_REGEX
+from .constants import SSIM_PYRAMID_MIN_IMAGE_SIZE
 
 
 logger = logging.getLogger(__name__)
 crash_logger = logging.getLogger('concent.crash')
 FramesToParsedFilePaths = Dict[int, List[str]]
 
+# Resolution and render border read from the Blender crop script. Border coordinates are fractions of the frame size
+# measured from the bottom-left corner, just like in Blender.
+CropRegion = NamedTuple(
+    'CropRegion',
+    [
+        ('resolution_x', int),
+        ('resolution_y', int),
+        ('border_min_x', float),
+        ('border_max_x', float),
+        ('border_min_y', float),
+        ('border_max_y', float),
+        ('use_crop_to_border', bool),
+    ]
+)
+
+# Rectangle in pixel coordinates of the full frame, with origin in the top-left corner. Upper bounds are exclusive.
+ImageWindow = NamedTuple(
+    'ImageWindow',
+    [
+        ('x_min', int),
+        ('y_min', int),
+        ('x_max', int),
+        ('y_max', int),
+    ]
+)
+
 
 def clean_directory(directory_path: str):
     """ Removes all files from given directory path. """
@@ -75,6 +117,11 @@ def store_file_from_response_in_chunks(response: requests.Response, file_path: s
             f.write(chunk)
 
 
+def get_render_backend():
+    """ Returns module set in VERIFIER_RENDER_BACKEND. It must provide `run_blender` and `get_blender_version` functions. """
+    return importlib.import_module(settings.VERIFIER_RENDER_BACKEND)
+
+
 def run_blender(
     scene_file: str,
     output_format: str,
@@ -82,31 +129,12 @@ def run_blender(
     verification_deadline: int,
     script_file: Optional[str],
 ) -> subprocess.CompletedProcess:
-    output_format = adjust_format_name(output_format)
-
-    blender_command = [
-        "blender",
-        "-b", f"{generate_verifier_storage_file_path(scene_file)}",
-    ]
-
-    if script_file is not None:
-        blender_command += [
-            "-y",  # enable scripting by default
-            "-P", f"{generate_verifier_storage_file_path(script_file)}",
-        ]
-
-    blender_command += [
-        "-o", f"{generate_base_blender_output_file_name(scene_file)}",
-        "-noaudio",
-        "-F", f"{output_format}",
-        "-t", f"{settings.BLENDER_THREADS}",  # cpu_count
-        "-f", f"{frame_number}",  # frame
-    ]
-    return subprocess.run(
-        blender_command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        timeout=(verification_deadline - get_current_utc_timestamp()),
+    return get_render_backend().run_blender(
+        scene_file,
+        output_format,
+        frame_number,
+        verification_deadline,
+        script_file,
     )
 
 
@@ -120,20 +148,6 @@ def adjust_format_name(output_format: str) -> str:
     return output_format.upper()
 
 
-def unpack_archive(file_path: str) -> None:
-    """ Unpacks archive in chunks. """
-    with zipfile.ZipFile(os.path.join(settings.VERIFIER_STORAGE_PATH, file_path), 'r') as zip_file:
-        infos = zip_file.infolist()
-        for ix in range(0, min(UNPACK_CHUNK_SIZE, len(infos))):
-            zip_file.extract(infos[ix], settings.VERIFIER_STORAGE_PATH)
-        zip_file.close()
-
-
-def get_files_list_from_archive(file_path: str) -> List[str]:
-    """ Returns list of files from given zip archive. """
-    return zipfile.ZipFile(file_path).namelist()
-
-
 def delete_file(file_path: str) -> None:
     file_path = os.path.join(settings.VERIFIER_STORAGE_PATH, file_path)
     try:
@@ -148,11 +162,25 @@ def generate_full_blender_output_file_name(scene_file: str, frame_number: int, o
     return f'{base_blender_output_file_name}{frame_number:>04}.{output_format.lower()}'
 
 
+def generate_blender_output_tile_file_name(scene_file: str, frame_number: int, output_format: str, tile_index: int) -> str:
+    base_blender_output_file_name = generate_base_blender_output_file_name(scene_file)
+    return f'{base_blender_output_file_name}{frame_number:>04}_tile_{tile_index}.{output_format.lower()}'
+
+
+def parse_blender_output_tile_file_name(blender_output_tile_file_name: str) -> Tuple[int, int]:
+    """ Returns frame number and tile index encoded by generate_blender_output_tile_file_name(). """
+    match = re.search(r'_(\d+)_tile_(\d+)\.\w+$', blender_output_tile_file_name)
+    assert match is not None
+    return (int(match.group(1)), int(match.group(2)))
+
+
 def generate_base_blender_output_file_name(scene_file: str) -> str:
     return os.path.join(settings.VERIFIER_STORAGE_PATH, f'out_{scene_file}_')
 
 
-def generate_upload_file_path(subtask_id: str, extension: str, frame_number: int) -> str:
+def generate_upload_file_path(subtask_id: str, extension: str, frame_number: int, tile_index: Optional[int]=None) -> str:
+    if tile_index is not None:
+        return f'blender/verifier-output/{subtask_id}/{subtask_id}_{frame_number:>04}_tile_{tile_index}.{extension.lower()}'
     return f'blender/verifier-output/{subtask_id}/{subtask_id}_{frame_number:>04}.{extension.lower()}'
 
 
@@ -170,9 +198,17 @@ def import_cv2():
 
 
 def compare_images(image_1: ndarray, image_2: ndarray, subtask_id: str) -> float:
-    # Compute SSIM for the image pair.
+    # Compute SSIM for the image pair, starting from the coarsest level of the image pyramid.
+    # Finer levels are needed only if the result is too close to VERIFIER_MIN_SSIM to decide.
     try:
-        ssim = compare_ssim(image_1, image_2, multichannel=True)
+        image_pyramid = get_image_pyramid(image_1, image_2)
+        for (level, (level_image_1, level_image_2)) in enumerate(image_pyramid):
+            ssim = compute_ssim(level_image_1, level_image_2, settings.VERIFIER_SSIM_MEMORY_LIMIT)
+            if abs(ssim - settings.VERIFIER_MIN_SSIM) > settings.VERIFIER_SSIM_PYRAMID_DECISION_MARGIN:
+                break
+        logger.debug(
+            f'SSIM {ssim} computed at image pyramid level {len(image_pyramid) - 1 - level}. SUBTASK_ID: {subtask_id}.'
+        )
     except ValueError as exception:
         logger.info(f'Computing SSIM fails with: {exception}')
         raise VerificationError(
@@ -184,6 +220,43 @@ def compare_images(image_1: ndarray, image_2: ndarray, subtask_id: str) -> float
     return ssim
 
 
+def get_image_pyramid(image_1: ndarray, image_2: ndarray) -> List[Tuple[ndarray, ndarray]]:
+    """
+    Returns the image pair downscaled by successive powers of two, coarsest first and ending with the original pair.
+    The number of downscaled levels is limited by VERIFIER_SSIM_PYRAMID_LEVELS and by the size of the images.
+    """
+    cv2 = import_cv2()
+    image_pyramid = [(image_1, image_2)]
+    for _ in range(settings.VERIFIER_SSIM_PYRAMID_LEVELS):
+        (coarsest_image_1, coarsest_image_2) = image_pyramid[0]
+        if min(coarsest_image_1.shape[:2]) // 2 < SSIM_PYRAMID_MIN_IMAGE_SIZE:
+            break
+        image_pyramid.insert(0, (
+            cv2.resize(  # pylint: disable=no-member
+                coarsest_image_1,
+                (coarsest_image_1.shape[1] // 2, coarsest_image_1.shape[0] // 2),
+                interpolation=cv2.INTER_AREA,  # pylint: disable=no-member
+            ),
+            cv2.resize(  # pylint: disable=no-member
+                coarsest_image_2,
+                (coarsest_image_2.shape[1] // 2, coarsest_image_2.shape[0] // 2),
+                interpolation=cv2.INTER_AREA,  # pylint: disable=no-member
+            ),
+        ))
+    return image_pyramid
+
+
+def ensure_ssim_is_above_minimum(ssim: float, subtask_id: str) -> None:
+    # A single frame below VERIFIER_MIN_SSIM decides the result so there is no point in comparing the remaining ones.
+    if ssim <= settings.VERIFIER_MIN_SSIM:
+        log_string_message(
+            logger,
+            f'Blender verification failed. SSIM {ssim} is not above VERIFIER_MIN_SSIM. SUBTASK_ID: {subtask_id}.'
+            f'VerificationResult: {VerificationResult.MISMATCH.name}'
+        )
+        raise VerificationMismatch(subtask_id=subtask_id)
+
+
 def compare_minimum_ssim_with_results(ssim_list: List[float], subtask_id: str) -> None:
     # Compare SSIM with VERIFIER_MIN_SSIM.
     if settings.VERIFIER_MIN_SSIM < min(ssim_list):
@@ -196,17 +269,71 @@ def compare_minimum_ssim_with_results(ssim_list: List[float], subtask_id: str) -
         raise VerificationMismatch(subtask_id=subtask_id)
 
 
-def load_images(blender_output_file_name: str, result_file: str, subtask_id: str) -> Tuple[ndarray, ndarray]:
+def load_images(
+    blender_output_file_name: str,
+    result_file: str,
+    subtask_id: str,
+    result_archive: Optional[zipfile.ZipFile]=None,
+) -> Tuple[ndarray, ndarray]:
     # Read both files with OpenCV.
+    image_1 = load_image(generate_verifier_storage_file_path(blender_output_file_name), subtask_id)
+    image_2 = load_result_image(result_file, subtask_id, result_archive)
+    return (image_1, image_2)
+
+
+def load_result_image(result_file: str, subtask_id: str, result_archive: Optional[zipfile.ZipFile]=None) -> ndarray:
+    """
+    Loads provider's result image. If the result archive is given, the image is decoded straight from the archive
+    member at the same path relative to VERIFIER_STORAGE_PATH instead of from an unpacked file.
+    """
+    if result_archive is None:
+        return load_image(result_file, subtask_id)
+
     cv2 = import_cv2()
     try:
-        image_1 = cv2.imread(  # pylint: disable=no-member
-            generate_verifier_storage_file_path(blender_output_file_name)
+        image_data = result_archive.read(os.path.relpath(result_file, settings.VERIFIER_STORAGE_PATH))
+        image = cv2.imdecode(numpy.frombuffer(image_data, dtype=numpy.uint8), cv2.IMREAD_COLOR)  # pylint: disable=no-member
+    except MemoryError as exception:
+        logger.info(f'Loading result files into memory exceeded available memory and failed with: {exception}')
+        raise VerificationError(
+            str(exception),
+            ErrorCode.VERIFIER_LOADING_FILES_INTO_MEMORY_FAILED,
+            subtask_id,
         )
-
-        image_2 = cv2.imread(  # pylint: disable=no-member
-            result_file
+    except (KeyError, zipfile.BadZipFile) as exception:
+        log_string_message(
+            logger,
+            f'Verifier failed to read the result file from the archive with error {exception} '
+            f'SUBTASK_ID {subtask_id}. '
+            f'ErrorCode: {ErrorCode.VERIFIER_UNPACKING_ARCHIVE_FAILED.name}'
+        )
+        raise VerificationError(
+            str(exception),
+            ErrorCode.VERIFIER_UNPACKING_ARCHIVE_FAILED,
+            subtask_id,
+        )
+    except OSError as exception:
+        # Archive in the storage cluster read with range requests.
+        raise VerificationError(
+            str(exception),
+            ErrorCode.VERIFIER_FILE_DOWNLOAD_FAILED,
+            subtask_id=subtask_id,
+        )
+    # Just like cv2.imread, cv2.imdecode does not raise any error if the data is not a valid image but returns None.
+    if image is None:
+        logger.info('Loading files using OpenCV fails.')
+        raise VerificationError(
+            'Loading files using OpenCV fails.',
+            ErrorCode.VERIFIER_LOADING_FILES_WITH_OPENCV_FAILED,
+            subtask_id,
         )
+    return image
+
+
+def load_image(file_path: str, subtask_id: str) -> ndarray:
+    cv2 = import_cv2()
+    try:
+        image = cv2.imread(file_path)  # pylint: disable=no-member
     except MemoryError as exception:
         logger.info(f'Loading result files into memory exceeded available memory and failed with: {exception}')
         raise VerificationError(
@@ -215,42 +342,50 @@ def load_images(blender_output_file_name: str, result_file: str, subtask_id: str
             subtask_id,
         )
     # If loading fails because of wrong path, cv2.imread does not raise any error but returns None.
-    if image_1 is None or image_2 is None:
+    if image is None:
         logger.info('Loading files using OpenCV fails.')
         raise VerificationError(
             'Loading files using OpenCV fails.',
             ErrorCode.VERIFIER_LOADING_FILES_WITH_OPENCV_FAILED,
             subtask_id,
         )
-    return (image_1, image_2)
+    return image
 
 
-def try_to_upload_blender_output_file(blender_output_file_name: str, output_format: str, subtask_id: str, frame_number: int) -> None:
-    upload_file_path = generate_upload_file_path(subtask_id, output_format, frame_number)
-    # Read Blender output file.
+def try_to_upload_blender_output_file(
+    blender_output_file_name: str,
+    output_format: str,
+    subtask_id: str,
+    frame_number: int,
+    tile_index: Optional[int]=None,
+    session: Optional[requests.Session]=None,
+) -> None:
+    upload_file_path = generate_upload_file_path(subtask_id, output_format, frame_number, tile_index)
+    blender_output_file_path = generate_verifier_storage_file_path(blender_output_file_name)
+    # Blender output file is never loaded into memory as a whole. It is hashed in chunks and streamed to the storage cluster.
     try:
-        with open(generate_verifier_storage_file_path(blender_output_file_name), 'rb') as upload_file:
-            upload_file_content = upload_file.read()  # type: bytes
-            upload_file_checksum = 'sha1:' + hashlib.sha1(upload_file_content).hexdigest()
-
-            # Generate a FileTransferToken valid for an upload of the image generated by blender.
-            upload_file_transfer_token = create_file_transfer_token_for_concent(
-                subtask_id=subtask_id,
-                result_package_path=upload_file_path,
-                result_size=len(upload_file_content),
-                result_package_hash=upload_file_checksum,
-                operation=message.FileTransferToken.Operation.upload,
-            )
+        (upload_file_checksum, upload_file_size) = compute_file_checksum_and_size(blender_output_file_path)
+
+        # Generate a FileTransferToken valid for an upload of the image generated by blender.
+        upload_file_transfer_token = create_file_transfer_token_for_concent(
+            subtask_id=subtask_id,
+            result_package_path=upload_file_path,
+            result_size=upload_file_size,
+            result_package_hash=upload_file_checksum,
+            operation=message.FileTransferToken.Operation.upload,
+        )
 
-            # Upload the image.
+        # Upload the image.
+        with open(blender_output_file_path, 'rb') as upload_file:
             upload_file_to_storage_cluster(
-                upload_file_content,
+                upload_file,
                 upload_file_path,
                 upload_file_transfer_token,
                 settings.CONCENT_PRIVATE_KEY,
                 settings.CONCENT_PUBLIC_KEY,
                 settings.CONCENT_PUBLIC_KEY,
                 settings.STORAGE_SERVER_INTERNAL_ADDRESS,
+                session,
             )
     except OSError as exception:
         crash_logger.error(str(exception))
@@ -263,19 +398,54 @@ def try_to_upload_blender_output_file(blender_output_file_name: str, output_form
         )
 
 
-def delete_source_files(source_archive_name: str) -> None:
+def compute_file_checksum_and_size(file_path: str) -> Tuple[str, int]:
+    """ Returns SHA1 checksum of the file, in the format used in FileTransferToken, and its size in bytes. """
+    return ('sha1:' + compute_file_sha1(file_path), os.path.getsize(file_path))
+
+
+def create_storage_cluster_session(pool_size: int) -> requests.Session:
+    """ Returns a session keeping up to `pool_size` connections to the storage cluster open for concurrent uploads. """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def delete_source_files(source_archive_name: str, source_files_list: List[str]) -> None:
     # Verifier deletes source files of the Blender project from its storage.
     # At this point there must be source files in VERIFIER_STORAGE_PATH otherwise verification should fail before.
-    source_files_list = get_files_list_from_archive(
-        generate_verifier_storage_file_path(
-            source_archive_name
-        )
-    )
     for file_path in source_files_list + [source_archive_name]:
         delete_file(file_path)
 
 
-def render_image(frame_number: int, output_format: str, scene_file: str, subtask_id: str, verification_deadline: int, blender_crop_script: Optional[str]=None) -> None:
+def render_image(
+    frame_number: int,
+    output_format: str,
+    scene_file: str,
+    subtask_id: str,
+    verification_deadline: int,
+    blender_crop_script: Optional[str]=None,
+    crop_region: Optional[CropRegion]=None,
+    render_window: Optional[ImageWindow]=None,
+    source_package_hash: Optional[str]=None,
+) -> bool:
+    """ Renders the image, or links it from the render cache, and returns False in the latter case. """
+    # Verifier narrows the render border to the window it is going to compare.
+    if crop_region is not None and render_window is not None:
+        assert blender_crop_script is not None
+        blender_crop_script += generate_blender_render_window_script(crop_region, render_window)
+    # The same image may have been rendered already, e.g. to verify another provider's result or before a retry.
+    blender_output_file_path = generate_full_blender_output_file_name(scene_file, frame_number, output_format)
+    render_cache_key = get_blender_render_cache_key(
+        source_package_hash,
+        scene_file,
+        frame_number,
+        output_format,
+        blender_crop_script,
+    )
+    if render_cache_key is not None and link_cached_render(render_cache_key, blender_output_file_path):
+        return False
     # Verifier stores Blender crop script to a file.
     if blender_crop_script is not None:
         blender_script_file_name = store_blender_script_file(subtask_id, blender_crop_script)  # type: Optional[str]
@@ -306,6 +476,9 @@ def render_image(frame_number: int, output_format: str, scene_file: str, subtask
                 ErrorCode.VERIFIER_RUNNING_BLENDER_FAILED,
                 subtask_id,
             )
+        if render_cache_key is not None:
+            store_render_in_cache(render_cache_key, blender_output_file_path)
+        return True
     except subprocess.SubprocessError as exception:
         log_string_message(logger, f'Blender finished with errors. Error: {exception} SUBTASK_ID {subtask_id}')
         raise VerificationError(
@@ -313,15 +486,45 @@ def render_image(frame_number: int, output_format: str, scene_file: str, subtask
             ErrorCode.VERIFIER_RUNNING_BLENDER_FAILED,
             subtask_id,
         )
+    finally:
+        # The script is written again for every rendered frame or window.
+        if blender_script_file_name is not None:
+            delete_file(blender_script_file_name)
 
 
-def unpack_archives(file_paths: Iterable[str], subtask_id: str) -> None:
+def get_blender_render_cache_key(
+    source_package_hash: Optional[str],
+    scene_file: str,
+    frame_number: int,
+    output_format: str,
+    blender_script: Optional[str],
+) -> Optional[str]:
+    """ Returns key of the image in the render cache or None if rendered images should not be cached. """
+    if source_package_hash is None or settings.VERIFIER_CACHE_PATH is None:
+        return None
+    blender_version = get_blender_version()
+    if blender_version is None:
+        return None
+    return get_render_cache_key(
+        source_package_hash,
+        scene_file,
+        frame_number,
+        output_format,
+        blender_script,
+        blender_version,
+    )
+
+
+def get_blender_version() -> Optional[str]:
+    """ Returns version of the renderer used by the render backend, or None if it cannot be determined. """
+    return get_render_backend().get_blender_version()
+
+
+def unpack_archives(archive_manifests: Iterable[ArchiveManifest], subtask_id: str) -> None:
     # Verifier unpacks the archive with project source.
-    for archive_file_path in file_paths:
+    for archive_manifest in archive_manifests:
         try:
-            unpack_archive(
-                os.path.basename(archive_file_path)
-            )
+            extract_archive(archive_manifest)
         except zipfile.BadZipFile as exception:
             log_string_message(
                 logger,
@@ -336,19 +539,20 @@ def unpack_archives(file_paths: Iterable[str], subtask_id: str) -> None:
             )
 
 
-def validate_downloaded_archives(subtask_id: str, archives_list: Iterable[str], scene_file: str) -> None:
-    # If archive is broken, it means that Provider must have intentionally uploaded damaged zip file.
-    # In such case verification end with MISMATCH result.
-    package_files_list = []  # type: List[str]
-    try:
-        # If any file which is supposed to be unpacked from archives already exists, finish with error and raise exception.
-        for package_file_path in archives_list:
-            package_files_list += get_files_list_from_archive(
-                generate_verifier_storage_file_path(package_file_path)
-            )
-    except zipfile.BadZipFile:
-        raise VerificationMismatch(subtask_id)
-
+def validate_downloaded_archives(
+    subtask_id: str,
+    archive_manifests: Iterable[ArchiveManifest],
+    scene_file: str,
+    files_of_packages_not_downloaded: Iterable[str]=(),
+) -> None:
+    # Broken archives are rejected with MISMATCH result already when their manifests are built.
+    # Files of packages which were not downloaded as archives, e.g. taken from the cache or read from the storage
+    # cluster directly, are passed in files_of_packages_not_downloaded.
+    package_files_list = list(files_of_packages_not_downloaded)  # type: List[str]
+    for archive_manifest in archive_manifests:
+        package_files_list += get_archive_manifest_file_names(archive_manifest)
+
+    # If any file which is supposed to be unpacked from archives already exists, finish with error and raise exception.
     already_existing_files = set(os.listdir(settings.VERIFIER_STORAGE_PATH)).intersection(package_files_list)
     if already_existing_files:
         # This should not happen normally as the directory is cleaned before
@@ -399,6 +603,45 @@ def download_archives_from_storage(
             )
 
 
+def open_remote_archive(
+    file_transfer_token: message.concents.FileTransferToken,
+    package_path: str,
+    package_size: int,
+    subtask_id: str,
+) -> zipfile.ZipFile:
+    """
+    Opens an archive stored in the storage cluster without downloading it. Only the central directory is read here,
+    members are downloaded with HTTP range requests when they are extracted. The archive must be closed to close
+    connections to the storage cluster.
+    """
+    file_transfer_token.sig = None
+    session = requests.Session()
+    session.headers.update(prepare_storage_request_headers(file_transfer_token))
+    if settings.STORAGE_CLUSTER_SSL_CERTIFICATE_PATH != '':
+        session.verify = settings.STORAGE_CLUSTER_SSL_CERTIFICATE_PATH
+    try:
+        return HttpRangeZipFile(
+            settings.STORAGE_SERVER_INTERNAL_ADDRESS + CLUSTER_DOWNLOAD_PATH + package_path,
+            package_size,
+            session,
+            buffer_size=settings.VERIFIER_RANGE_REQUEST_SIZE,
+        )
+    except zipfile.BadZipFile:
+        # Just like a broken downloaded archive, it means that Provider must have uploaded damaged zip file.
+        raise VerificationMismatch(subtask_id)
+    except OSError as exception:
+        log_string_message(
+            logger,
+            f'blender_verification_order for SUBTASK_ID {subtask_id} failed with error {exception}.'
+            f'ErrorCode: {ErrorCode.VERIFIER_FILE_DOWNLOAD_FAILED.name}'
+        )
+        raise VerificationError(
+            str(exception),
+            ErrorCode.VERIFIER_FILE_DOWNLOAD_FAILED,
+            subtask_id=subtask_id,
+        )
+
+
 def parse_result_files_with_frames(frames: List[int], result_files_list: List[str], output_format: str) -> FramesToParsedFilePaths:
     frames_to_result_files_map = {}  # type: FramesToParsedFilePaths
     for frame_number in frames:
@@ -419,19 +662,232 @@ def render_images_by_frames(
     subtask_id: str,
     verification_deadline: int,
     blender_crop_script: Optional[str],
+    crop_region: Optional[CropRegion]=None,
+    source_package_hash: Optional[str]=None,
 ) -> Tuple[List[str], FramesToParsedFilePaths]:
-    blender_output_file_name_list = []
+    blender_output_file_name_list = []  # type: List[str]
     for frame_number in frames:
-        render_image(frame_number, output_format, scene_file, subtask_id, verification_deadline, blender_crop_script)
-        blender_out_file_name = generate_full_blender_output_file_name(scene_file, frame_number, output_format)
-        blender_output_file_name_list.append(blender_out_file_name)
-        parsed_files_to_compare[frame_number].append(blender_out_file_name)
+        blender_output_file_names = render_frame(
+            frame_number,
+            output_format,
+            scene_file,
+            subtask_id,
+            verification_deadline,
+            blender_crop_script,
+            crop_region,
+            get_windows_to_render(crop_region, subtask_id, frame_number),
+            source_package_hash,
+        )
+        blender_output_file_name_list += blender_output_file_names
+        parsed_files_to_compare[frame_number] += blender_output_file_names
     return (blender_output_file_name_list, parsed_files_to_compare)
 
 
-def upload_blender_output_file(frames: List[int], blender_output_file_name_list: List[str], output_format: str, subtask_id: str) -> None:
-    for (frame_number, blender_output_file_name) in zip(frames, blender_output_file_name_list):
-        try_to_upload_blender_output_file(blender_output_file_name, output_format, subtask_id, frame_number)
+def render_frame(
+    frame_number: int,
+    output_format: str,
+    scene_file: str,
+    subtask_id: str,
+    verification_deadline: int,
+    blender_crop_script: Optional[str],
+    crop_region: Optional[CropRegion]=None,
+    windows: Optional[List[ImageWindow]]=None,
+    source_package_hash: Optional[str]=None,
+) -> List[str]:
+    """
+    Renders given frame, or `windows` of the frame if crop region is known, and returns names of the output files.
+    `windows` must be the ones returned by get_windows_to_render() for the frame.
+    """
+    assert (crop_region is None) == (windows is None)
+    render_start_time = time.monotonic()
+    if crop_region is None or windows is None:
+        is_rendered = render_image(
+            frame_number,
+            output_format,
+            scene_file,
+            subtask_id,
+            verification_deadline,
+            blender_crop_script,
+            source_package_hash=source_package_hash,
+        )
+        blender_output_file_names = [generate_full_blender_output_file_name(scene_file, frame_number, output_format)]
+    else:
+        is_rendered = True
+        blender_output_file_names = []
+        for (tile_index, window) in enumerate(windows):
+            is_rendered &= render_image(
+                frame_number,
+                output_format,
+                scene_file,
+                subtask_id,
+                verification_deadline,
+                blender_crop_script,
+                crop_region,
+                window,
+                source_package_hash,
+            )
+            blender_out_file_name = generate_full_blender_output_file_name(scene_file, frame_number, output_format)
+            if are_windows_rendered_to_tile_files(windows):
+                # Blender writes every window of the frame to the same file so it must be moved aside before the next one.
+                blender_tile_file_name = generate_blender_output_tile_file_name(scene_file, frame_number, output_format, tile_index)
+                os.rename(blender_out_file_name, blender_tile_file_name)
+                blender_out_file_name = blender_tile_file_name
+            blender_output_file_names.append(blender_out_file_name)
+
+    # Render times are used to estimate whether further verifications of the scene can finish before deadlines.
+    # A frame with any image taken from the render cache would make the estimate too low.
+    if is_rendered:
+        record_frame_render_time(source_package_hash, scene_file, time.monotonic() - render_start_time)
+    return blender_output_file_names
+
+
+def get_windows_to_render(crop_region: Optional[CropRegion], subtask_id: str, frame_number: int) -> Optional[List[ImageWindow]]:
+    """ Returns windows of the frame to render, or None if the whole frame is rendered. """
+    if crop_region is None:
+        return None
+    return get_windows_to_verify(crop_region, subtask_id, frame_number)
+
+
+def are_windows_rendered_to_tile_files(windows: Optional[List[ImageWindow]]) -> bool:
+    """ Tells whether windows of the frame are rendered to separate tile files named after their tile indices. """
+    return windows is not None and len(windows) > 1
+
+
+def upload_blender_output_file(
+    frames: List[int],
+    blender_output_file_name_list: List[str],
+    output_format: str,
+    subtask_id: str,
+    are_tile_files: bool=False,
+) -> None:
+    """ `are_tile_files` tells whether files are tiles of frames, as reported by are_windows_rendered_to_tile_files(). """
+    with create_storage_cluster_session(1) as session:
+        if are_tile_files:
+            # Upload paths are derived from the names Blender output was moved to.
+            for blender_output_file_name in blender_output_file_name_list:
+                (frame_number, tile_index) = parse_blender_output_tile_file_name(blender_output_file_name)
+                try_to_upload_blender_output_file(blender_output_file_name, output_format, subtask_id, frame_number, tile_index, session)
+            return
+        for (frame_number, blender_output_file_name) in zip(frames, blender_output_file_name_list):
+            try_to_upload_blender_output_file(blender_output_file_name, output_format, subtask_id, frame_number, session=session)
+
+
+def upload_blender_output_files_of_frame(
+    frame_number: int,
+    blender_output_file_names: List[str],
+    output_format: str,
+    subtask_id: str,
+    are_tile_files: bool,
+    session: Optional[requests.Session]=None,
+) -> None:
+    """ `are_tile_files` tells whether files are tiles of the frame, as reported by are_windows_rendered_to_tile_files(). """
+    if not are_tile_files:
+        (blender_output_file_name, ) = blender_output_file_names
+        try_to_upload_blender_output_file(blender_output_file_name, output_format, subtask_id, frame_number, session=session)
+        return
+    for blender_output_file_name in blender_output_file_names:
+        (_, tile_index) = parse_blender_output_tile_file_name(blender_output_file_name)
+        try_to_upload_blender_output_file(blender_output_file_name, output_format, subtask_id, frame_number, tile_index, session)
+
+
+def render_upload_and_compare_frames(
+    parsed_files_to_compare: FramesToParsedFilePaths,
+    frames: List[int],
+    output_format: str,
+    scene_file: str,
+    subtask_id: str,
+    verification_deadline: int,
+    blender_crop_script: Optional[str],
+    crop_region: Optional[CropRegion]=None,
+    source_package_hash: Optional[str]=None,
+    result_archive: Optional[zipfile.ZipFile]=None,
+) -> List[float]:
+    """
+    Renders frames one by one and returns SSIM of each compared image pair.
+    Provider's result files are read from `result_archive` if it is given.
+
+    Every rendered frame is compared with provider's result in a background thread while Blender renders the next frame
+    and is uploaded to the storage cluster by a separate pool of threads. The first frame that does not match ends
+    verification with VerificationMismatch without rendering the remaining frames. Uploads that have already been
+    started are allowed to finish before the function returns or raises.
+    """
+    ssim_list = []  # type: List[float]
+    with create_storage_cluster_session(settings.VERIFIER_UPLOAD_THREADS) as session, \
+            ThreadPoolExecutor(max_workers=settings.VERIFIER_UPLOAD_THREADS) as upload_executor, \
+            ThreadPoolExecutor(max_workers=1) as comparison_executor:
+        upload_futures = []  # type: List[Future]
+        comparison_future = None  # type: Optional[Future]
+        for frame_number in frames:
+            windows = get_windows_to_render(crop_region, subtask_id, frame_number)
+            blender_output_file_names = render_frame(
+                frame_number,
+                output_format,
+                scene_file,
+                subtask_id,
+                verification_deadline,
+                blender_crop_script,
+                crop_region,
+                windows,
+                source_package_hash,
+            )
+            parsed_files_to_compare[frame_number] += blender_output_file_names
+            upload_futures.append(
+                upload_executor.submit(
+                    upload_blender_output_files_of_frame,
+                    frame_number,
+                    blender_output_file_names,
+                    output_format,
+                    subtask_id,
+                    are_windows_rendered_to_tile_files(windows),
+                    session,
+                )
+            )
+
+            # Only one comparison runs at a time. Its result is collected after the next frame has been rendered.
+            if comparison_future is not None:
+                ssim_list += comparison_future.result()
+            comparison_future = comparison_executor.submit(
+                compare_rendered_frame_with_user_result_file,
+                frame_number,
+                parsed_files_to_compare[frame_number],
+                subtask_id,
+                crop_region,
+                result_archive,
+            )
+
+        if comparison_future is not None:
+            ssim_list += comparison_future.result()
+
+        for upload_future in upload_futures:
+            upload_future.result()
+    return ssim_list
+
+
+def get_frames_to_verify(frames: List[int], subtask_id: str) -> List[int]:
+    """
+    Returns frames in the order in which verifier renders and compares them.
+    Normally these are all the frames in the original order. If there are at least VERIFIER_FRAME_SAMPLING_MIN_FRAMES
+    of them, a random sample of VERIFIER_SAMPLED_FRAMES_COUNT frames goes first, so that a mismatch is likely
+    to be found before most of the frames are rendered. The sample is seeded with subtask ID so that another
+    verification of the same subtask picks the same frames. Remaining frames follow the sample only if
+    VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE is set.
+    """
+    if settings.VERIFIER_FRAME_SAMPLING_MIN_FRAMES is None or len(frames) < settings.VERIFIER_FRAME_SAMPLING_MIN_FRAMES:
+        return list(frames)
+
+    random_generator = random.Random(subtask_id)
+    sampled_frames = sorted(random_generator.sample(frames, min(settings.VERIFIER_SAMPLED_FRAMES_COUNT, len(frames))))
+    log_string_message(
+        logger,
+        f'Frame sampling for SUBTASK_ID {subtask_id}.',
+        f'Frames count: {len(frames)}.',
+        f'Sampled frames count: {settings.VERIFIER_SAMPLED_FRAMES_COUNT}.',
+        f'Sampled frames: {sampled_frames}.',
+        f'Verify all frames after sample: {settings.VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE}.',
+    )
+    if not settings.VERIFIER_VERIFY_ALL_FRAMES_AFTER_SAMPLE:
+        return sampled_frames
+    return sampled_frames + [frame_number for frame_number in frames if frame_number not in sampled_frames]
 
 
 def ensure_enough_result_files_provided(frames: List[int], result_files_list: List[str], subtask_id: str) -> None:
@@ -447,26 +903,214 @@ def ensure_frames_have_related_files_to_compare(frames: List[int], parsed_files_
         raise VerificationMismatch(subtask_id=subtask_id)
 
 
-def compare_all_rendered_images_with_user_results_files(parsed_files_to_compare: FramesToParsedFilePaths, subtask_id: str) -> List[float]:
-    ssim_list = []
-    for (result_file, blender_output_file_name) in parsed_files_to_compare.values():
-        image_1, image_2 = load_images(
-            blender_output_file_name,
+def compare_all_rendered_images_with_user_results_files(
+    parsed_files_to_compare: FramesToParsedFilePaths,
+    subtask_id: str,
+    crop_region: Optional[CropRegion]=None,
+) -> List[float]:
+    ssim_list = []  # type: List[float]
+    for (frame_number, frame_files) in parsed_files_to_compare.items():
+        ssim_list += compare_rendered_frame_with_user_result_file(frame_number, frame_files, subtask_id, crop_region)
+    return ssim_list
+
+
+def compare_rendered_frame_with_user_result_file(
+    frame_number: int,
+    frame_files: List[str],
+    subtask_id: str,
+    crop_region: Optional[CropRegion]=None,
+    result_archive: Optional[zipfile.ZipFile]=None,
+) -> List[float]:
+    """
+    Compares provider's result file with images rendered for the frame. `frame_files` is an entry of
+    FramesToParsedFilePaths, i.e. the result file followed by Blender output files.
+    If `result_archive` is given, the result file is read from it instead of VERIFIER_STORAGE_PATH.
+    """
+    (result_file, *blender_output_file_names) = frame_files
+    if crop_region is not None:
+        return compare_rendered_windows_with_user_result_file(
+            frame_number,
             result_file,
-            subtask_id
+            blender_output_file_names,
+            subtask_id,
+            crop_region,
+            result_archive,
+        )
+
+    (blender_output_file_name, ) = blender_output_file_names
+    image_1, image_2 = load_images(
+        blender_output_file_name,
+        result_file,
+        subtask_id,
+        result_archive,
+    )
+    if not are_image_sizes_and_color_channels_equal(image_1, image_2):
+        log_string_message(
+            logger,
+            f'Blender verification failed. Sizes in pixels of images are not equal. SUBTASK_ID: {subtask_id}.'
+            f'VerificationResult: {VerificationResult.MISMATCH.name}'
         )
-        if not are_image_sizes_and_color_channels_equal(image_1, image_2):
+        raise VerificationMismatch(subtask_id=subtask_id)
+
+    ssim = compare_images(image_1, image_2, subtask_id)
+    ensure_ssim_is_above_minimum(ssim, subtask_id)
+    return [ssim]
+
+
+def compare_rendered_windows_with_user_result_file(
+    frame_number: int,
+    result_file: str,
+    blender_output_file_names: List[str],
+    subtask_id: str,
+    crop_region: CropRegion,
+    result_archive: Optional[zipfile.ZipFile]=None,
+) -> List[float]:
+    windows = get_windows_to_verify(crop_region, subtask_id, frame_number)
+    assert len(windows) == len(blender_output_file_names)
+
+    # Provider's image is decoded once and shared by all the windows rendered for the frame.
+    result_image = load_result_image(result_file, subtask_id, result_archive)
+    ssim_list = []
+    for (blender_output_file_name, window) in zip(blender_output_file_names, windows):
+        rendered_image = load_image(generate_verifier_storage_file_path(blender_output_file_name), subtask_id)
+        if rendered_image.shape[:2] != (window.y_max - window.y_min, window.x_max - window.x_min):
+            # Blender was told exactly which pixels to render so a different size means the verifier is at fault.
+            raise VerificationError(
+                f'Blender rendered image of size {rendered_image.shape[:2]} instead of window {window}.',
+                ErrorCode.VERIFIER_RUNNING_BLENDER_FAILED,
+                subtask_id,
+            )
+
+        result_window = crop_result_image_to_window(result_image, crop_region, window)
+        if result_window is None or not are_image_sizes_and_color_channels_equal(rendered_image, result_window):
             log_string_message(
                 logger,
-                f'Blender verification failed. Sizes in pixels of images are not equal. SUBTASK_ID: {subtask_id}.'
+                f'Blender verification failed. Size of result image does not match the crop script. SUBTASK_ID: {subtask_id}.'
                 f'VerificationResult: {VerificationResult.MISMATCH.name}'
             )
             raise VerificationMismatch(subtask_id=subtask_id)
 
-        ssim_list.append(compare_images(image_1, image_2, subtask_id))
+        ssim = compare_images(rendered_image, result_window, subtask_id)
+        ensure_ssim_is_above_minimum(ssim, subtask_id)
+        ssim_list.append(ssim)
     return ssim_list
 
 
+def parse_blender_crop_script(blender_crop_script: Optional[str]) -> Optional[CropRegion]:
+    """
+    Reads resolution and render border from the Blender crop script generated by Golem.
+    Returns None if the script does not enable a valid render border, in which case whole images are compared.
+    """
+    if blender_crop_script is None:
+        return None
+
+    render_settings = dict(BLENDER_CROP_SCRIPT_RENDER_SETTING_REGEX.findall(blender_crop_script))
+    if render_settings.get('use_border') != 'True':
+        return None
+
+    try:
+        resolution_percentage = int(render_settings.get('resolution_percentage', '100'))
+        crop_region = CropRegion(
+            resolution_x=int(render_settings['resolution_x']) * resolution_percentage // 100,
+            resolution_y=int(render_settings['resolution_y']) * resolution_percentage // 100,
+            border_min_x=float(render_settings['border_min_x']),
+            border_max_x=float(render_settings['border_max_x']),
+            border_min_y=float(render_settings['border_min_y']),
+            border_max_y=float(render_settings['border_max_y']),
+            use_crop_to_border=render_settings.get('use_crop_to_border') == 'True',
+        )
+    except (KeyError, ValueError):
+        return None
+
+    if not (
+        crop_region.resolution_x > 0 and crop_region.resolution_y > 0 and
+        0.0 <= crop_region.border_min_x < crop_region.border_max_x <= 1.0 and
+        0.0 <= crop_region.border_min_y < crop_region.border_max_y <= 1.0
+    ):
+        return None
+
+    crop_window = get_crop_window(crop_region)
+    if crop_window.x_min == crop_window.x_max or crop_window.y_min == crop_window.y_max:
+        return None
+    return crop_region
+
+
+def get_crop_window(crop_region: CropRegion) -> ImageWindow:
+    # Blender measures the border from the bottom edge of the frame and truncates it to whole pixels.
+    return ImageWindow(
+        x_min=int(crop_region.border_min_x * crop_region.resolution_x),
+        y_min=crop_region.resolution_y - int(crop_region.border_max_y * crop_region.resolution_y),
+        x_max=int(crop_region.border_max_x * crop_region.resolution_x),
+        y_max=crop_region.resolution_y - int(crop_region.border_min_y * crop_region.resolution_y),
+    )
+
+
+def get_windows_to_verify(crop_region: CropRegion, subtask_id: str, frame_number: int) -> List[ImageWindow]:
+    """
+    Returns windows of the frame which verifier renders and compares.
+    Normally it is just the render border from the crop script. If the border is larger than
+    VERIFIER_TILE_SAMPLING_MIN_PIXELS, a sample of tiles is drawn from it instead. The sample is seeded with
+    subtask ID and frame number so that rendering and comparison always pick the same tiles.
+    """
+    crop_window = get_crop_window(crop_region)
+    crop_window_pixels = (crop_window.x_max - crop_window.x_min) * (crop_window.y_max - crop_window.y_min)
+    if settings.VERIFIER_TILE_SAMPLING_MIN_PIXELS is None or crop_window_pixels <= settings.VERIFIER_TILE_SAMPLING_MIN_PIXELS:
+        return [crop_window]
+
+    tile_size = settings.VERIFIER_SAMPLED_TILE_SIZE
+    tiles = [
+        ImageWindow(
+            x_min=x_min,
+            y_min=y_min,
+            x_max=min(x_min + tile_size, crop_window.x_max),
+            y_max=min(y_min + tile_size, crop_window.y_max),
+        )
+        for y_min in range(crop_window.y_min, crop_window.y_max, tile_size)
+        for x_min in range(crop_window.x_min, crop_window.x_max, tile_size)
+    ]
+    random_generator = random.Random(f'{subtask_id}:{frame_number}')
+    return sorted(random_generator.sample(tiles, min(settings.VERIFIER_SAMPLED_TILES_COUNT, len(tiles))))
+
+
+def generate_blender_render_window_script(crop_region: CropRegion, window: ImageWindow) -> str:
+    """
+    Returns Python code which, appended to the Blender crop script, makes Blender render and save only given window.
+    Border coordinates point at the middle of the edge pixels so that Blender truncates them to exactly the window.
+    """
+    def to_border_coordinate(pixel: int, resolution: int) -> float:
+        return min((pixel + 0.5) / resolution, 1.0)
+
+    return (
+        '\n'
+        'for scene in bpy.data.scenes:\n'
+        '    scene.render.use_border = True\n'
+        '    scene.render.use_crop_to_border = True\n'
+        f'    scene.render.border_min_x = {to_border_coordinate(window.x_min, crop_region.resolution_x)!r}\n'
+        f'    scene.render.border_max_x = {to_border_coordinate(window.x_max, crop_region.resolution_x)!r}\n'
+        f'    scene.render.border_min_y = {to_border_coordinate(crop_region.resolution_y - window.y_max, crop_region.resolution_y)!r}\n'
+        f'    scene.render.border_max_y = {to_border_coordinate(crop_region.resolution_y - window.y_min, crop_region.resolution_y)!r}\n'
+    )
+
+
+def crop_result_image_to_window(result_image: ndarray, crop_region: CropRegion, window: ImageWindow) -> Optional[ndarray]:
+    """
+    Cuts given window out of the image uploaded by the provider. The image covers either the whole frame or, if the crop
+    script makes Blender crop the output, only the render border. Returns None if the image size does not match.
+    """
+    if crop_region.use_crop_to_border:
+        image_window = get_crop_window(crop_region)
+    else:
+        image_window = ImageWindow(0, 0, crop_region.resolution_x, crop_region.resolution_y)
+
+    if result_image.shape[:2] != (image_window.y_max - image_window.y_min, image_window.x_max - image_window.x_min):
+        return None
+
+    return result_image[
+        window.y_min - image_window.y_min:window.y_max - image_window.y_min,
+        window.x_min - image_window.x_min:window.x_max - image_window.x_min,
+    ]
+
+
 def store_blender_script_file(subtask_id: str, blender_crop_script: str) -> str:
     """ Writes content of the Blender crop script to python script file. """
     blender_script_file_name = f'blender_crop_script_{subtask_id}.py'
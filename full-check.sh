@@ -11,6 +11,7 @@ printf "\n"
 printf "========================= MYPY STATIC TYPE CHECKER =================\n"
 mypy --config-file=mypy.ini concent_api/
 mypy --config-file=mypy.ini signing_service/
+mypy --config-file=mypy.ini middleman_protocol/
 printf "\n"
 
 printf "========================= UNIT TESTS WITH COVERAGE =================\n"
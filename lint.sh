@@ -1,13 +1,13 @@
 #!/bin/bash
 
-printf "[FLAKE8: concent_api, signing_service]\n"
+printf "[FLAKE8: concent_api, signing_service, middleman_protocol]\n"
 flake8                          \
     --exclude=local_settings.py \
     --jobs=4                    \
     --ignore=E124,E126,E128,E131,E156,E201,E221,E222,E225,E241,E251,E265,E271,E272,E501,E701,F405
 printf "\n"
 
-printf "[PYLINT: concent_api, signing_service]\n"
+printf "[PYLINT: concent_api, signing_service, middleman_protocol]\n"
 # Find all subdirectories of our python apps and use xargs to pass them as arguments to pylint
 
 find concent_api/ -maxdepth 1 -mindepth 1 -type d \
@@ -17,3 +17,7 @@ printf "\n"
 find signing_service/ -maxdepth 1 -mindepth 1 -type d \
     | xargs pylint --rcfile=pylintrc
 printf "\n"
+
+find middleman_protocol/ -maxdepth 1 -mindepth 1 -type d \
+    | xargs pylint --rcfile=pylintrc
+printf "\n"
@@ -0,0 +1,59 @@
+import enum
+import struct
+
+
+class MessageType(enum.IntEnum):
+    REQUEST = 1
+    RESPONSE = 2
+    ERROR = 3
+    # Sent by SigningService periodically, with request ID 0 and empty payload, to show that it is alive
+    # even when it does not respond to any requests.
+    HEARTBEAT = 4
+    # Carry a batch of payloads signed together, see `encode_batch_payload()`. Signatures are returned in the same
+    # order as the payloads.
+    BATCH_REQUEST = 5
+    BATCH_RESPONSE = 6
+
+
+# Reason of failure carried in the payload of ERROR frames, followed by a description.
+class ErrorCode(enum.IntEnum):
+    SIGNING_SERVICE_UNAVAILABLE = 1
+    SIGNING_SERVICE_DISCONNECTED = 2
+    REQUEST_TIMEOUT = 3
+    INVALID_REQUEST = 4
+    TOO_MANY_REQUESTS = 5
+    SIGNING_FAILED = 6
+
+
+# Errors after which the same request can be sent again, possibly after a delay.
+RETRIABLE_ERROR_CODES = frozenset({
+    ErrorCode.SIGNING_SERVICE_UNAVAILABLE,
+    ErrorCode.SIGNING_SERVICE_DISCONNECTED,
+    ErrorCode.TOO_MANY_REQUESTS,
+})
+
+
+# Header preceding the payload of every frame: payload length, request ID and message type, followed by CRC32 checksum
+# of these fields and the payload. All numbers are unsigned and in network byte order.
+FRAME_HEADER_STRUCT = struct.Struct('!IIBI')
+FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT = struct.Struct('!IIB')
+FRAME_CHECKSUM_STRUCT = struct.Struct('!I')
+
+ERROR_CODE_STRUCT = struct.Struct('!B')
+
+# Payload of batch frames starts with the number of items. Each item is preceded by its length.
+BATCH_ITEM_COUNT_STRUCT = struct.Struct('!H')
+BATCH_ITEM_LENGTH_STRUCT = struct.Struct('!I')
+
+FRAME_HEADER_LENGTH = FRAME_HEADER_STRUCT.size
+FRAME_HEADER_WITHOUT_CHECKSUM_LENGTH = FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT.size
+
+# Frames with longer payloads are rejected, so that a damaged length prefix cannot make the receiver buffer gigabytes.
+MAXIMUM_FRAME_PAYLOAD_LENGTH = 16 * 1024 * 1024
+
+MAXIMUM_REQUEST_ID = 2 ** 32 - 1
+
+MAXIMUM_BATCH_SIZE = 256
+
+# Initial size in bytes of the buffer into which FrameDecoder receives data. It grows if a frame does not fit.
+DEFAULT_FRAME_BUFFER_SIZE = 64 * 1024
@@ -0,0 +1,11 @@
+class MiddleManProtocolError(Exception):
+    pass
+
+
+class InvalidFrameError(MiddleManProtocolError):
+    """ Raised when received data is not a valid frame. The stream cannot be decoded any further. """
+    pass
+
+
+class PayloadTooLargeError(MiddleManProtocolError):
+    pass
@@ -0,0 +1,101 @@
+from typing import List
+from typing import NamedTuple
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+import struct
+import zlib
+
+from middleman_protocol.constants import BATCH_ITEM_COUNT_STRUCT
+from middleman_protocol.constants import BATCH_ITEM_LENGTH_STRUCT
+from middleman_protocol.constants import ERROR_CODE_STRUCT
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import FRAME_CHECKSUM_STRUCT
+from middleman_protocol.constants import FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT
+from middleman_protocol.constants import MAXIMUM_BATCH_SIZE
+from middleman_protocol.constants import MAXIMUM_FRAME_PAYLOAD_LENGTH
+from middleman_protocol.constants import MAXIMUM_REQUEST_ID
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.exceptions import PayloadTooLargeError
+
+
+Payload = Union[bytes, bytearray, memoryview]
+
+Frame = NamedTuple('Frame', [
+    ('request_id', int),
+    ('message_type', MessageType),
+    # Decoded frames refer to the decoder's buffer instead of holding a copy, see FrameDecoder.
+    ('payload', Payload),
+])
+
+
+def compute_frame_checksum(header_without_checksum: Payload, payload: Payload) -> int:
+    return zlib.crc32(payload, zlib.crc32(header_without_checksum))  # type: ignore
+
+
+def encode_frame_header(request_id: int, message_type: MessageType, payload: Payload) -> bytes:
+    """
+    Returns header of the frame carrying the payload. Header and payload can be sent one after another,
+    e.g. with `StreamWriter.writelines()`, so that the payload is not copied.
+    """
+    assert 0 <= request_id <= MAXIMUM_REQUEST_ID
+    assert isinstance(message_type, MessageType)
+
+    if len(payload) > MAXIMUM_FRAME_PAYLOAD_LENGTH:
+        raise PayloadTooLargeError(f'Payload length {len(payload)} exceeds {MAXIMUM_FRAME_PAYLOAD_LENGTH} bytes.')
+
+    header_without_checksum = FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT.pack(len(payload), request_id, message_type)
+    return header_without_checksum + FRAME_CHECKSUM_STRUCT.pack(compute_frame_checksum(header_without_checksum, payload))
+
+
+def encode_frame(request_id: int, message_type: MessageType, payload: Payload) -> bytes:
+    return encode_frame_header(request_id, message_type, payload) + memoryview(payload).tobytes()
+
+
+def encode_error_payload(error_code: ErrorCode, error_message: str) -> bytes:
+    assert isinstance(error_code, ErrorCode)
+    return ERROR_CODE_STRUCT.pack(error_code) + error_message.encode()
+
+
+def decode_error_payload(payload: Payload) -> Tuple[ErrorCode, str]:
+    """ Returns error code and message from the payload of an ERROR frame. """
+    try:
+        (error_code, ) = ERROR_CODE_STRUCT.unpack_from(payload)
+        return (ErrorCode(error_code), memoryview(payload)[ERROR_CODE_STRUCT.size:].tobytes().decode())
+    except (struct.error, ValueError, UnicodeDecodeError) as exception:
+        raise InvalidFrameError(f'Invalid error payload: {exception}')
+
+
+def encode_batch_payload(items: Sequence[Payload]) -> bytes:
+    assert 0 < len(items) <= MAXIMUM_BATCH_SIZE
+    chunks = [BATCH_ITEM_COUNT_STRUCT.pack(len(items))]
+    for item in items:
+        chunks.append(BATCH_ITEM_LENGTH_STRUCT.pack(len(item)))
+        chunks.append(memoryview(item).tobytes())
+    return b''.join(chunks)
+
+
+def decode_batch_payload(payload: Payload) -> List[memoryview]:
+    """ Returns items from the payload of a batch frame. Items are memoryviews of the payload, like frame payloads. """
+    payload = memoryview(payload)
+    try:
+        (items_count, ) = BATCH_ITEM_COUNT_STRUCT.unpack_from(payload)
+        if not 0 < items_count <= MAXIMUM_BATCH_SIZE:
+            raise InvalidFrameError(f'Invalid number of batch items: {items_count}.')
+
+        items = []
+        offset = BATCH_ITEM_COUNT_STRUCT.size
+        for _ in range(items_count):
+            (item_length, ) = BATCH_ITEM_LENGTH_STRUCT.unpack_from(payload, offset)
+            offset += BATCH_ITEM_LENGTH_STRUCT.size
+            if offset + item_length > len(payload):
+                raise InvalidFrameError('Batch item exceeds the payload.')
+            items.append(payload[offset:offset + item_length])
+            offset += item_length
+    except struct.error as exception:
+        raise InvalidFrameError(f'Invalid batch payload: {exception}')
+
+    if offset != len(payload):
+        raise InvalidFrameError('Unexpected data after the last batch item.')
+    return items
@@ -0,0 +1,127 @@
+from typing import Iterator
+from typing import Optional
+
+from middleman_protocol.constants import DEFAULT_FRAME_BUFFER_SIZE
+from middleman_protocol.constants import FRAME_HEADER_LENGTH
+from middleman_protocol.constants import FRAME_HEADER_STRUCT
+from middleman_protocol.constants import FRAME_HEADER_WITHOUT_CHECKSUM_LENGTH
+from middleman_protocol.constants import MAXIMUM_FRAME_PAYLOAD_LENGTH
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.frame import compute_frame_checksum
+from middleman_protocol.frame import Frame
+from middleman_protocol.frame import Payload
+
+
+# Looking message types up in a dict is much faster than calling MessageType(), which matters for small frames.
+MESSAGE_TYPES = {message_type.value: message_type for message_type in MessageType}
+
+
+class FrameDecoder:
+    """
+    Decodes frames from a stream of bytes received in chunks of any size.
+
+    Data is received straight into a preallocated buffer, either with `get_buffer()` and `buffer_updated()`, e.g. using
+    `socket.recv_into()`, or copied there with `feed()`. Payloads of decoded frames are memoryviews of that buffer,
+    so they are not copied, but they are valid only until more data is received. Consumers which need a payload
+    for longer must copy it, e.g. with `bytes()`.
+
+    Unread data is moved to the beginning of the buffer only when there is not enough free space after it, so only
+    the incomplete frame at the end of the buffer is ever moved. The buffer grows if a single frame does not fit.
+    After InvalidFrameError the decoder must not be used any more, because frame boundaries are lost.
+    """
+
+    __slots__ = (
+        '_buffer',
+        '_start',
+        '_end',
+    )
+
+    def __init__(self, buffer_size: int=DEFAULT_FRAME_BUFFER_SIZE) -> None:
+        assert buffer_size >= FRAME_HEADER_LENGTH
+        self._buffer = bytearray(buffer_size)
+        # Unread data is stored in self._buffer[self._start:self._end].
+        self._start = 0
+        self._end = 0
+
+    def get_buffer(self, minimum_size: int=1) -> memoryview:
+        """
+        Returns writable view of the free space at the end of the buffer, at least `minimum_size` bytes long
+        and large enough for the rest of the frame being received. The number of bytes written there
+        must be passed to `buffer_updated()`.
+        """
+        self._reserve_space(max(minimum_size, self._get_missing_frame_length()))
+        return memoryview(self._buffer)[self._end:]
+
+    def buffer_updated(self, bytes_count: int) -> None:
+        assert 0 <= bytes_count <= len(self._buffer) - self._end
+        self._end += bytes_count
+
+    def feed(self, data: Payload) -> None:
+        self.get_buffer(len(data))[:len(data)] = data  # type: ignore
+        self.buffer_updated(len(data))
+
+    def read_frames(self) -> Iterator[Frame]:
+        """ Yields all complete frames received so far. Raises InvalidFrameError if the data is not a valid frame. """
+        while True:
+            frame = self._read_frame()
+            if frame is None:
+                break
+            yield frame
+
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
+
+    @property
+    def unread_length(self) -> int:
+        return self._end - self._start
+
+    def _read_frame(self) -> Optional[Frame]:
+        if self.unread_length < FRAME_HEADER_LENGTH:
+            return None
+
+        (payload_length, request_id, message_type, checksum) = FRAME_HEADER_STRUCT.unpack_from(self._buffer, self._start)
+        if payload_length > MAXIMUM_FRAME_PAYLOAD_LENGTH:
+            raise InvalidFrameError(f'Payload length {payload_length} exceeds {MAXIMUM_FRAME_PAYLOAD_LENGTH} bytes.')
+
+        payload_start = self._start + FRAME_HEADER_LENGTH
+        payload_end = payload_start + payload_length
+        if payload_end > self._end:
+            return None
+
+        buffer_view = memoryview(self._buffer)
+        payload = buffer_view[payload_start:payload_end]
+        header_without_checksum = buffer_view[self._start:self._start + FRAME_HEADER_WITHOUT_CHECKSUM_LENGTH]
+        if compute_frame_checksum(header_without_checksum, payload) != checksum:
+            raise InvalidFrameError(f'Checksum of frame with request ID {request_id} does not match.')
+
+        if message_type not in MESSAGE_TYPES:
+            raise InvalidFrameError(f'Unknown message type {message_type}.')
+
+        self._start = payload_end
+        return Frame(request_id, MESSAGE_TYPES[message_type], payload)
+
+    def _get_missing_frame_length(self) -> int:
+        """ Returns number of bytes still needed to complete the frame at the beginning of unread data. """
+        if self.unread_length < FRAME_HEADER_LENGTH:
+            return FRAME_HEADER_LENGTH - self.unread_length
+        (payload_length, _, _, _) = FRAME_HEADER_STRUCT.unpack_from(self._buffer, self._start)
+        # Invalid length is reported by read_frames(), here it must only not make the buffer grow.
+        return max(min(payload_length, MAXIMUM_FRAME_PAYLOAD_LENGTH) + FRAME_HEADER_LENGTH - self.unread_length, 0)
+
+    def _reserve_space(self, size: int) -> None:
+        if len(self._buffer) - self._end >= size:
+            return
+
+        unread_length = self.unread_length
+        if unread_length + size > len(self._buffer):
+            # A new buffer is allocated rather than resized, because payloads of earlier frames may still refer
+            # to the current one.
+            buffer = bytearray(max(2 * len(self._buffer), unread_length + size))
+            memoryview(buffer)[:unread_length] = memoryview(self._buffer)[self._start:self._end]
+            self._buffer = buffer
+        else:
+            self._buffer[:unread_length] = self._buffer[self._start:self._end]
+        self._start = 0
+        self._end = unread_length
@@ -0,0 +1,59 @@
+import time
+
+import pytest
+
+from middleman_protocol.constants import MessageType
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import encode_frame_header
+from middleman_protocol.stream import FrameDecoder
+
+
+# Total number of payload bytes encoded and decoded for each payload size.
+BENCHMARK_DATA_SIZE = 64 * 1024 * 1024
+
+# Size in bytes of chunks in which encoded frames are received, like from a socket.
+BENCHMARK_RECEIVE_SIZE = 64 * 1024
+
+
+def report(capsys, operation, payload_length, frames_count, elapsed_time):
+    with capsys.disabled():
+        print(
+            f'\n{operation} {payload_length} B payloads: '
+            f'{frames_count / elapsed_time:,.0f} frames/s, '
+            f'{frames_count * payload_length / elapsed_time / (1024 * 1024):,.1f} MiB/s'
+        )
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize('payload_length', [64, 1024, 64 * 1024])
+class TestCodecThroughput:
+
+    def test_encoding_throughput(self, capsys, payload_length):  # pylint: disable=no-self-use
+        payload = bytes(payload_length)
+        frames_count = BENCHMARK_DATA_SIZE // payload_length
+
+        start_time = time.perf_counter()
+        for request_id in range(frames_count):
+            encode_frame_header(request_id, MessageType.REQUEST, payload)
+        report(capsys, 'Encoding headers of', payload_length, frames_count, time.perf_counter() - start_time)
+
+    def test_decoding_throughput(self, capsys, payload_length):  # pylint: disable=no-self-use
+        frames_count = BENCHMARK_DATA_SIZE // payload_length
+        data = memoryview(b''.join(
+            encode_frame(request_id, MessageType.REQUEST, bytes(payload_length))
+            for request_id in range(frames_count)
+        ))
+        frame_decoder = FrameDecoder()
+
+        decoded_frames_count = 0
+        start_time = time.perf_counter()
+        for position in range(0, len(data), BENCHMARK_RECEIVE_SIZE):
+            chunk = data[position:position + BENCHMARK_RECEIVE_SIZE]
+            frame_decoder.get_buffer(len(chunk))[:len(chunk)] = chunk
+            frame_decoder.buffer_updated(len(chunk))
+            for _ in frame_decoder.read_frames():
+                decoded_frames_count += 1
+        elapsed_time = time.perf_counter() - start_time
+
+        assert decoded_frames_count == frames_count
+        report(capsys, 'Decoding', payload_length, frames_count, elapsed_time)
@@ -0,0 +1,93 @@
+from assertpy import assert_that
+import pytest
+
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import FRAME_HEADER_LENGTH
+from middleman_protocol.constants import MAXIMUM_BATCH_SIZE
+from middleman_protocol.constants import MAXIMUM_FRAME_PAYLOAD_LENGTH
+from middleman_protocol.constants import MAXIMUM_REQUEST_ID
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.exceptions import PayloadTooLargeError
+from middleman_protocol.frame import decode_batch_payload
+from middleman_protocol.frame import decode_error_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_error_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import encode_frame_header
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+
+class TestEncodeFrame:
+
+    @pytest.mark.parametrize(('request_id', 'message_type', 'payload'), [
+        (0, MessageType.REQUEST, b''),
+        (1, MessageType.RESPONSE, b'signature'),
+        (MAXIMUM_REQUEST_ID, MessageType.ERROR, bytes(range(256))),
+    ])  # pylint: disable=no-self-use
+    def test_that_encoded_frame_is_decoded_to_the_same_frame(self, request_id, message_type, payload):
+        frame_decoder = FrameDecoder()
+        frame_decoder.feed(encode_frame(request_id, message_type, payload))
+
+        assert_that(list(frame_decoder.read_frames())).is_equal_to([Frame(request_id, message_type, payload)])
+
+    def test_that_header_can_be_sent_separately_from_payload(self):  # pylint: disable=no-self-use
+        payload = memoryview(b'payload')
+
+        header = encode_frame_header(7, MessageType.REQUEST, payload)
+
+        assert_that(header).is_length(FRAME_HEADER_LENGTH)
+        assert_that(header + payload).is_equal_to(encode_frame(7, MessageType.REQUEST, b'payload'))
+
+    def test_that_frames_with_different_request_ids_differ_in_checksum(self):  # pylint: disable=no-self-use
+        assert_that(encode_frame_header(1, MessageType.REQUEST, b'')[-4:]).is_not_equal_to(
+            encode_frame_header(2, MessageType.REQUEST, b'')[-4:]
+        )
+
+    def test_that_too_large_payload_is_rejected(self):  # pylint: disable=no-self-use
+        with pytest.raises(PayloadTooLargeError):
+            encode_frame_header(1, MessageType.REQUEST, bytes(MAXIMUM_FRAME_PAYLOAD_LENGTH + 1))
+
+
+class TestErrorPayload:
+
+    def test_that_error_code_and_message_are_decoded_from_error_payload(self):  # pylint: disable=no-self-use
+        payload = memoryview(encode_error_payload(ErrorCode.REQUEST_TIMEOUT, 'Request timed out.'))
+
+        assert_that(decode_error_payload(payload)).is_equal_to((ErrorCode.REQUEST_TIMEOUT, 'Request timed out.'))
+
+    @pytest.mark.parametrize('payload', [
+        b'',
+        b'\xff',
+        bytes([ErrorCode.REQUEST_TIMEOUT]) + b'\xff',
+    ])  # pylint: disable=no-self-use
+    def test_that_invalid_error_payload_raises_invalid_frame_error(self, payload):
+        with pytest.raises(InvalidFrameError):
+            decode_error_payload(payload)
+
+
+class TestBatchPayload:
+
+    @pytest.mark.parametrize('items', [
+        [b''],
+        [b'first', b'', b'third'],
+        [bytes([index]) * index for index in range(MAXIMUM_BATCH_SIZE)],
+    ])  # pylint: disable=no-self-use
+    def test_that_batch_items_are_decoded_in_order(self, items):
+        assert_that(
+            [bytes(item) for item in decode_batch_payload(encode_batch_payload(items))]
+        ).is_equal_to(items)
+
+    @pytest.mark.parametrize('payload', [
+        b'',
+        b'\x00',
+        b'\x00\x00',
+        b'\x01\x01',
+        b'\x00\x01\x00\x00\x00\x05abc',
+        b'\x00\x01\x00\x00\x00\x01ab',
+        b'\x00\x02\x00\x00\x00\x01a',
+    ])  # pylint: disable=no-self-use
+    def test_that_invalid_batch_payload_raises_invalid_frame_error(self, payload):
+        with pytest.raises(InvalidFrameError):
+            decode_batch_payload(payload)
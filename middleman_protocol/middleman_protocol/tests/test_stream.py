@@ -0,0 +1,159 @@
+import random
+
+from assertpy import assert_that
+import pytest
+
+from middleman_protocol.constants import FRAME_HEADER_LENGTH
+from middleman_protocol.constants import FRAME_HEADER_STRUCT
+from middleman_protocol.constants import FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT
+from middleman_protocol.constants import MAXIMUM_FRAME_PAYLOAD_LENGTH
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.frame import compute_frame_checksum
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
+
+
+FUZZ_TEST_ITERATIONS = 200
+
+
+def generate_random_frames(random_generator, frames_count, maximum_payload_length):
+    return [
+        Frame(
+            random_generator.randrange(2 ** 32),
+            random_generator.choice(list(MessageType)),
+            bytes(random_generator.getrandbits(8) for _ in range(random_generator.randrange(maximum_payload_length))),
+        )
+        for _ in range(frames_count)
+    ]
+
+
+def split_into_random_chunks(random_generator, data):
+    chunks = []
+    position = 0
+    while position < len(data):
+        chunk_length = random_generator.randint(1, 2 * FRAME_HEADER_LENGTH)
+        chunks.append(data[position:position + chunk_length])
+        position += chunk_length
+    return chunks
+
+
+def decode_chunks(frame_decoder, chunks):
+    """ Receives chunks with recv_into()-like calls and returns copies of all decoded frames. """
+    frames = []
+    for chunk in chunks:
+        buffer = frame_decoder.get_buffer(len(chunk))
+        buffer[:len(chunk)] = chunk
+        frame_decoder.buffer_updated(len(chunk))
+        frames += [frame._replace(payload=bytes(frame.payload)) for frame in frame_decoder.read_frames()]
+    return frames
+
+
+class TestFrameDecoder:
+
+    def test_that_frames_split_at_every_byte_are_decoded(self):  # pylint: disable=no-self-use
+        frames = [Frame(1, MessageType.REQUEST, b'first'), Frame(2, MessageType.RESPONSE, b'second')]
+        data = b''.join(encode_frame(*frame) for frame in frames)
+
+        decoded_frames = decode_chunks(FrameDecoder(buffer_size=FRAME_HEADER_LENGTH), [data[i:i + 1] for i in range(len(data))])
+
+        assert_that(decoded_frames).is_equal_to(frames)
+
+    def test_that_payloads_refer_to_decoder_buffer_instead_of_being_copied(self):  # pylint: disable=no-self-use
+        frame_decoder = FrameDecoder()
+        frame_decoder.feed(encode_frame(1, MessageType.REQUEST, b'payload'))
+
+        (frame, ) = frame_decoder.read_frames()
+
+        assert_that(frame.payload).is_instance_of(memoryview)
+        assert_that(frame.payload.obj).is_same_as(frame_decoder._buffer)  # pylint: disable=protected-access
+
+    def test_that_buffer_grows_for_frame_larger_than_buffer_while_earlier_payloads_stay_valid(self):  # pylint: disable=no-self-use
+        frame_decoder = FrameDecoder(buffer_size=FRAME_HEADER_LENGTH + 4)
+        frame_decoder.feed(encode_frame(1, MessageType.REQUEST, b'abcd'))
+        (small_frame, ) = frame_decoder.read_frames()
+
+        frame_decoder.feed(encode_frame(2, MessageType.REQUEST, b'x' * 1000))
+        (large_frame, ) = frame_decoder.read_frames()
+
+        assert_that(bytes(small_frame.payload)).is_equal_to(b'abcd')
+        assert_that(bytes(large_frame.payload)).is_equal_to(b'x' * 1000)
+
+    def test_that_buffer_for_receiving_has_room_for_the_rest_of_the_frame(self):  # pylint: disable=no-self-use
+        frame_decoder = FrameDecoder(buffer_size=64)
+        frame_decoder.feed(encode_frame(1, MessageType.REQUEST, b'x' * 1000)[:FRAME_HEADER_LENGTH + 10])
+
+        assert_that(len(frame_decoder.get_buffer())).is_greater_than_or_equal_to(990)
+
+    @pytest.mark.parametrize('damaged_data', [
+        # Checksum does not match.
+        encode_frame(1, MessageType.REQUEST, b'payload')[:-1] + b'X',
+        # Unknown message type with a valid checksum.
+        FRAME_HEADER_STRUCT.pack(0, 1, 255, compute_frame_checksum(FRAME_HEADER_WITHOUT_CHECKSUM_STRUCT.pack(0, 1, 255), b'')),
+        # Payload length exceeds the limit.
+        FRAME_HEADER_STRUCT.pack(MAXIMUM_FRAME_PAYLOAD_LENGTH + 1, 1, MessageType.REQUEST, 0),
+    ])  # pylint: disable=no-self-use
+    def test_that_invalid_frame_raises_invalid_frame_error(self, damaged_data):
+        frame_decoder = FrameDecoder()
+        frame_decoder.feed(damaged_data)
+
+        with pytest.raises(InvalidFrameError):
+            list(frame_decoder.read_frames())
+
+
+class TestFrameDecoderFuzzing:
+
+    @pytest.mark.parametrize('seed', range(FUZZ_TEST_ITERATIONS))  # pylint: disable=no-self-use
+    def test_that_frames_split_into_random_chunks_are_decoded_unchanged(self, seed):
+        random_generator = random.Random(seed)
+        frames = generate_random_frames(random_generator, random_generator.randint(1, 10), 100)
+        data = b''.join(encode_frame(*frame) for frame in frames)
+
+        frame_decoder = FrameDecoder(buffer_size=random_generator.randint(FRAME_HEADER_LENGTH, 200))
+        decoded_frames = decode_chunks(frame_decoder, split_into_random_chunks(random_generator, data))
+
+        assert_that(decoded_frames).is_equal_to(frames)
+        assert_that(frame_decoder.unread_length).is_equal_to(0)
+
+    @pytest.mark.parametrize('seed', range(FUZZ_TEST_ITERATIONS))  # pylint: disable=no-self-use
+    def test_that_damaged_byte_is_never_decoded_into_a_frame(self, seed):
+        random_generator = random.Random(seed)
+        frames = generate_random_frames(random_generator, 5, 50)
+        encoded_frames = [encode_frame(*frame) for frame in frames]
+        data = bytearray(b''.join(encoded_frames))
+        damaged_position = random_generator.randrange(len(data))
+        data[damaged_position] ^= random_generator.randint(1, 255)
+
+        decoded_frames = []
+        try:
+            decoded_frames = decode_chunks(FrameDecoder(), split_into_random_chunks(random_generator, bytes(data)))
+        except InvalidFrameError:
+            pass
+
+        # Only frames which end before the damaged byte may be decoded. A damaged length may also make
+        # the decoder wait for more data, but never yield a frame with damaged contents.
+        frames_before_damage = 0
+        frame_end = 0
+        for encoded_frame in encoded_frames:
+            frame_end += len(encoded_frame)
+            if frame_end > damaged_position:
+                break
+            frames_before_damage += 1
+        assert_that(decoded_frames).is_equal_to(frames[:len(decoded_frames)])
+        assert_that(len(decoded_frames)).is_less_than_or_equal_to(frames_before_damage)
+
+    @pytest.mark.parametrize('seed', range(FUZZ_TEST_ITERATIONS))  # pylint: disable=no-self-use
+    def test_that_random_data_only_raises_invalid_frame_error_and_does_not_grow_buffer_beyond_limit(self, seed):
+        random_generator = random.Random(seed)
+        data = bytes(random_generator.getrandbits(8) for _ in range(random_generator.randint(1, 500)))
+        frame_decoder = FrameDecoder(buffer_size=FRAME_HEADER_LENGTH)
+
+        try:
+            decode_chunks(frame_decoder, split_into_random_chunks(random_generator, data))
+        except InvalidFrameError:
+            pass
+
+        assert_that(len(frame_decoder._buffer)).is_less_than_or_equal_to(  # pylint: disable=protected-access
+            2 * (MAXIMUM_FRAME_PAYLOAD_LENGTH + FRAME_HEADER_LENGTH)
+        )
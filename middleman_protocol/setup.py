@@ -0,0 +1,11 @@
+from setuptools import find_packages
+from setuptools import setup
+
+
+setup(
+    name='Middleman-Protocol',
+    version='0.1.0',
+    description='Wire protocol spoken between Concent, MiddleMan and SigningService.',
+    packages=find_packages(exclude=['*.tests']),
+    python_requires='>=3.6',
+)
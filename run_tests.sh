@@ -53,3 +53,12 @@ pytest -p no:django                 \
     ${TEST_RUNNER_EXTRA_ARGUMENTS}
 rm .coverage
 cd ..
+
+cd middleman_protocol/
+pytest -p no:django                 \
+    --cov-report term-missing       \
+    --cov-config ../coverage-config \
+    --cov=$MODULE $PATTERN          \
+    ${TEST_RUNNER_EXTRA_ARGUMENTS}
+rm .coverage
+cd ..
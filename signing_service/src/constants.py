@@ -4,6 +4,21 @@ SIGNING_SERVICE_DEFAULT_PORT = 9055
 
 SIGNING_SERVICE_MAXIMUM_RECONNECT_TIME = 2**6
 
+# Number of seconds after which a connection is considered healthy even if no request was received over it.
+# The reconnect delay is reset only after a healthy connection, so that a peer which closes connections right away
+# does not make SigningService reconnect in a tight loop.
+SIGNING_SERVICE_HEALTHY_CONNECTION_TIME = 60
+
+# Number of seconds between heartbeats sent to MiddleMan.
+SIGNING_SERVICE_HEARTBEAT_INTERVAL = 10
+
+# Maximum number of requests being signed or waiting for a worker. The connection is not read any further until
+# some of them are answered.
+SIGNING_SERVICE_MAXIMUM_CONCURRENT_REQUESTS = 100
+
+# Maximum number of bytes read from the connection at once.
+SIGNING_SERVICE_STREAM_READ_SIZE = 64 * 1024
+
 SIGNING_SERVICE_RECOVERABLE_ERRORS = [
     # 86 Streams pipe error
     socket.errno.ESTRPIPE,  # type: ignore
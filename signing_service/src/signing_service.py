@@ -1,27 +1,58 @@
+from concurrent.futures import Executor
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from typing import List
+from typing import Set
+from typing import Tuple
 import argparse
+import asyncio
 import logging.config
 import os
 import signal
 import socket
-from contextlib import closing
-from time import sleep
 
 from exceptions import SigningServiceValidationError  # pylint: disable=no-name-in-module
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import MessageType
+from middleman_protocol.exceptions import InvalidFrameError
+from middleman_protocol.frame import decode_batch_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_error_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import encode_frame_header
+from middleman_protocol.stream import FrameDecoder
 from raven import Client
 
 from constants import SIGNING_SERVICE_DEFAULT_PORT  # pylint: disable=no-name-in-module
+from constants import SIGNING_SERVICE_HEARTBEAT_INTERVAL  # pylint: disable=no-name-in-module
+from constants import SIGNING_SERVICE_HEALTHY_CONNECTION_TIME  # pylint: disable=no-name-in-module
+from constants import SIGNING_SERVICE_MAXIMUM_CONCURRENT_REQUESTS  # pylint: disable=no-name-in-module
 from constants import SIGNING_SERVICE_MAXIMUM_RECONNECT_TIME  # pylint: disable=no-name-in-module
 from constants import SIGNING_SERVICE_RECOVERABLE_ERRORS  # pylint: disable=no-name-in-module
+from constants import SIGNING_SERVICE_STREAM_READ_SIZE  # pylint: disable=no-name-in-module
 
 
 logger = logging.getLogger()
 crash_logger = logging.getLogger('crash')
 
 
+def sign_payload(payload: bytes) -> bytes:
+    """ Runs in a worker process. Every request is answered with its own payload. """
+    return payload
+
+
+def sign_payloads(payloads: List[bytes]) -> List[bytes]:
+    """ Runs in a worker process. The whole batch is passed to one worker at once. """
+    return [sign_payload(payload) for payload in payloads]
+
+
 class SigningService:
     """
     The Signing Service connects to Middleman as a client but then listens for requests coming from Concent via
     Middleman. The underlying protocol is TCP and data sent over that is expected to conform to the Wire protocol.
+
+    Requests are read and answered concurrently. Signing runs in a pool of worker processes, so that the connection
+    is still served, including heartbeats, while the workers are busy.
     """
 
     __slots__ = (
@@ -29,19 +60,25 @@ class SigningService:
         'port',
         'initial_reconnect_delay',
         'current_reconnect_delay',
-        'socket',
+        'signing_workers',
+        'executor',
         'was_sigterm_caught',
+        '_main_task',
     )
 
-    def __init__(self, host, port, initial_reconnect_delay) -> None:
+    def __init__(self, host, port, initial_reconnect_delay, signing_workers=None) -> None:
         assert isinstance(host, str)
         assert isinstance(port, int)
         assert isinstance(initial_reconnect_delay, int)
+        assert isinstance(signing_workers, (int, type(None)))
         self.host = host
         self.port = port
         self.initial_reconnect_delay = initial_reconnect_delay
         self.current_reconnect_delay = None
+        self.signing_workers = signing_workers if signing_workers is not None else os.cpu_count()
+        self.executor = None  # type: Optional[Executor]
         self.was_sigterm_caught = False
+        self._main_task = None  # type: Optional[asyncio.Future]
 
         self._validate_arguments()
 
@@ -54,55 +91,175 @@ class SigningService:
         If a shutdown signal or KeyboardInterrupt is caught, exit gracefully.
         If there was an unrecognized exception, it logs it and report to Sentry, then reraise and crash.
         """
-
-        def _set_was_sigterm_caught_true(signum, frame):  # pylint: disable=unused-argument
-            logger.info('Closing connection and exiting on SIGTERM.')
-            self.was_sigterm_caught = True
-
+        loop = asyncio.get_event_loop()
         # Handle shutdown signal.
-        signal.signal(signal.SIGTERM, _set_was_sigterm_caught_true)
-
+        loop.add_signal_handler(signal.SIGTERM, self._handle_sigterm)
+        executor = self._start_signing_workers()
+        main_task = self._main_task = asyncio.ensure_future(self._run(), loop=loop)
+        try:
+            loop.run_until_complete(main_task)
+        except KeyboardInterrupt:
+            # Handle keyboard interrupt.
+            logger.info('Closing connection and exiting on KeyboardInterrupt.')
+            main_task.cancel()
+            loop.run_until_complete(asyncio.gather(main_task, return_exceptions=True))
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+            executor.shutdown()
+
+    def _start_signing_workers(self) -> Executor:
+        executor = self.executor = ProcessPoolExecutor(self.signing_workers)
+        # Worker processes are forked when the pool is used for the first time. Forked after connecting, they would
+        # inherit the socket and keep the connection open after SigningService closes it.
+        executor.submit(sign_payload, b'').result()
+        return executor
+
+    async def _run(self) -> None:
         while not self._was_sigterm_caught():
-            with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as tcp_socket:
-                try:
-                    self._connect(tcp_socket)
-                except socket.error as exception:
-                    logger.error(f'Socket error occurred: {exception}')
-
-                    # Only predefined list of exceptions should cause reconnect, others should be reraised.
-                    if isinstance(exception.args, tuple) and exception.args[0] not in SIGNING_SERVICE_RECOVERABLE_ERRORS:  # type: ignore
-                        raise
-
-                    # Increase delay and reconnect if the connection is interrupted due to a failure.
-                    self._increase_delay()
-                except KeyboardInterrupt:
-                    # Handle keyboard interrupt.
-                    logger.info('Closing connection and exiting on KeyboardInterrupt.')
-                    break
-                except Exception as exception:
-                    # If there was an unrecognized exception, log it and report to Sentry.
-                    crash_logger.error(f'Unrecognized exception occurred: {exception}')
+            try:
+                await self._connect()
+            except socket.error as exception:
+                logger.error(f'Socket error occurred: {exception}')
+
+                # Only predefined list of exceptions should cause reconnect, others should be reraised.
+                if isinstance(exception.args, tuple) and exception.args[0] not in SIGNING_SERVICE_RECOVERABLE_ERRORS:  # type: ignore
                     raise
 
-    def _connect(self, tcp_socket: socket.socket) -> None:
+                # Increase delay and reconnect if the connection is interrupted due to a failure.
+                self._increase_delay()
+            except asyncio.CancelledError:
+                # Cancelled on SIGTERM, the loop ends after the connection is closed.
+                if not self._was_sigterm_caught():
+                    raise
+            except Exception as exception:
+                # If there was an unrecognized exception, log it and report to Sentry.
+                crash_logger.error(f'Unrecognized exception occurred: {exception}')
+                raise
+
+    def _handle_sigterm(self) -> None:
+        logger.info('Closing connection and exiting on SIGTERM.')
+        self.was_sigterm_caught = True
+        if self._main_task is not None:
+            self._main_task.cancel()
+
+    async def _connect(self) -> None:
         """ Creates socket and connects to given HOST and PORT. """
         if self.current_reconnect_delay is not None:
             logger.info(f'Waiting {self.current_reconnect_delay} before connecting.')
-            sleep(self.current_reconnect_delay)
+            await asyncio.sleep(self.current_reconnect_delay)
 
         logger.info(f'Connecting to {self.host}:{self.port}.')
-        tcp_socket.connect((self.host, self.port))
+        (reader, writer) = await asyncio.open_connection(self.host, self.port)
         logger.info(f'Connection established.')
 
-        # Reset delay on successful connection and set flag that connection is established.
-        self.current_reconnect_delay = None
-        self._handle_connection(tcp_socket)
+        connected_at = asyncio.get_event_loop().time()
+        try:
+            was_request_received = await self._handle_connection(reader, writer)
+        finally:
+            writer.close()
+
+        # Reset delay only after a healthy connection. A connection closed right after it was established, e.g. by
+        # a peer which rejects it, would otherwise be retried in a tight loop.
+        if was_request_received or asyncio.get_event_loop().time() - connected_at >= SIGNING_SERVICE_HEALTHY_CONNECTION_TIME:
+            self.current_reconnect_delay = None
+        else:
+            self._increase_delay()
 
-    def _handle_connection(self, tcp_socket: socket.socket) -> None:  # pylint: disable=no-self-use
-        """ Inner loop that handles data exchange over socket. """
-        while True:
-            data = tcp_socket.recv(1024)
-            tcp_socket.send(data)
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """
+        Inner loop that handles data exchange over the connection. Every request is answered by a separate task
+        as soon as it is signed, so responses may be sent in different order than requests were received.
+        Returns when the connection is closed by the other side or when it receives data which is not a valid frame.
+        Requests which are not answered by then are abandoned. Returns True if the connection was closed by the other
+        side after at least one request was received.
+        """
+        frame_decoder = FrameDecoder()
+        # Only one task at a time may wait for the buffer of a StreamWriter to drain.
+        drain_lock = asyncio.Lock()
+        concurrent_requests = asyncio.Semaphore(SIGNING_SERVICE_MAXIMUM_CONCURRENT_REQUESTS)
+        tasks = {asyncio.ensure_future(self._send_heartbeats(writer, drain_lock))}  # type: Set[asyncio.Future]
+        was_request_received = False
+        try:
+            while True:
+                data = await reader.read(SIGNING_SERVICE_STREAM_READ_SIZE)
+                if data == b'':
+                    logger.info('Connection closed by the other side.')
+                    return was_request_received
+                frame_decoder.feed(data)
+                try:
+                    for frame in frame_decoder.read_frames():
+                        was_request_received = True
+                        await concurrent_requests.acquire()
+                        # Payload refers to the buffer of the frame decoder, so it is copied before more data is read.
+                        task = asyncio.ensure_future(
+                            self._respond(frame.request_id, frame.message_type, memoryview(frame.payload).tobytes(), writer, drain_lock, concurrent_requests)
+                        )
+                        tasks.add(task)
+                        task.add_done_callback(tasks.discard)
+                except InvalidFrameError as exception:
+                    logger.error(f'Invalid frame received, closing connection: {exception}')
+                    return False
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _respond(
+        self,
+        request_id: int,
+        message_type: MessageType,
+        payload: bytes,
+        writer: asyncio.StreamWriter,
+        drain_lock: asyncio.Lock,
+        concurrent_requests: asyncio.Semaphore,
+    ) -> None:
+        try:
+            try:
+                (response_type, response_payload) = await self._sign(message_type, payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exception:  # pylint: disable=broad-except
+                # E.g. BrokenProcessPool or a bug in signing code. The request is answered anyway, so that MiddleMan
+                # does not wait for it until it times out.
+                crash_logger.error(f'Unrecognized exception occurred while signing request {request_id}: {exception}')
+                (response_type, response_payload) = (
+                    MessageType.ERROR,
+                    encode_error_payload(ErrorCode.SIGNING_FAILED, f'Signing failed: {exception}'),
+                )
+            writer.writelines([encode_frame_header(request_id, response_type, response_payload), response_payload])
+            async with drain_lock:
+                await writer.drain()
+        except ConnectionError as exception:
+            # The connection loop notices it as well and reconnects.
+            logger.info(f'Response to request {request_id} not sent: {exception}')
+        finally:
+            concurrent_requests.release()
+
+    async def _sign(self, message_type: MessageType, payload: bytes) -> Tuple[MessageType, bytes]:
+        """ Returns type and payload of the frame answering the request. """
+        loop = asyncio.get_event_loop()
+        if message_type == MessageType.REQUEST:
+            return (MessageType.RESPONSE, await loop.run_in_executor(self.executor, sign_payload, payload))
+
+        if message_type == MessageType.BATCH_REQUEST:
+            try:
+                items = [item.tobytes() for item in decode_batch_payload(payload)]
+            except InvalidFrameError as exception:
+                return (MessageType.ERROR, encode_error_payload(ErrorCode.INVALID_REQUEST, str(exception)))
+            signatures = await loop.run_in_executor(self.executor, sign_payloads, items)
+            return (MessageType.BATCH_RESPONSE, encode_batch_payload(signatures))
+
+        return (MessageType.ERROR, encode_error_payload(ErrorCode.INVALID_REQUEST, f'Unexpected message type {message_type.name}.'))
+
+    @staticmethod
+    async def _send_heartbeats(writer: asyncio.StreamWriter, drain_lock: asyncio.Lock) -> None:
+        try:
+            while True:
+                writer.write(encode_frame(0, MessageType.HEARTBEAT, b''))
+                async with drain_lock:
+                    await writer.drain()
+                await asyncio.sleep(SIGNING_SERVICE_HEARTBEAT_INTERVAL)
+        except ConnectionError:
+            pass
 
     def _increase_delay(self) -> None:
         """ Increase current delay if connection cannot be established. """
@@ -124,6 +281,9 @@ class SigningService:
         if self.initial_reconnect_delay < 0:
             raise SigningServiceValidationError('reconnect_delay must be non-negative integer.')
 
+        if self.signing_workers < 1:
+            raise SigningServiceValidationError('signing_workers must be positive integer.')
+
 
 def _parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -143,6 +303,13 @@ def _parse_arguments() -> argparse.Namespace:
         type=int,
         help=f'Port on which Concent cluster is listening (default: {SIGNING_SERVICE_DEFAULT_PORT}).',
     )
+    parser.add_argument(
+        '--signing-workers',
+        default=None,
+        dest='signing_workers',
+        type=int,
+        help='Number of worker processes signing requests (default: number of CPUs).',
+    )
     parser.add_argument(
         '--sentry-dsn',
         default='',
@@ -165,5 +332,6 @@ if __name__ == '__main__':
     arg_host = args.concent_cluster_host
     arg_port = args.concent_cluster_port
     arg_initial_reconnect_delay = args.initial_reconnect_delay
+    arg_signing_workers = args.signing_workers
 
-    SigningService(arg_host, arg_port, arg_initial_reconnect_delay).run()
+    SigningService(arg_host, arg_port, arg_initial_reconnect_delay, arg_signing_workers).run()
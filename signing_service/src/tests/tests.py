@@ -1,8 +1,20 @@
+from contextlib import closing
 from unittest import TestCase
+import asyncio
+import os
+import signal
 import socket
 import sys
+import threading
 
 import mock
+from middleman_protocol.constants import ErrorCode
+from middleman_protocol.constants import MessageType
+from middleman_protocol.frame import decode_error_payload
+from middleman_protocol.frame import encode_batch_payload
+from middleman_protocol.frame import encode_frame
+from middleman_protocol.frame import Frame
+from middleman_protocol.stream import FrameDecoder
 
 from ..constants import SIGNING_SERVICE_DEFAULT_PORT
 from ..constants import SIGNING_SERVICE_RECOVERABLE_ERRORS
@@ -11,6 +23,12 @@ from ..signing_service import _parse_arguments
 from ..signing_service import SigningService
 
 
+def _get_coroutine_function(result=None):
+    async def coroutine_function(*_args, **_kwargs):
+        return result
+    return coroutine_function
+
+
 class SigningServiceMainTestCase(TestCase):
 
     def setUp(self):
@@ -19,65 +37,249 @@ class SigningServiceMainTestCase(TestCase):
         self.initial_reconnect_delay = 2
 
     def test_that_signing_service_should_be_instantiated_correctly_with_all_parameters(self):
-        signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+        signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay, 3)
 
         self.assertIsInstance(signing_service, SigningService)
         self.assertEqual(signing_service.host, self.host)
         self.assertEqual(signing_service.port, self.port)
         self.assertEqual(signing_service.initial_reconnect_delay, self.initial_reconnect_delay)
+        self.assertEqual(signing_service.signing_workers, 3)
+
+    def test_that_signing_service_should_use_worker_per_cpu_by_default(self):
+        signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+
+        self.assertEqual(signing_service.signing_workers, os.cpu_count())
 
     def test_that_signing_service_should_run_full_loop_when_instantiated_with_all_parameters(self):
-        with mock.patch('socket.socket.connect') as mock_socket_connect:
-            with mock.patch('src.signing_service.SigningService._handle_connection') as mock__handle_connection:
-                with mock.patch('socket.socket.close') as mock_socket_close:
-                    with mock.patch('src.signing_service.SigningService._was_sigterm_caught', side_effect=[False, True]):
-                        signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
-                        signing_service.run()
+        mock_writer = mock.Mock()
+        with mock.patch('asyncio.open_connection', side_effect=_get_coroutine_function((mock.Mock(), mock_writer))) as mock_open_connection:
+            with mock.patch('src.signing_service.SigningService._handle_connection', side_effect=_get_coroutine_function()) as mock__handle_connection:
+                with mock.patch('src.signing_service.SigningService._was_sigterm_caught', side_effect=[False, True]):
+                    signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+                    signing_service.run()
 
-        mock_socket_connect.assert_called_once_with(('127.0.0.1', 8000))
-        mock_socket_close.assert_called_once()
+        mock_open_connection.assert_called_once_with('127.0.0.1', 8000)
+        mock_writer.close.assert_called_once()
         mock__handle_connection.assert_called_once()
 
     def test_that_signing_service_should_exit_gracefully_on_keyboard_interrupt(self):
-        with mock.patch('socket.socket.connect', side_effect=KeyboardInterrupt()) as mock_socket_connect:
-            with mock.patch('socket.socket.close') as mock_socket_close:
-                signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
-                signing_service.run()
+        with mock.patch('asyncio.open_connection', side_effect=KeyboardInterrupt()) as mock_open_connection:
+            signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+            signing_service.run()
 
-        mock_socket_connect.assert_called_once_with(('127.0.0.1', 8000))
-        mock_socket_close.assert_called_once()
+        mock_open_connection.assert_called_once_with('127.0.0.1', 8000)
 
     def test_that_signing_service_should_reraise_unrecognized_exception(self):
-        with mock.patch('socket.socket.connect', side_effect=Exception()) as mock_socket_connect:
-            with mock.patch('socket.socket.close') as mock_socket_close:
-                signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
-                with self.assertRaises(Exception):
-                    signing_service.run()
+        with mock.patch('asyncio.open_connection', side_effect=Exception()) as mock_open_connection:
+            signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+            with self.assertRaises(Exception):
+                signing_service.run()
 
-        mock_socket_connect.assert_called_once_with(('127.0.0.1', 8000))
-        mock_socket_close.assert_called_once()
+        mock_open_connection.assert_called_once_with('127.0.0.1', 8000)
 
     def test_that_signing_service_should_reconnect_when_expected_socket_error_was_caught(self):
         assert socket.errno.ECONNREFUSED in SIGNING_SERVICE_RECOVERABLE_ERRORS
 
-        with mock.patch('socket.socket.connect', side_effect=socket.error(socket.errno.ECONNREFUSED)) as mock_socket_connect:
+        with mock.patch('asyncio.open_connection', side_effect=socket.error(socket.errno.ECONNREFUSED)) as mock_open_connection:
             with mock.patch('src.signing_service.SigningService._was_sigterm_caught', side_effect=[False, False, True]):
                 signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
                 signing_service.run()
 
-        self.assertEqual(mock_socket_connect.call_count, 2)
+        self.assertEqual(mock_open_connection.call_count, 2)
 
     def test_that_signing_service_should_reraise_different_socket_erros(self):
         assert socket.errno.EBUSY not in SIGNING_SERVICE_RECOVERABLE_ERRORS
 
-        with mock.patch('socket.socket.connect', side_effect=socket.error(socket.errno.EBUSY)) as mock_socket_connect:
-            with mock.patch('socket.socket.close') as mock_socket_close:
-                signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
-                with self.assertRaises(socket.error):
+        with mock.patch('asyncio.open_connection', side_effect=socket.error(socket.errno.EBUSY)) as mock_open_connection:
+            signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+            with self.assertRaises(socket.error):
+                signing_service.run()
+
+        mock_open_connection.assert_called_once_with('127.0.0.1', 8000)
+
+    def test_that_signing_service_should_close_connection_and_exit_on_sigterm(self):
+        with closing(socket.socket()) as middleman_socket:
+            middleman_socket.bind(('127.0.0.1', 0))
+            middleman_socket.listen(1)
+            signing_service = SigningService(self.host, middleman_socket.getsockname()[1], self.initial_reconnect_delay)
+            sigterm_timer = threading.Timer(0.5, os.kill, args=(os.getpid(), signal.SIGTERM))
+            sigterm_timer.start()
+
+            signing_service.run()
+
+            sigterm_timer.join()
+            (connection, _address) = middleman_socket.accept()
+            with closing(connection):
+                connection.settimeout(1)
+                while connection.recv(1024) != b'':
+                    pass
+
+        self.assertTrue(signing_service.was_sigterm_caught)
+
+    def test_that_reconnect_delay_is_increased_when_connection_is_closed_before_any_request(self):
+        with mock.patch('asyncio.open_connection', side_effect=_get_coroutine_function((mock.Mock(), mock.Mock()))):
+            with mock.patch('src.signing_service.SigningService._handle_connection', side_effect=_get_coroutine_function(False)):
+                with mock.patch('src.signing_service.SigningService._was_sigterm_caught', side_effect=[False, True]):
+                    signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
                     signing_service.run()
 
-        mock_socket_connect.assert_called_once_with(('127.0.0.1', 8000))
-        mock_socket_close.assert_called_once()
+        self.assertEqual(signing_service.current_reconnect_delay, self.initial_reconnect_delay)
+
+    def test_that_reconnect_delay_is_reset_when_connection_is_closed_after_request(self):
+        with mock.patch('asyncio.open_connection', side_effect=_get_coroutine_function((mock.Mock(), mock.Mock()))):
+            with mock.patch('src.signing_service.SigningService._handle_connection', side_effect=_get_coroutine_function(True)):
+                with mock.patch('src.signing_service.SigningService._was_sigterm_caught', side_effect=[False, True]):
+                    with mock.patch('asyncio.sleep', side_effect=_get_coroutine_function()):
+                        signing_service = SigningService(self.host, self.port, self.initial_reconnect_delay)
+                        signing_service.current_reconnect_delay = 8
+                        signing_service.run()
+
+        self.assertIsNone(signing_service.current_reconnect_delay)
+
+
+class SigningServiceHandleConnectionTestCase(TestCase):
+
+    def setUp(self):
+        self.signing_service = SigningService('127.0.0.1', 8000, 2, 1)
+        self.executor = self.signing_service._start_signing_workers()
+        (self.signing_service_socket, self.middleman_socket) = socket.socketpair()
+        self.loop = asyncio.get_event_loop()
+
+    def tearDown(self):
+        self.executor.shutdown()
+        self.signing_service_socket.close()
+        self.middleman_socket.close()
+
+    def _handle_connection(self, middleman):
+        """ Runs `_handle_connection()` and coroutine `middleman` communicating with it until both finish. """
+        async def signing_service(reader, writer):
+            try:
+                await self.signing_service._handle_connection(reader, writer)
+            finally:
+                writer.close()
+
+        async def run():
+            (reader, writer) = await asyncio.open_connection(sock=self.signing_service_socket)
+            (middleman_reader, middleman_writer) = await asyncio.open_connection(sock=self.middleman_socket)
+            try:
+                return (
+                    await asyncio.gather(
+                        signing_service(reader, writer),
+                        middleman(middleman_reader, middleman_writer),
+                    )
+                )[1]
+            finally:
+                middleman_writer.close()
+        return self.loop.run_until_complete(asyncio.wait_for(run(), 5))
+
+    @staticmethod
+    async def _receive_frames(reader, frames_count):
+        frame_decoder = FrameDecoder()
+        frames = []
+        while len(frames) < frames_count:
+            frame_decoder.feed(await reader.read(1024))
+            frames += [frame._replace(payload=bytes(frame.payload)) for frame in frame_decoder.read_frames()]
+        return frames
+
+    def test_that_every_request_is_answered_with_its_payload_until_connection_is_closed(self):
+        async def middleman(reader, writer):
+            writer.write(
+                encode_frame(1, MessageType.REQUEST, b'first') +
+                encode_frame(2, MessageType.REQUEST, b'second')
+            )
+            frames = await self._receive_frames(reader, 3)
+            writer.close()
+            return frames
+
+        frames = self._handle_connection(middleman)
+
+        self.assertCountEqual(
+            frames,
+            [
+                Frame(0, MessageType.HEARTBEAT, b''),
+                Frame(1, MessageType.RESPONSE, b'first'),
+                Frame(2, MessageType.RESPONSE, b'second'),
+            ]
+        )
+
+    def test_that_batch_request_is_answered_with_signatures_in_the_same_order(self):
+        async def middleman(reader, writer):
+            writer.write(encode_frame(1, MessageType.BATCH_REQUEST, encode_batch_payload([b'first', b'second', b'third'])))
+            frames = await self._receive_frames(reader, 2)
+            writer.close()
+            return frames
+
+        frames = self._handle_connection(middleman)
+
+        self.assertEqual(
+            frames[1],
+            Frame(1, MessageType.BATCH_RESPONSE, encode_batch_payload([b'first', b'second', b'third'])),
+        )
+
+    def test_that_invalid_batch_request_and_unexpected_message_type_are_answered_with_error(self):
+        async def middleman(reader, writer):
+            writer.write(
+                encode_frame(1, MessageType.BATCH_REQUEST, b'\x00\x02') +
+                encode_frame(2, MessageType.RESPONSE, b'first')
+            )
+            frames = await self._receive_frames(reader, 3)
+            writer.close()
+            return frames
+
+        frames = self._handle_connection(middleman)
+
+        self.assertCountEqual(
+            [
+                (frame.request_id, frame.message_type, decode_error_payload(frame.payload)[0])
+                for frame in frames if frame.message_type != MessageType.HEARTBEAT
+            ],
+            [
+                (1, MessageType.ERROR, ErrorCode.INVALID_REQUEST),
+                (2, MessageType.ERROR, ErrorCode.INVALID_REQUEST),
+            ]
+        )
+
+    def test_that_heartbeats_are_sent_periodically(self):
+        async def middleman(reader, writer):
+            frames = await self._receive_frames(reader, 3)
+            writer.close()
+            return frames
+
+        with mock.patch('src.signing_service.SIGNING_SERVICE_HEARTBEAT_INTERVAL', 0.01):
+            frames = self._handle_connection(middleman)
+
+        self.assertEqual(frames, [Frame(0, MessageType.HEARTBEAT, b'')] * 3)
+
+    def test_that_connection_is_left_after_receiving_invalid_frame(self):
+        async def middleman(reader, writer):
+            writer.write(b'hello\n' * 10)
+            frames = await self._receive_frames(reader, 1)
+            return (frames, await reader.read(1024))
+
+        # Nothing but the first heartbeat is sent back before the connection is closed.
+        (frames, data) = self._handle_connection(middleman)
+
+        self.assertEqual(frames, [Frame(0, MessageType.HEARTBEAT, b'')])
+        self.assertEqual(data, b'')
+
+    def test_that_request_which_failed_to_be_signed_is_answered_with_error_and_reported(self):
+        async def sign(*_args):
+            raise RuntimeError('Broken pool.')
+
+        async def middleman(reader, writer):
+            writer.write(encode_frame(1, MessageType.REQUEST, b'first'))
+            frames = await self._receive_frames(reader, 2)
+            writer.close()
+            return frames
+
+        with mock.patch('src.signing_service.SigningService._sign', side_effect=sign):
+            with mock.patch('src.signing_service.crash_logger') as crash_logger_mock:
+                frames = self._handle_connection(middleman)
+
+        [error] = [frame for frame in frames if frame.message_type != MessageType.HEARTBEAT]
+        self.assertEqual((error.request_id, error.message_type), (1, MessageType.ERROR))
+        self.assertEqual(decode_error_payload(error.payload)[0], ErrorCode.SIGNING_FAILED)
+        crash_logger_mock.error.assert_called_once()
 
 
 class SigningServiceIncreaseDelayTestCase(TestCase):